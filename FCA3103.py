@@ -33,10 +33,69 @@ import math
 # User modules
 from calibration_instrument import *
 from tektronix_fca3103_drv  import *
+from fca3103_decode         import *
+from running_stats          import *
+from gap_detector           import *
+from trigger_cache          import *
+from fca3103_trace          import *
 
 # This attribute permits dynamic loading inside wrcalibration class.
 __meas_instr__ = "FCA3103"
 
+## Golden ratio, used to refine the trigger level
+GOLDEN = (1 + math.sqrt(5)) / 2
+## Order of the statistics returned by CALC:AVER:ALL?
+STATS = ("mean", "stdev", "max", "min", "adev")
+
+
+def level_search(v_min, v_max, coarse, resolution) :
+    '''
+    Generator with the search of the trigger level, see FCA3103.trigger_level.
+
+    It yields each level to test, rounded to the mV resolution of the
+    instrument and never twice, and must be sent the mean time interval
+    measured at it. It does no I/O, so the blocking and the asyncio classes
+    share it.
+
+    Args:
+        v_min (float) : Minimum voltage level for the input signal
+        v_max (float) : Maximum voltage level for the input signal
+        coarse (float) : Step of the initial scan (V)
+        resolution (float) : Precision of the trigger level (V)
+
+    Returns:
+        (as StopIteration value) A dict with the mean time interval measured
+        for each tested level.
+    '''
+    means = {}
+
+    def test(level) :
+        level = round(level, 3)
+        if level not in means :
+            means[level] = yield level
+        return abs(means[level])
+
+    # Coarse scan of the whole range ------------------
+    i = v_min
+    while i < v_max :
+        yield from test(i)
+        i += coarse
+    best = min(means, key=lambda k : abs(means[k]))
+
+    # Golden section search around the best one -------
+    a = max(v_min, best - coarse)
+    b = min(v_max, best + coarse)
+    c = b - (b - a) / GOLDEN
+    d = a + (b - a) / GOLDEN
+    while b - a > resolution :
+        if (yield from test(c)) < (yield from test(d)) :
+            b = d
+        else :
+            a = c
+        c = b - (b - a) / GOLDEN
+        d = a + (b - a) / GOLDEN
+    return means
+
 class FCA3103(Calibration_instrument) :
     '''
     Class that implements the interface Calibration_instrument for the Tektronix FCA3103.
@@ -58,133 +117,465 @@ class FCA3103(Calibration_instrument) :
     skip_values = False
     ## Error value, used for skip a value (in ps)
     error = 500000
-
-    def __init__(self, port, master_chan=None, slave_chan=None) :
+    ## Maximum number of samples read by each FETCH:ARR?
+    fetch_size = 10000
+    ## Expected time between samples (s), used to wait for the buffer to fill
+    pps_period = 1.0
+    ## Number of samples the output buffer can hold, a full buffer means lost samples
+    buffer_depth = 100000
+    ## Header of the measurement function setting
+    FUNCTION = "CONFIGURE:TINTERVAL"
+
+    def __init__(self, port, master_chan=None, slave_chan=None, transport=None, \
+    trig_cache=True, drv=None) :
         '''
         Constructor
 
+        If there is a fresh trigger level for this instrument and channels in
+        the trigger cache, it is loaded.
+
         Args:
             port (int) : Port for the Tektronix FCA3103 using the USB connection.
             master_chan (int) : Input channel for master's PPS signal.
             slave_chan (int) : Input channel for slave's PPS signal.
+            transport : Use it instead of /dev/usbtmc<port> (e.g. Sim_fca3103).
+            trig_cache : Trigger_cache to use. True uses the default one,
+                None disables it.
+            drv : An already open driver, port and transport are ignored.
         '''
-        self.drv = FCA3103_drv(port)
+        self.drv = drv if drv is not None else FCA3103_drv(port, transport=transport)
         self.master_chan = master_chan
         self.slave_chan = slave_chan
         self.trig_level = [None, ] *2 # This device has 2 input channels.
         self.trig_level[0] = None
         self.trig_level[1] = None
+        ## Mean time interval for each level tested by trigger_level
+        self.trig_profile = {}
+        ## Shadow copy of the instrument settings, None if they are unknown
+        self.state = None
+        ## Gap_detector of the last continuous_stream
+        self.gaps = None
+        ## Called before each instrument operation of the measurements, it
+        ## raises to stop them (e.g. a request cancelled by a daemon client)
+        self.interrupt = None
+
+        if trig_cache is True :
+            trig_cache = Trigger_cache()
+        self.trig_cache = trig_cache or None
+        self.load_trigger_level()
 
     # ------------------------------------------------------------------------ #
 
-    def trigger_level(self, v_min=0, v_max=5) :
+    def _cache_key(self) :
         '''
-        Method to determine a good trigger level for a input channel.
+        Key of this instrument and channels in the trigger cache.
+        '''
+        return Trigger_cache.key(self.drv, self.master_chan, self.slave_chan)
 
-        It's important to run this method at least once before doing any
-        measurement for achieving good time interval measures.
+    # ------------------------------------------------------------------------ #
 
-        Ensure that 2 WR devices are connected and servo state is TRACK PHASE.
+    def load_trigger_level(self) :
+        '''
+        Method to load the trigger level from the trigger cache.
+
+        Returns:
+            True if a fresh entry was found.
+        '''
+        if self.trig_cache is None or self.master_chan == None or \
+        self.slave_chan == None :
+            return False
+        entry = self.trig_cache.get(self._cache_key())
+        if entry is None :
+            return False
+        self.trig_level[0], self.trig_level[1] = entry[0]
+        self.trig_profile = entry[1]
+        if self.show_dbg :
+            print("Cached trigger level: %f volts." % (self.trig_level[0]))
+        return True
+
+    # ------------------------------------------------------------------------ #
+
+    @traced
+    def check_trigger_level(self, tolerance=50e-12, v_min=0, v_max=5) :
+        '''
+        Method to ensure that the trigger level is still good, sweeping only if needed.
+
+        The cached level is spot checked: if its mean time interval drifted
+        more than tolerance from the one measured during the sweep, or there
+        isn't a fresh cached level, trigger_level is run.
 
         Args:
+            tolerance (float) : Maximum allowed drift (s).
             v_min (float) : Minimum voltage level for the input signal
             v_max (float) : Maximum voltage level for the input signal
 
+        Returns:
+            True if a new sweep was needed.
+        '''
+        spot = self._spot_level()
+        if spot is not None :
+            if abs(self._level_mean(spot[0]) - spot[1]) <= tolerance :
+                return False
+            if self.show_dbg :
+                print("Trigger level %f drifted, sweeping again." % (spot[0]))
+        self.trigger_level(v_min, v_max)
+        return True
+
+    # ------------------------------------------------------------------------ #
+
+    def _spot_level(self) :
+        '''
+        Method to load the cached trigger level to spot check, see check_trigger_level.
+
+        Returns:
+            A tuple (level, mean time interval measured in the sweep), or None
+            if there isn't a fresh cached level to check.
+        '''
+        if not self.load_trigger_level() :
+            return None
+        level = self.trig_level[0]
+        expected = self.trig_profile.get(round(level, 3))
+        return None if expected is None else (level, expected)
+
+    # ------------------------------------------------------------------------ #
+
+    def _check_channels(self, trigger=True) :
+        '''
+        Method to check that the instrument is ready to measure.
+
+        Args:
+            trigger (bool) : Check the trigger levels too.
+
         Raises:
-            ValueError if master_chan or slave_chan are not set.
-            NotADevicePort if input is a invalid input channel for this device.
+            ValueError if master_chan or slave_chan are not set or trigger level not set.
         '''
         if self.master_chan == None :
             raise ValueError("FCA3103 ERROR: Master input channel not set.")
         if self.slave_chan == None :
             raise ValueError("FCA3103 ERROR: Slave input channel not set.")
 
-        # Prepare an array with voltage values to be tested
-        v_array = []
-        i = v_min
-        incr = 0.1
-        while i < v_max :
-            v_array.append(i)
-            i += incr
+        if trigger and (self.trig_level[0] == None or \
+        self.trig_level[1] == None) :
+            raise ValueError("FCA3103 ERROR: Trigger level not set.")
 
-        # Initial device configuration --------------------
-        if self.show_dbg :
-            print("Setting the initial instrument configuration.")
+    # ------------------------------------------------------------------------ #
 
-        # Reset the device
-        self.drv.write("*RST")
+    def reset(self) :
+        '''
+        Method to force a reset of the instrument in the next configuration.
+
+        It must be called when the instrument settings could have been modified
+        without using configure (e.g. writing commands through self.drv or
+        from the front panel).
+        '''
+        self.state = None
+
+    # ------------------------------------------------------------------------ #
 
+    def settings(self, arm_count=1, tstamp=False, levels=None, binary=False, \
+    stats=False) :
+        '''
+        Method to build the instrument configuration for time interval measures.
+
+        Args:
+            arm_count (int) : Number of samples taken for each INIT.
+            tstamp (bool) : Enable timestamp for each measure.
+            levels (list) : Trigger level for each input, None to leave them
+                unchanged.
+            binary (bool) : Transfer the samples in REAL (binary) format.
+            stats (bool) : Compute the statistics of the arm_count samples in
+                the instrument.
+
+        Returns:
+            A list of (header, value) tuples, in the order they must be sent.
+        '''
+        cfg = []
         # Trigger mode not continuous
-        self.drv.write("INIT:CONT OFF")
+        cfg.append(("INIT:CONT", "OFF"))
+        # Skew between the slave and master
+        cfg.append((self.FUNCTION, "(@%d),(@%d)" % (self.slave_chan,self.master_chan)))
+        # Configure the arming system
+        cfg.append(("TRIG:COUNT", "1"))
+        cfg.append(("ARM:COUNT", "%d" % arm_count))
+        for ch in (1, 2) :
+            # Set input coupling to DC
+            cfg.append(("INPUT%d:COUPling" % ch, "DC"))
+            # Set input impedance to 1MOhm
+            cfg.append(("INPUT%d:IMPedance" % ch, "MAX"))
+            # Set the trigger auto mode off
+            cfg.append(("INPUT%d:LEVEL:AUTO" % ch, "OFF"))
+        if levels is not None :
+            for ch in (1, 2) :
+                cfg.append(("INPUT%d:LEVEL" % ch, "%1.3f" % levels[ch-1]))
+        # Measures format (ASCII or REAL with time stamping optional)
+        cfg.append(("FORMAT", "REAL" if binary else "ASCII"))
+        cfg.append(("FORMAT:TINF", "ON" if tstamp else "OFF"))
+        # Statistics computed by the instrument
+        cfg.append(("CALC:AVER:STATE", "ON" if stats else "OFF"))
+        if stats :
+            cfg.append(("CALC:AVER:COUNT", "%d" % arm_count))
+        return cfg
+
+    # ------------------------------------------------------------------------ #
+
+    @traced
+    def configure(self, settings) :
+        '''
+        Method to apply a configuration to the instrument.
+
+        Only the settings that differ from the shadow state are sent, joined in
+        a single SCPI program. The instrument is reset only when its state is
+        unknown. Changing the measurement function restores the defaults of
+        the rest of settings, so everything after it is sent again.
+
+        Args:
+            settings (list) : (header, value) tuples, as returned by settings().
+
+        Returns:
+            True if the instrument was reconfigured.
+
+        Raises:
+            SCPI_error if the instrument reports errors. The shadow state is
+            discarded then, because it could differ from the instrument.
+        '''
+        program = self._program(settings)
+        if program is None :
+            return False
+
+        try :
+            self.drv.write(program, check=True)
+        except SCPI_error :
+            self.state = None
+            raise
+        return True
+
+    # ------------------------------------------------------------------------ #
+
+    def _program(self, settings) :
+        '''
+        Method to build the SCPI program that applies a configuration.
+
+        The shadow state is updated as if the program had been sent.
+
+        Args:
+            settings (list) : (header, value) tuples, as returned by settings().
+
+        Returns:
+            The program, or None if the instrument is already configured.
+        '''
+        program = []
+        if self.state is None :
+            program.append("*RST")
+            self.state = {}
 
-        # Configure the measure to be performed
-        self.drv.write("CONFIGURE:TINTERVAL (@%d),(@%d)" % \
-        (self.slave_chan,self.master_chan))
+        for header, value in self.delta(settings) :
+            program.append(":%s %s" % (header, value))
+            self.state[header] = value
 
-        # Take one sample, really needed?
-        self.drv.write("TRIG:COUNT 1;:ARM:COUNT 1")
+        if not program :
+            return None
+        return ";".join(program)
 
-        # Set input coupling to DC
-        self.drv.write("INPUT1:COUPling DC")
-        self.drv.write("INPUT2:COUPling DC")
+    # ------------------------------------------------------------------------ #
 
-        # Set input impedance to 1 MOhm
-        self.drv.write("INPUT1:IMPedance MAX")
-        self.drv.write("INPUT2:IMPedance MAX")
+    def delta(self, settings, state=None) :
+        '''
+        Method to get the settings that configure() would send.
 
-        # Set the trigger auto mode off
-        self.drv.write("INPUT1:LEVEL:AUTO OFF")
-        self.drv.write("INPUT2:LEVEL:AUTO OFF")
+        Args:
+            settings (list) : (header, value) tuples, as returned by settings().
+            state (dict) : Instrument settings to compare with. Default : the
+                shadow state.
 
-        # Measure format (ASCII with time stamping disabled)
-        self.drv.write("FORMAT ASCII;:FORMAT:TINF OFF")
+        Returns:
+            A list with the (header, value) tuples that must be sent, all of
+            them if the state is unknown.
+        '''
+        if state is None :
+            state = self.state or {}
+        delta = []
+        resend = False
+        for header, value in settings :
+            if resend or state.get(header) != value :
+                delta.append((header, value))
+                if header == self.FUNCTION :
+                    resend = True
+        return delta
 
-        # Check for errors in the initial configuration
-        errors = self.drv.query("syst:err?")
-        if errors[0] != 0 :
-            #TODO: raise an exception
-            print("Error in initial config: " + errors)
-        elif show_dbg :
-            print("No errors in initial config")
+    # ------------------------------------------------------------------------ #
 
-        # Test the trigger levels to determine the best ---
-        trig_levels = {}
+    def _level_mean(self, level) :
+        '''
+        Method to measure the mean time interval for a trigger level.
+
+        The n_samples measures are taken in a single armed block.
 
+        Args:
+            level (float) : Trigger level for both inputs (V).
+
+        Returns:
+            The mean time interval, or inf if the inputs don't trigger.
+        '''
+        if self.interrupt is not None :
+            self.interrupt()
+        self.configure(self.settings(self.n_samples, levels=(level, level)))
+        self.drv.write("INIT")
+        try :
+            values = self._fetch(self.n_samples, \
+            timeout=self.drv.timeout + self.n_samples * self.pps_period)
+        except TimeoutError :
+            # The FETCH left an error (-230) in the queue and its response
+            # could still come: clear both before the next command
+            self.drv.abort()
+            return self._level_result(level, math.inf)
+        return self._level_result(level, sum(values) / len(values))
+
+    # ------------------------------------------------------------------------ #
+
+    def _level_result(self, level, mean) :
+        '''
+        Method to report the mean time interval measured for a trigger level.
+
+        Returns:
+            mean
+        '''
         if self.show_dbg :
-            print("Testing trigger level values, it should take a long time ...")
+            print("Trig level : %1.3f V, Mean time interval: %g" % (level, mean))
+        return mean
 
-        for i in v_array :
-            mean = 0
-            # Set trigger level
-            self.drv.write("INPUT%d:LEVEL %1.3f" % (self.master_chan,i))
-            self.drv.write("INPUT%d:LEVEL %1.3f" % (self.slave_chan,i))
+    # ------------------------------------------------------------------------ #
 
-            # Test it
-            for j in range(self.n_samples) :
-                mean += float(self.drv.query("READ?"))
-                time.sleep(self.t_samples)
-            mean /= self.n_samples # Get the mean value
+    @traced
+    def trigger_level(self, v_min=0, v_max=5, coarse=0.5, resolution=0.01) :
+        '''
+        Method to determine a good trigger level for a input channel.
 
-            if self.show_dbg :
-                print("Trig level : %1.3f V, Mean time interval: %g" % (i, mean))
+        It's important to run this method at least once before doing any
+        measurement for achieving good time interval measures.
+
+        Ensure that 2 WR devices are connected and servo state is TRACK PHASE.
+
+        The range is scanned in coarse steps first, and then the level with the
+        lowest |time interval| is refined with a golden section search around
+        the best coarse level until resolution is reached.
+
+        Args:
+            v_min (float) : Minimum voltage level for the input signal
+            v_max (float) : Maximum voltage level for the input signal
+            coarse (float) : Step of the initial scan (V)
+            resolution (float) : Precision of the trigger level (V)
+
+        Returns:
+            A dict with the mean time interval measured for each tested level,
+            sorted by level. It's also stored in trig_profile.
+
+        Raises:
+            ValueError if master_chan or slave_chan are not set.
+            NotADevicePort if input is a invalid input channel for this device.
+        '''
+        self._check_channels(trigger=False)
 
-            trig_levels[i] = mean
+        if self.show_dbg :
+            print("Testing trigger level values ...")
+
+        search = level_search(v_min, v_max, coarse, resolution)
+        try :
+            level = next(search)
+            while True :
+                level = search.send(self._level_mean(level))
+        except StopIteration as stop :
+            return self._set_trigger(stop.value)
+
+    # ------------------------------------------------------------------------ #
+
+    def _set_trigger(self, means) :
+        '''
+        Method to set the trigger level found by a search, see trigger_level.
 
-        # Take the lower one
-        min = 1
-        min_key = 0
-        for key in trig_levels :
-            if abs(trig_levels[key]) < min :
-                min = abs(trig_levels[key])
-                min_key = key
+        The level with the lowest |time interval| is used (the lower one if
+        tied) and stored in the trigger cache.
+
+        Args:
+            means (dict) : Mean time interval measured for each tested level.
+
+        Returns:
+            The trigger profile (means sorted by level).
+        '''
+        min_key = min(means, key=lambda k : abs(means[k]))
 
+        self.trig_profile = dict(sorted(means.items()))
         self.trig_level[0] = min_key
         self.trig_level[1] = min_key
+        if self.trig_cache is not None :
+            self.trig_cache.put(self._cache_key(), self.trig_level, self.trig_profile)
         print("Trigger level set at %f volts." % (min_key))
+        return self.trig_profile
 
     # ------------------------------------------------------------------------ #
 
-    def mean_time_interval(self, n_samples, t_samples) :
+    def _run(self, procedure) :
+        '''
+        Generator to run a measurement procedure with the blocking driver.
+
+        The measurements are written as procedures (the _*_procedure methods)
+        that do no I/O, so the blocking and the asyncio classes share them,
+        like level_search. A procedure yields operations, tuples with the
+        name of a driver method (or configure, _fetch or sleep) and its
+        arguments, and it's sent their results. A ("chunk", samples)
+        operation is yielded to the caller instead. Exceptions, and closing
+        the generator, are thrown into the procedure so it can stop the
+        instrument.
+
+        Returns:
+            (as StopIteration value) The result of the procedure.
+        '''
+        step, value = procedure.send, None
+        while True :
+            try :
+                op, *args = step(value)
+            except StopIteration as stop :
+                return stop.value
+            step = procedure.send
+            try :
+                if op == "chunk" :
+                    value = yield args[0]
+                else :
+                    value = self._execute(op, args)
+            except BaseException as e :
+                step, value = procedure.throw, e
+
+    # ------------------------------------------------------------------------ #
+
+    def _call(self, procedure) :
+        '''
+        Method to run a procedure that yields no chunks, see _run.
+
+        Returns:
+            The result of the procedure.
+        '''
+        try :
+            next(self._run(procedure))
+        except StopIteration as stop :
+            return stop.value
+
+    # ------------------------------------------------------------------------ #
+
+    def _execute(self, op, args) :
+        '''
+        Method to do an operation of a procedure, see _run.
+        '''
+        if self.interrupt is not None :
+            self.interrupt()
+        if op == "sleep" :
+            return time.sleep(*args)
+        if op in ("configure", "_fetch") :
+            return getattr(self, op)(*args)
+        return getattr(self.drv, op)(*args)
+
+    # ------------------------------------------------------------------------ #
+
+    @traced
+    def mean_time_interval(self, n_samples, t_samples, device_stats=False) :
         '''
         Method to measure time interval between two input signals.
 
@@ -193,71 +584,32 @@ class FCA3103(Calibration_instrument) :
         Args:
             n_samples (int) : Number of measures to be done.
             t_samples (int) : Time between samples (should be greater than 1ms)
-            input1_trig (float) : Trigger level for the input 1
-            input2_trig (float) : Trigger level for the input 2
+            device_stats (bool) : Average in the instrument (see statistics)
+                instead of reading every sample. t_samples and skip_values
+                are not used then.
 
         Returns:
             The mean value of the N samples.
 
         Raises:
             ValueError if master_chan or slave_chan are not set or trigger level not set.
+            SCPI_error if the instrument reports errors.
         '''
-        if self.master_chan == None :
-            raise ValueError("FCA3103 ERROR: Master input channel not set.")
-        if self.slave_chan == None :
-            raise ValueError("FCA3103 ERROR: Slave input channel not set.")
+        return self._call(self._mean_procedure(n_samples, t_samples, device_stats))
 
-        if self.trig_level[0] == None or \
-        self.trig_level[1] == None :
-            raise ValueError("FCA3103 ERROR: Trigger level not set.")
-
-        # Initial device configuration --------------------
+    # ------------------------------------------------------------------------ #
 
-        # Reset the device
-        self.drv.write("*RST")
-        time.sleep(0.5)
+    def _mean_procedure(self, n_samples, t_samples, device_stats=False) :
+        '''
+        Procedure of mean_time_interval, see _run.
+        '''
+        if device_stats :
+            return (yield from self._statistics_procedure(n_samples))["mean"]
 
-        # Trigger mode not continuous
-        self.drv.write("INIT:CONT OFF")
+        self._check_channels()
 
-        # Configure the measure to be performed
-        # Skew between the slave and master
-        self.drv.write("CONFIGURE:TINTERVAL (@%d),(@%d)" % (self.slave_chan,self.master_chan))
-
-        # Take one sample
-        self.drv.write("TRIG:COUNT 1;:ARM:COUNT 1")
-
-        # Set input coupling to AC
-        self.drv.write("INPUT1:COUPling DC")
-        time.sleep(0.5)
-        self.drv.write("INPUT2:COUPling DC")
-        time.sleep(0.5)
-
-        # Set input impedance to 1MOhm
-        self.drv.write("INPUT1:IMPedance MAX")
-        time.sleep(0.5)
-        self.drv.write("INPUT2:IMPedance MAX")
-        time.sleep(0.5)
-
-        # Set the trigger level for both inputs
-        self.drv.write("INPUT1:LEVEL:AUTO OFF")
-        time.sleep(0.5)
-        self.drv.write("INPUT2:LEVEL:AUTO OFF")
-        time.sleep(0.5)
-        self.drv.write("INPUT1:LEVEL %1.3f" % self.trig_level[0])
-        time.sleep(0.5)
-        self.drv.write("INPUT2:LEVEL %1.3f" % self.trig_level[1])
-        time.sleep(0.5)
-
-        # Measures format (ASCII with time stamping disabled)
-        self.drv.write("FORMAT ASCII;:FORMAT:TINF OFF")
-        time.sleep(0.5)
-
-        # Check for errors in the initial configuration
-        errors = self.drv.query("syst:err?")
-        if errors[0] != 0 :
-            # Throw an exception not a print!!
-            print("Error in initial config: " + errors)
+        # Initial device configuration --------------------
+        yield ("configure", self.settings(levels=self.trig_level))
 
         # Measurement -------------------------------------
 
@@ -265,121 +617,420 @@ class FCA3103(Calibration_instrument) :
 
         for i in range(n_samples) :
             # READ? command is equivalente to ABORT;INITIATE;FETCH?:
-            cur = float(self.drv.query("READ?"))
-            if cur > mean + self.error :
-                if self.skip_values :
-                    continue
-                else :
-                    raise MeasureError("FCA3103 ERROR: current value far from mean value : %f (%f)" % (cur,mean))
+            cur = float((yield ("query", "READ?")))
+            if self._skip(cur, mean, cur > mean + self.error) :
+                continue
             mean += cur
 
             if self.show_dbg :
                 print("%s TINT: %g" % (self.drv.device, cur))
-            time.sleep(t_samples)
+            yield ("sleep", t_samples)
         mean /= n_samples
 
+        if self.drv.check_errors :
+            yield ("check",)
         return mean
 
     # ------------------------------------------------------------------------ #
 
-    def time_interval(self, n_samples, tstamp=False):
+    def _skip(self, cur, mean, far) :
         '''
-        Method to measure N samples of time interval between the input channels
+        Method to handle a value far from the mean value, see skip_values.
 
         Args:
-            n_samples (int) : Number of measures to be done
-            tstamp (bool) : Enable timestamp for each measure
+            cur (float) : The value.
+            mean (float) : The mean value.
+            far (bool) : The value is far from the mean value.
 
         Returns:
-            A list with the measure values. It's legth could be lower than n_samples
-            if skip_values is activated.
+            True if the value must be skipped.
+
+        Raises:
+            MeasureError if the value is far and skip_values is not set.
+        '''
+        if not far :
+            return False
+        if self.skip_values :
+            return True
+        raise MeasureError("FCA3103 ERROR: current value far from mean value : %g (%g)" % (cur,mean))
+
+    # ------------------------------------------------------------------------ #
+
+    @traced
+    def statistics(self, n_samples) :
+        '''
+        Method to measure N samples and get their statistics from the instrument.
+
+        A block of N samples is armed with the instrument statistics enabled,
+        so only the summary is transferred instead of a response per sample.
+
+        Args:
+            n_samples (int) : Number of measures to be done.
+
+        Returns:
+            A dict with the keys in STATS (mean, stdev, max, min and adev, in
+            seconds) and samples.
 
         Raises:
             ValueError if master_chan or slave_chan are not set or trigger level not set.
+            SCPI_error if the instrument reports errors.
+            MeasureError if the instrument doesn't return the statistics.
         '''
-        if self.master_chan == None :
-            raise ValueError("FCA3103 ERROR: Master input channel not set.")
-        if self.slave_chan == None :
-            raise ValueError("FCA3103 ERROR: Slave input channel not set.")
+        return self._call(self._statistics_procedure(n_samples))
 
-        if self.trig_level[0] == None or \
-        self.trig_level[1] == None :
-            raise ValueError("FCA3103 ERROR: Trigger level not set.")
+    # ------------------------------------------------------------------------ #
+
+    def _statistics_procedure(self, n_samples) :
+        '''
+        Procedure of statistics, see _run.
+        '''
+        self._check_channels()
 
         # Initial device configuration --------------------
+        yield ("configure", self.settings(n_samples, levels=self.trig_level, stats=True))
 
-        # Reset the device
-        self.drv.write("*RST")
-        time.sleep(0.5)
+        # Measurement -------------------------------------
+        yield ("write", "INIT")
+        # INIT is an overlapped command: *OPC? answers when the block is done
+        yield ("sync", n_samples * self.pps_period + self.drv.timeout)
+        return self._parse_stats((yield ("query", "CALC:AVER:ALL?")), n_samples)
 
-        # Trigger mode continuous
-        self.drv.write("INIT:CONT OFF")
+    # ------------------------------------------------------------------------ #
 
-        # Configure the measure to be performed
-        # Skew between the slave and master
-        self.drv.write("CONFIGURE:TINTERVAL (@%d),(@%d)" % (self.slave_chan,self.master_chan))
-
-        # Configure the arming sistem
-        self.drv.write("TRIG:COUNT 1;:ARM:COUNT %d" % (n_samples))
-
-        # Set input coupling to AC
-        self.drv.write("INPUT1:COUPling DC")
-        time.sleep(0.5)
-        self.drv.write("INPUT2:COUPling DC")
-        time.sleep(0.5)
-
-        # Set input impedance to 1MOhm
-        self.drv.write("INPUT1:IMPedance MAX")
-        time.sleep(0.5)
-        self.drv.write("INPUT2:IMPedance MAX")
-        time.sleep(0.5)
-
-        # Set the trigger level for both inputs
-        self.drv.write("INPUT1:LEVEL:AUTO OFF")
-        time.sleep(0.5)
-        self.drv.write("INPUT2:LEVEL:AUTO OFF")
-        time.sleep(0.5)
-        self.drv.write("INPUT1:LEVEL %1.3f" % self.trig_level[0])
-        time.sleep(0.5)
-        self.drv.write("INPUT2:LEVEL %1.3f" % self.trig_level[1])
-        time.sleep(0.5)
-
-        # Measures format (ASCII with time stamping disabled)
-        self.drv.write("FORMAT ASCII;:FORMAT:TINF %s" % ("ON" if tstamp else "OFF"))
-        time.sleep(0.5)
-
-        # Check for errors in the initial configuration
-        # errors = self.drv.query("syst:err?")
-        # if errors[0] != 0 :
-        #     # Throw an exception not a print!!
-        #     print("Error in initial config: " + errors)
-        #     return None
+    def _parse_stats(self, response, n_samples) :
+        '''
+        Method to decode the response to CALC:AVER:ALL?, see statistics.
+        '''
+        values = response.split(",")
+        if len(values) != len(STATS) :
+            raise MeasureError("FCA3103 ERROR: Invalid statistics: %r" % response)
+        stats = dict(zip(STATS, (float(v) for v in values)))
+        stats["samples"] = n_samples
+        if self.show_dbg :
+            print("%s TINT statistics: %s" % (self.drv.device, stats))
+        return stats
+
+    # ------------------------------------------------------------------------ #
+
+    @traced
+    def mean_time_interval_ci(self, n_samples, t_samples, ci=2e-12, confidence=0.95, \
+    min_samples=10) :
+        '''
+        Method to measure the mean time interval until it is known with a precision.
+
+        Like mean_time_interval, but it keeps a running mean and variance and
+        stops as soon as the confidence interval of the mean is narrower than
+        +-ci, so stable links need less samples. The interval uses the
+        Student t quantile (see Running_stats.ci).
+
+        The interval is checked after every sample and the measure stops the
+        first time it is narrow enough (optional stopping), when the standard
+        deviation may be underestimated by chance. So the real confidence of
+        the result is somewhat lower than the nominal one, the more the lower
+        min_samples is. Use a bigger min_samples, or mean_time_interval with a
+        fixed number of samples, when the interval must hold strictly.
+
+        Args:
+            n_samples (int) : Maximum number of measures to be done.
+            t_samples (int) : Time between samples (should be greater than 1ms)
+            ci (float) : Target half width of the confidence interval (s).
+            confidence (float) : Confidence level of the interval.
+            min_samples (int) : Minimum number of measures (at least 2).
+
+        Returns:
+            A tuple (mean, standard error of the mean, number of samples used).
+
+        Raises:
+            ValueError if master_chan or slave_chan are not set or trigger level not set.
+            SCPI_error if the instrument reports errors.
+            MeasureError if a value is far from the mean and skip_values is not set.
+        '''
+        return self._call(self._mean_ci_procedure(n_samples, t_samples, ci, \
+        confidence, min_samples))
+
+    # ------------------------------------------------------------------------ #
+
+    def _mean_ci_procedure(self, n_samples, t_samples, ci, confidence, min_samples) :
+        '''
+        Procedure of mean_time_interval_ci, see _run.
+        '''
+        self._check_channels()
+
+        # Initial device configuration --------------------
+        yield ("configure", self.settings(levels=self.trig_level))
+
+        # Measurement -------------------------------------
+        stats = Running_stats()
+        min_samples = max(min_samples, 2)
+
+        for i in range(n_samples) :
+            # READ? command is equivalente to ABORT;INITIATE;FETCH?:
+            cur = float((yield ("query", "READ?")))
+            # error is given in ps
+            if self._skip(cur, stats.mean, \
+            stats.n > 0 and abs(cur - stats.mean) > self.error * 1e-12) :
+                continue
+            stats.add(cur)
+
+            if self.show_dbg :
+                print("%s TINT: %g (mean %g +- %g)" % (self.drv.device, cur, \
+                stats.mean, stats.ci(confidence)))
+            if stats.n >= min_samples and stats.ci(confidence) <= ci :
+                break
+            yield ("sleep", t_samples)
+
+        if self.drv.check_errors :
+            yield ("check",)
+        return (stats.mean, stats.stderr(), stats.n)
+
+    # ------------------------------------------------------------------------ #
+
+    def _fetch(self, n, tstamp=False, binary=False, timeout=None) :
+        '''
+        Method to read n samples from the output buffer of the instrument.
+
+        Args:
+            n (int) : Number of samples.
+            tstamp (bool) : The samples have timestamp.
+            binary (bool) : The instrument is configured in REAL format.
+            timeout (float) : Maximum time to wait for the samples (s).
+
+        Returns:
+            A numpy array as returned by decode_real if binary is set, or by
+            decode_ascii otherwise.
+        '''
+        # FETCH? command reads from output buffer
+        if binary :
+            return self._decode(self.drv.query_block("FETCH:ARR? %d" % n, \
+            timeout), n, tstamp, binary)
+        return self._decode(self.drv.query_raw("FETCH:ARR? %d" % n, \
+        timeout=timeout), n, tstamp, binary)
+
+    # ------------------------------------------------------------------------ #
+
+    def _decode(self, cur, n, tstamp=False, binary=False) :
+        '''
+        Method to decode the response to FETCH:ARR?, see _fetch.
+        '''
+        if binary :
+            return decode_real(cur, tstamp)
+        return decode_ascii(cur, tstamp, n)
+
+    # ------------------------------------------------------------------------ #
+
+    def _check_stall(self, last) :
+        '''
+        Method to give up a measurement whose samples stopped arriving.
+
+        The output buffer is polled while it's empty, so without a limit a
+        measurement whose inputs don't trigger would never end.
+
+        Args:
+            last (float) : time.monotonic() of the last sample read, or of
+                the start of the measurement.
+
+        Raises:
+            TimeoutError if no sample arrived in drv.timeout + pps_period.
+        '''
+        limit = self.drv.timeout + self.pps_period
+        if time.monotonic() - last > limit :
+            raise TimeoutError("FCA3103 ERROR: No samples after %g s" % limit)
+
+    # ------------------------------------------------------------------------ #
+
+    def time_interval_stream(self, n_samples, tstamp=False, binary=False) :
+        '''
+        Generator to measure N samples of time interval between the input channels.
+
+        The samples are yielded in chunks as soon as each FETCH completes, so
+        the memory used doesn't depend on n_samples. Each chunk has at most
+        fetch_size samples. If the generator is closed before the end, the
+        measurement is aborted.
+
+        Args:
+            n_samples (int) : Number of measures to be done
+            tstamp (bool) : Enable timestamp for each measure
+            binary (bool) : Transfer the samples in REAL format instead of ASCII
+
+        Yields:
+            A numpy array with the measure values (a structured array with the
+            fields "value" and "timestamp" if tstamp is set).
+
+        Raises:
+            ValueError if master_chan or slave_chan are not set or trigger level not set.
+            SCPI_error if the instrument reports errors.
+            TimeoutError if no sample arrives in drv.timeout + pps_period.
+        '''
+        return self._run(self._stream_procedure(n_samples, tstamp, binary))
+
+    # ------------------------------------------------------------------------ #
+
+    def _stream_procedure(self, n_samples, tstamp=False, binary=False) :
+        '''
+        Procedure of time_interval_stream, see _run.
+        '''
+        self._check_channels()
+
+        # Initial device configuration --------------------
+        yield ("configure", self.settings(n_samples, tstamp, self.trig_level, binary))
 
         # Initiate the sampling
-        self.drv.write("INIT")
+        yield ("write", "INIT")
+
+        # Measurement -------------------------------------
+        remaining = n_samples
+        last = time.monotonic()
+
+        try :
+            while remaining > 0 :
+                # Read all the stored samples in a single FETCH
+                avail = int((yield ("query", "DATA:POINTS?")))
+                if avail == 0 :
+                    self._check_stall(last)
+                    # Wait for the next sample
+                    yield ("sleep", self.pps_period)
+                    continue
+                n = min(avail, remaining, self.fetch_size)
+                chunk = yield ("_fetch", n, tstamp, binary)
+                last = time.monotonic()
+                remaining -= n
+                yield ("chunk", chunk)
+            if self.drv.check_errors :
+                yield ("check",)
+        except TimeoutError :
+            # Clear the errors and the responses still pending too
+            yield ("abort",)
+            raise
+        except BaseException :
+            if remaining > 0 :
+                yield ("write", "ABORT")
+            raise
+
+    # ------------------------------------------------------------------------ #
+
+    def continuous_stream(self, binary=True, n_samples=None, gaps=None) :
+        '''
+        Generator to measure time interval continuously, without re-arming.
+
+        The instrument is set in continuous mode (INIT:CONT ON) with timestamps
+        and its output buffer is drained as fast as it fills: the next FETCH is
+        sent as soon as the previous one is done, and the host only sleeps when
+        the buffer is empty. Unlike time_interval_stream, no PPS edge is lost
+        between blocks. Samples lost anyway (output buffer overflows, missed
+        edges) are found from the timestamps by gaps, that is updated before
+        each chunk is yielded. When the generator ends or is closed, the
+        continuous mode is turned off and the measurement aborted.
+
+        Args:
+            binary (bool) : Transfer the samples in REAL format instead of ASCII.
+            n_samples (int) : Stop after this number of samples. Default : run
+                until the generator is closed.
+            gaps (Gap_detector) : Checker for the timestamps. Default : a new
+                one for pps_period. It is stored in self.gaps.
+
+        Yields:
+            A numpy structured array with the fields "value" and "timestamp".
+
+        Raises:
+            ValueError if master_chan or slave_chan are not set or trigger level not set.
+            SCPI_error if the instrument reports errors.
+            TimeoutError if no sample arrives in drv.timeout + pps_period.
+        '''
+        return self._run(self._continuous_procedure(binary, n_samples, gaps))
+
+    # ------------------------------------------------------------------------ #
+
+    def _continuous_procedure(self, binary=True, n_samples=None, gaps=None) :
+        '''
+        Procedure of continuous_stream, see _run.
+        '''
+        self._check_channels()
+        if gaps is None :
+            gaps = Gap_detector(self.pps_period)
+        self.gaps = gaps
+
+        # Initial device configuration --------------------
+        yield ("configure", self.settings(1, True, self.trig_level, binary))
+
+        # Continuous mode starts the sampling, there is no INIT
+        yield ("write", self._continuous(True))
 
         # Measurement -------------------------------------
-        samples = []
-        end = int(n_samples/2)
-
-        for i in range(end):
-            # FETCH? command reads from output buffer
-            cur = self.drv.query("FETCH:ARR? 2")
-            cur = cur.split(',')
-
-            if tstamp:
-                samples.append(( float(cur[0]), float(cur[1]) ))
-                samples.append(( float(cur[2]), float(cur[3]) ))
-            else:
-                samples.append(float(cur[0]))
-                samples.append(float(cur[1]))
-            time.sleep(2) # Sleep for 2 secs after each fetch
-        if end < n_samples:
-            cur = self.drv.query("FETCH:ARR? 1")
-            cur = cur.split(',')
-            if tstamp:
-                samples.append(( float(cur[0]), float(cur[1]) ))
-            else:
-                samples.append(float(cur[0]))
-
-        return samples
+        remaining = math.inf if n_samples is None else n_samples
+        last = time.monotonic()
+
+        try :
+            try :
+                while remaining > 0 :
+                    avail = int((yield ("query", "DATA:POINTS?")))
+                    if avail == 0 :
+                        self._check_stall(last)
+                        # Wait for the next sample
+                        yield ("sleep", self.pps_period)
+                        continue
+                    if avail >= self.buffer_depth :
+                        gaps.overflows += 1
+                    n = min(avail, remaining, self.fetch_size)
+                    chunk = yield ("_fetch", n, True, binary)
+                    last = time.monotonic()
+                    gaps.add(chunk["timestamp"])
+                    remaining -= n
+                    yield ("chunk", chunk)
+            finally :
+                yield ("write", self._continuous(False))
+        except TimeoutError :
+            # Clear the errors and the responses still pending too
+            yield ("abort",)
+            raise
+
+    # ------------------------------------------------------------------------ #
+
+    def _continuous(self, on) :
+        '''
+        Method to build the program that turns the continuous mode on or off.
+
+        The shadow state is updated as if the program had been sent.
+
+        Returns:
+            The program.
+        '''
+        if self.state is not None :
+            self.state["INIT:CONT"] = "ON" if on else "OFF"
+        # ABORT alone would restart the measurement in continuous mode
+        return "INIT:CONT ON" if on else "INIT:CONT OFF;:ABORT"
+
+    # ------------------------------------------------------------------------ #
+
+    @traced
+    def time_interval(self, n_samples, tstamp=False, binary=False):
+        '''
+        Method to measure N samples of time interval between the input channels
+
+        Args:
+            n_samples (int) : Number of measures to be done
+            tstamp (bool) : Enable timestamp for each measure
+            binary (bool) : Transfer the samples in REAL format instead of ASCII
+
+        Returns:
+            A numpy array with the measure values (a structured array with the
+            fields "value" and "timestamp" if tstamp is set).
+
+        Raises:
+            ValueError if master_chan or slave_chan are not set or trigger level not set.
+            SCPI_error if the instrument reports errors.
+            TimeoutError if no sample arrives in drv.timeout + pps_period.
+        '''
+        return self._join(list(self.time_interval_stream(n_samples, tstamp, \
+        binary)), tstamp, binary)
+
+    # ------------------------------------------------------------------------ #
+
+    def _join(self, chunks, tstamp=False, binary=False) :
+        '''
+        Method to join the chunks of a time_interval_stream, see time_interval.
+        '''
+        if chunks :
+            return np.concatenate(chunks)
+        if binary :
+            return np.empty(0, REAL_TSTAMP if tstamp else REAL)
+        return np.empty(0, ASCII_TSTAMP if tstamp else np.float64)
@@ -0,0 +1,584 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+asyncio driver and measurement methods for the Tektronix FCA3103.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import os
+import asyncio
+import collections
+
+# User modules
+from FCA3103 import *
+
+class AsyncFCA3103_drv() :
+    '''
+    Tektronix FCA 3103 driver for asyncio.
+
+    The transport file descriptor is set non-blocking and registered in the
+    event loop while a response is awaited, so many instruments can be driven
+    from a single thread. It has the same API as FCA3103_drv, but its methods
+    are coroutines. Use open() to build it.
+
+    The usbtmc kernel driver only reports POLLIN for SRQs and blocks inside
+    read until the instrument answers, so transports with pollable = False
+    (Gen_usbtmc) are read in the loop's default executor. Those reads are
+    bounded by the transport timeout (set_timeout) instead of being
+    cancelled: a thread can't be stopped, and a read left running would take
+    the response to the next command.
+    '''
+
+    ## Maximum time to wait for a response (s)
+    timeout = 5.0
+    ## Size of each read when transferring data blocks (bytes)
+    chunk = 65536
+    ## Check the status byte at the sync points (see FCA3103_drv.check)
+    check_errors = True
+    ## Number of SYST:ERR? sent in each message when reading the error queue
+    error_batch = 8
+
+    def __init__(self, transport) :
+        '''
+        Constructor
+
+        Args:
+            transport : Gen_usbtmc, Sim_fca3103 or any object with the same
+                write, read and fileno methods.
+        '''
+        self.driver = transport
+        self.fd = transport.fileno()
+        self.pollable = getattr(transport, "pollable", True)
+        if self.pollable :
+            os.set_blocking(self.fd, False)
+        self.manufacturer = self.device = self.serial = None
+        # Only one command/response exchange at a time
+        self._lock = asyncio.Lock()
+        # Commands sent since the last check, for the error messages
+        self._sent = collections.deque(maxlen=8)
+        self._status_enabled = False
+        # Timeout set in the transport, and read running in the executor
+        self._drv_timeout = None
+        self._reading = None
+
+    # ------------------------------------------------------------------------ #
+
+    @classmethod
+    async def open(cls, port, transport=None) :
+        '''
+        Method to open an instrument and read its identification.
+
+        Args:
+            port (int) : Port index of usbtmc device (from 0 to 16)
+            transport : Use it instead of /dev/usbtmc<port> (e.g. Sim_fca3103).
+
+        Returns:
+            An AsyncFCA3103_drv.
+        '''
+        if transport is None :
+            transport = Gen_usbtmc(port)
+        drv = cls(transport)
+        info = (await drv.query("*IDN?")).split(",")
+        drv.manufacturer, drv.device, drv.serial = info[0], info[1], info[2]
+        return drv
+
+    # ------------------------------------------------------------------------ #
+
+    def deviceInfo(self) :
+        '''
+        Method to retrieve device information.
+
+        Returns:
+            A string with manufacturer, device name and serial number.
+        '''
+        return ("%s %s (s/n : %s)" % (self.manufacturer, self.device, self.serial))
+
+    # ------------------------------------------------------------------------ #
+
+    async def _wait(self, timeout) :
+        '''
+        Wait until the transport file descriptor is readable.
+        '''
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        loop.add_reader(self.fd, lambda : ready.done() or ready.set_result(None))
+        try :
+            await asyncio.wait_for(ready, timeout)
+        except asyncio.TimeoutError :
+            raise TimeoutError("FCA3103 ERROR: No response after %g s" % timeout)
+        finally :
+            loop.remove_reader(self.fd)
+
+    # ------------------------------------------------------------------------ #
+
+    async def read_response(self, timeout=None, length=None) :
+        '''
+        Method to read a whole response message from the instrument.
+
+        See FCA3103_drv.read_response.
+
+        Args:
+            timeout (float) : Maximum time to wait for each part of the
+                response (s). Default : self.timeout.
+            length (int) : Size of each read (bytes). Default : self.chunk.
+
+        Returns:
+            A bytearray with the response without the terminator.
+
+        Raises:
+            TimeoutError if the instrument doesn't answer in time.
+        '''
+        if timeout is None :
+            timeout = self.timeout
+        if length is None :
+            length = self.chunk
+        buf = bytearray()
+        missing = -1
+        while missing :
+            size = missing if missing > 0 else length
+            if not self.pollable :
+                data = await self._read(size, timeout)
+            else :
+                try :
+                    data = self.driver.read(size)
+                except BlockingIOError :
+                    await self._wait(timeout)
+                    continue
+            if not data :
+                raise IOError("FCA3103 ERROR: Connection closed")
+            buf += data
+            missing = missing_bytes(buf)
+
+        del buf[-1:]
+        return buf
+
+    # ------------------------------------------------------------------------ #
+
+    async def _read(self, size, timeout) :
+        '''
+        Read from a transport that can't be polled, in the default executor.
+        '''
+        if timeout != self._drv_timeout and hasattr(self.driver, "set_timeout") :
+            self.driver.set_timeout(timeout)
+            self._drv_timeout = timeout
+        self._reading = asyncio.get_running_loop().run_in_executor(None, \
+        self.driver.read, size)
+        try :
+            # If the task is cancelled the read goes on, see _send
+            data = await asyncio.shield(self._reading)
+        except TimeoutError :
+            raise TimeoutError("FCA3103 ERROR: No response after %g s" % timeout)
+        finally :
+            if self._reading.done() :
+                self._reading = None
+        return data
+
+    # ------------------------------------------------------------------------ #
+
+    async def write(self, cmd, check=False) :
+        '''
+        Method for writing to input buffer of the instrument.
+
+        Args:
+            cmd (str) : A SCPI valid command for the device.
+            check (boolean) : Check the errors of the command, see check.
+        '''
+        if check :
+            await self.check(cmd)
+            return
+        async with self._lock :
+            await self._send(cmd)
+
+    # ------------------------------------------------------------------------ #
+
+    async def _send(self, cmd) :
+        '''
+        Write a command, with the lock held.
+
+        A read of a cancelled task still running in the executor is waited
+        for first, its data belong to the cancelled exchange.
+        '''
+        if self._reading is not None :
+            await asyncio.wait([self._reading])
+            self._reading = None
+        self._sent.append(cmd)
+        self.driver.write(str.encode(cmd))
+
+    # ------------------------------------------------------------------------ #
+
+    async def query(self, cmd, timeout=None) :
+        '''
+        Method to write a command and read the result.
+
+        Args:
+            cmd (str) :  A SCPI valid command for the device.
+            timeout (float) : Maximum time to wait for each part of the
+                response (s). Default : self.timeout.
+
+        Returns:
+            Command "cmd" response.
+        '''
+        async with self._lock :
+            await self._send(cmd)
+            return (await self.read_response(timeout)).decode()
+
+    # ------------------------------------------------------------------------ #
+
+    async def query_raw(self, cmd, timeout=None) :
+        '''
+        Method to write a command and read the result without decoding it.
+
+        Returns:
+            A bytearray with the response without the terminator.
+        '''
+        async with self._lock :
+            await self._send(cmd)
+            return await self.read_response(timeout)
+
+    # ------------------------------------------------------------------------ #
+
+    async def query_block(self, cmd, timeout=None) :
+        '''
+        Method to write a command and read its definite length block response.
+
+        Returns:
+            A bytearray with the block, header included.
+
+        Raises:
+            ValueError if the response is not a definite length block.
+        '''
+        async with self._lock :
+            await self._send(cmd)
+            buf = await self.read_response(timeout)
+        if not is_block(buf) :
+            raise ValueError("FCA3103 ERROR: Not a definite length block: %r" % \
+            bytes(buf[:20]))
+        return buf
+
+    # ------------------------------------------------------------------------ #
+
+    async def sync(self, timeout=None) :
+        '''
+        Method to wait until all the previous commands have been executed.
+
+        See FCA3103_drv.sync.
+        '''
+        if self.check_errors :
+            await self.check("*OPC?", timeout)
+        else :
+            await self.query("*OPC?", timeout)
+
+    # ------------------------------------------------------------------------ #
+
+    async def check(self, cmd=None, timeout=None) :
+        '''
+        Method to check if the previous commands caused errors.
+
+        See FCA3103_drv.check.
+        '''
+        enable = not self._status_enabled
+        self._status_enabled = True
+        commands = list(self._sent)
+        if cmd is not None :
+            commands.append(cmd)
+        reply = await self.query(status_program(cmd, enable), timeout)
+        self._sent.clear()
+        if status_errors(reply) :
+            esr, errors = await self.errors()
+            raise scpi_error(errors, commands, esr)
+
+    # ------------------------------------------------------------------------ #
+
+    async def abort(self) :
+        '''
+        Method to abort the measurement and clear the errors.
+
+        See FCA3103_drv.abort.
+        '''
+        async with self._lock :
+            await self._send(ABORT_CLEAR)
+            while await self.read_response() != b"1" :
+                pass
+
+    # ------------------------------------------------------------------------ #
+
+    async def errors(self) :
+        '''
+        Method to read and clear the event status register and the error queue.
+
+        See FCA3103_drv.errors.
+        '''
+        esr, errors, more = parse_errors_batch(await self.query(errors_program( \
+        self.error_batch, esr=True)), self.error_batch, esr=True)
+        while more :
+            _, batch, more = parse_errors_batch(await self.query(errors_program( \
+            self.error_batch)), self.error_batch)
+            errors.extend(batch)
+        self._sent.clear()
+        return (esr, errors)
+
+
+class AsyncFCA3103(FCA3103) :
+    '''
+    FCA3103 measurement methods for asyncio.
+
+    The measurement methods and configure are coroutines (or async
+    generators, for the streams) with the same arguments and results as in
+    FCA3103. The settings, the decoding of the responses, the trigger level
+    search and the measurement procedures (see FCA3103._run) are shared with
+    it, only the I/O differs. Use open() to build it.
+    '''
+
+    @classmethod
+    async def open(cls, port, master_chan=None, slave_chan=None, transport=None, \
+    trig_cache=True) :
+        '''
+        Method to open an instrument.
+
+        Args:
+            port (int) : Port for the Tektronix FCA3103 using the USB connection.
+            master_chan (int) : Input channel for master's PPS signal.
+            slave_chan (int) : Input channel for slave's PPS signal.
+            transport : Use it instead of /dev/usbtmc<port> (e.g. Sim_fca3103).
+            trig_cache : Trigger_cache to use. True uses the default one,
+                None disables it.
+
+        Returns:
+            An AsyncFCA3103.
+        '''
+        drv = await AsyncFCA3103_drv.open(port, transport)
+        return cls(port, master_chan, slave_chan, trig_cache=trig_cache, drv=drv)
+
+    # ------------------------------------------------------------------------ #
+
+    async def configure(self, settings) :
+        '''
+        Method to apply a configuration to the instrument, see FCA3103.configure.
+        '''
+        program = self._program(settings)
+        if program is None :
+            return False
+
+        try :
+            await self.drv.write(program, check=True)
+        except SCPI_error :
+            self.state = None
+            raise
+        return True
+
+    # ------------------------------------------------------------------------ #
+
+    async def _fetch(self, n, tstamp=False, binary=False, timeout=None) :
+        '''
+        Method to read n samples from the output buffer of the instrument.
+        '''
+        if binary :
+            cur = await self.drv.query_block("FETCH:ARR? %d" % n, timeout)
+        else :
+            cur = await self.drv.query_raw("FETCH:ARR? %d" % n, timeout)
+        return self._decode(cur, n, tstamp, binary)
+
+    # ------------------------------------------------------------------------ #
+
+    async def _level_mean(self, level) :
+        '''
+        Method to measure the mean time interval for a trigger level.
+
+        See FCA3103._level_mean.
+        '''
+        if self.interrupt is not None :
+            self.interrupt()
+        await self.configure(self.settings(self.n_samples, levels=(level, level)))
+        await self.drv.write("INIT")
+        try :
+            values = await self._fetch(self.n_samples, \
+            timeout=self.drv.timeout + self.n_samples * self.pps_period)
+        except TimeoutError :
+            # The FETCH left an error (-230) in the queue and its response
+            # could still come: clear both before the next command
+            await self.drv.abort()
+            return self._level_result(level, math.inf)
+        return self._level_result(level, sum(values) / len(values))
+
+    # ------------------------------------------------------------------------ #
+
+    async def trigger_level(self, v_min=0, v_max=5, coarse=0.5, resolution=0.01) :
+        '''
+        Method to determine a good trigger level for a input channel.
+
+        See FCA3103.trigger_level.
+        '''
+        self._check_channels(trigger=False)
+
+        if self.show_dbg :
+            print("Testing trigger level values ...")
+
+        search = level_search(v_min, v_max, coarse, resolution)
+        try :
+            level = next(search)
+            while True :
+                level = search.send(await self._level_mean(level))
+        except StopIteration as stop :
+            return self._set_trigger(stop.value)
+
+    # ------------------------------------------------------------------------ #
+
+    async def check_trigger_level(self, tolerance=50e-12, v_min=0, v_max=5) :
+        '''
+        Method to ensure that the trigger level is still good, sweeping only if needed.
+
+        See FCA3103.check_trigger_level.
+        '''
+        spot = self._spot_level()
+        if spot is not None :
+            if abs(await self._level_mean(spot[0]) - spot[1]) <= tolerance :
+                return False
+            if self.show_dbg :
+                print("Trigger level %f drifted, sweeping again." % (spot[0]))
+        await self.trigger_level(v_min, v_max)
+        return True
+
+    # ------------------------------------------------------------------------ #
+
+    async def _run(self, procedure) :
+        '''
+        Async generator to run a measurement procedure, see FCA3103._run.
+
+        The result of the procedure is dropped: async generators can't
+        return a value, use _call for the procedures that return one.
+        '''
+        step, value = procedure.send, None
+        while True :
+            try :
+                op, *args = step(value)
+            except StopIteration :
+                return
+            step = procedure.send
+            try :
+                if op == "chunk" :
+                    value = yield args[0]
+                else :
+                    value = await self._execute(op, args)
+            except BaseException as e :
+                step, value = procedure.throw, e
+
+    # ------------------------------------------------------------------------ #
+
+    async def _call(self, procedure) :
+        '''
+        Method to run a procedure that yields no chunks, see FCA3103._run.
+
+        Returns:
+            The result of the procedure.
+        '''
+        step, value = procedure.send, None
+        while True :
+            try :
+                op, *args = step(value)
+            except StopIteration as stop :
+                return stop.value
+            step = procedure.send
+            try :
+                value = await self._execute(op, args)
+            except BaseException as e :
+                step, value = procedure.throw, e
+
+    # ------------------------------------------------------------------------ #
+
+    async def _execute(self, op, args) :
+        '''
+        Method to do an operation of a procedure, see FCA3103._run.
+        '''
+        if self.interrupt is not None :
+            self.interrupt()
+        if op == "sleep" :
+            return await asyncio.sleep(*args)
+        if op in ("configure", "_fetch") :
+            return await getattr(self, op)(*args)
+        return await getattr(self.drv, op)(*args)
+
+    # ------------------------------------------------------------------------ #
+
+    async def statistics(self, n_samples) :
+        '''
+        Method to measure N samples and get their statistics from the instrument.
+
+        See FCA3103.statistics.
+        '''
+        return await self._call(self._statistics_procedure(n_samples))
+
+    # ------------------------------------------------------------------------ #
+
+    async def mean_time_interval(self, n_samples, t_samples, device_stats=False) :
+        '''
+        Method to measure time interval between two input signals.
+
+        See FCA3103.mean_time_interval.
+        '''
+        return await self._call(self._mean_procedure(n_samples, t_samples, \
+        device_stats))
+
+    # ------------------------------------------------------------------------ #
+
+    async def mean_time_interval_ci(self, n_samples, t_samples, ci=2e-12, confidence=0.95, \
+    min_samples=10) :
+        '''
+        Method to measure the mean time interval until it is known with a precision.
+
+        See FCA3103.mean_time_interval_ci.
+        '''
+        return await self._call(self._mean_ci_procedure(n_samples, t_samples, ci, \
+        confidence, min_samples))
+
+    # ------------------------------------------------------------------------ #
+
+    def time_interval_stream(self, n_samples, tstamp=False, binary=False) :
+        '''
+        Async generator to measure N samples of time interval between the input channels.
+
+        See FCA3103.time_interval_stream.
+        '''
+        return self._run(self._stream_procedure(n_samples, tstamp, binary))
+
+    # ------------------------------------------------------------------------ #
+
+    def continuous_stream(self, binary=True, n_samples=None, gaps=None) :
+        '''
+        Async generator to measure time interval continuously, without re-arming.
+
+        See FCA3103.continuous_stream.
+        '''
+        return self._run(self._continuous_procedure(binary, n_samples, gaps))
+
+    # ------------------------------------------------------------------------ #
+
+    async def time_interval(self, n_samples, tstamp=False, binary=False) :
+        '''
+        Method to measure N samples of time interval between the input channels.
+
+        See FCA3103.time_interval.
+        '''
+        return self._join([chunk async for chunk in \
+        self.time_interval_stream(n_samples, tstamp, binary)], tstamp, binary)
@@ -33,6 +33,11 @@ import abc
 # This attribute permits dynamic loading inside wrcalibration class.
 __meas_instr__ = "Calibration Instrument"
 
+class MeasureError(Exception) :
+    '''
+    A measured value is far from the expected one.
+    '''
+
 class Calibration_instrument() :
     '''
     Calibration instrument API
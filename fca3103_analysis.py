@@ -0,0 +1,202 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Frequency stability analysis (ADEV, MDEV, TDEV, MTIE) of time interval series.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import numpy as np
+
+
+def phase(data) :
+    '''
+    Function to get the phase (time interval) series of a capture.
+
+    Args:
+        data : Samples, as returned by FCA3103.time_interval, a capture run
+            (fca3103_capture.Run.data) or any array. For structured arrays the
+            field "value" is used.
+
+    Returns:
+        A float64 numpy array. Memory maps of little endian doubles are not
+        copied.
+    '''
+    data = np.asarray(data)
+    if data.dtype.names is not None :
+        data = data["value"]
+    return np.asarray(data, np.float64)
+
+
+def octave_taus(n, max_factor) :
+    '''
+    Function to get the octave averaging factors for a series.
+
+    Args:
+        n (int) : Number of samples.
+        max_factor (int) : Number of samples spanned by each estimate per
+            averaging factor m (2 for ADEV, 3 for MDEV and TDEV, 1 for MTIE).
+
+    Returns:
+        An array with 1, 2, 4, ... while there are enough samples.
+    '''
+    m = []
+    k = 1
+    while max_factor * k < n :
+        m.append(k)
+        k *= 2
+    return np.array(m, np.int64)
+
+
+def _check(x, m, max_factor) :
+    if m is None :
+        m = octave_taus(len(x), max_factor)
+    m = np.asarray(m, np.int64)
+    if len(m) == 0 or np.any(m < 1) or np.any(max_factor * m >= len(x)) :
+        raise ValueError("FCA3103 ERROR: Not enough samples (%d) for the averaging factors" % len(x))
+    return m
+
+
+def adev(data, tau0=1.0, m=None) :
+    '''
+    Function to compute the overlapping Allan deviation.
+
+    Args:
+        data : Phase samples (s), see phase().
+        tau0 (float) : Time between samples (s).
+        m (list) : Averaging factors. Default : octave_taus(n, 2).
+
+    Returns:
+        A tuple (tau, adev) of numpy arrays.
+
+    Raises:
+        ValueError if there are not enough samples.
+    '''
+    x = phase(data)
+    m = _check(x, m, 2)
+    dev = np.empty(len(m))
+    for k, mk in enumerate(m) :
+        d = x[2*mk:] - 2 * x[mk:-mk] + x[:-2*mk]
+        dev[k] = np.sqrt(np.dot(d, d) / (2 * len(d))) / (mk * tau0)
+    return (m * tau0, dev)
+
+
+def mdev(data, tau0=1.0, m=None) :
+    '''
+    Function to compute the modified Allan deviation.
+
+    The inner sums of second differences are computed for all the positions
+    at once as differences of a cumulative sum.
+
+    Args:
+        data : Phase samples (s), see phase().
+        tau0 (float) : Time between samples (s).
+        m (list) : Averaging factors. Default : octave_taus(n, 3).
+
+    Returns:
+        A tuple (tau, mdev) of numpy arrays.
+
+    Raises:
+        ValueError if there are not enough samples.
+    '''
+    x = phase(data)
+    m = _check(x, m, 3)
+    dev = np.empty(len(m))
+    for k, mk in enumerate(m) :
+        d = x[2*mk:] - 2 * x[mk:-mk] + x[:-2*mk]
+        s = np.concatenate(([0.0], np.cumsum(d)))
+        v = s[mk:] - s[:-mk]
+        dev[k] = np.sqrt(np.dot(v, v) / (2 * len(v))) / (mk * mk * tau0)
+    return (m * tau0, dev)
+
+
+def tdev(data, tau0=1.0, m=None) :
+    '''
+    Function to compute the time deviation, tau / sqrt(3) * MDEV.
+
+    Returns:
+        A tuple (tau, tdev) of numpy arrays, see mdev.
+    '''
+    tau, dev = mdev(data, tau0, m)
+    return (tau, tau * dev / np.sqrt(3))
+
+
+def mtie(data, tau0=1.0) :
+    '''
+    Function to compute the maximum time interval error for the octave taus.
+
+    The maximum and minimum of every window of 2^k + 1 samples are computed
+    from the ones of the windows of 2^(k-1) samples, so all the taus cost
+    O(n log n).
+
+    Args:
+        data : Phase samples (s), see phase().
+        tau0 (float) : Time between samples (s).
+
+    Returns:
+        A tuple (tau, mtie) of numpy arrays.
+
+    Raises:
+        ValueError if there are not enough samples.
+    '''
+    x = phase(data)
+    m = _check(x, None, 1)
+    dev = np.empty(len(m))
+    # Maximum and minimum of x[i:i+w] for the current window size w
+    hi = lo = x
+    w = 1
+    for k, mk in enumerate(m) :
+        while w < mk :
+            hi = np.maximum(hi[:-w], hi[w:])
+            lo = np.minimum(lo[:-w], lo[w:])
+            w *= 2
+        # Windows of mk + 1 samples
+        dev[k] = np.max(np.maximum(hi[:-1], hi[1:]) - np.minimum(lo[:-1], lo[1:]))
+    return (m * tau0, dev)
+
+
+def analyze(data, tau0=1.0) :
+    '''
+    Function to compute ADEV, MDEV, TDEV and MTIE over the octave taus.
+
+    Args:
+        data : Phase samples (s), see phase().
+        tau0 (float) : Time between samples (s).
+
+    Returns:
+        A dict with the arrays "tau" and "adev", "mdev", "tdev", "mtie". The
+        deviations are nan for the taus with not enough samples.
+    '''
+    x = phase(data)
+    tau = octave_taus(len(x), 1)
+    result = {"tau" : tau * tau0}
+    for name, func, max_factor in (("adev", adev, 2), ("mdev", mdev, 3), \
+    ("tdev", tdev, 3)) :
+        dev = np.full(len(tau), np.nan)
+        m = tau[max_factor * tau < len(x)]
+        if len(m) :
+            dev[:len(m)] = func(x, tau0, m)[1]
+        result[name] = dev
+    result["mtie"] = mtie(x, tau0)[1] if len(tau) else np.empty(0)
+    return result
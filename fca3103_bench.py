@@ -0,0 +1,246 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Benchmarks of the FCA3103 driver, response parsing and acquisition modes.
+
+Run it with the simulated instrument (no hardware needed):
+
+    python3 fca3103_bench.py -o bench.json
+    python3 fca3103_bench.py -o new.json --compare bench.json
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import sys
+import json
+import time
+import platform
+import datetime
+import tracemalloc
+import argparse as arg
+import numpy as np
+
+# User modules
+from FCA3103 import *
+from sim_fca3103 import Sim_fca3103
+
+## Acquisition modes: name -> (function, tstamp, binary)
+MODES = {
+    "mtint" : ("mtint", False, False),
+    "tint" : ("tint", False, False),
+    "tint-tstamp" : ("tint", True, False),
+    "tint-binary" : ("tint", False, True),
+    "tint-binary-tstamp" : ("tint", True, True),
+    "decode" : ("decode", False, False),
+    "decode-tstamp" : ("decode", True, False),
+    "decode-binary" : ("decode", False, True),
+    "decode-binary-tstamp" : ("decode", True, True),
+}
+## Default capture sizes
+SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+
+
+def latencies(sink) :
+    '''
+    Function to summarize the latencies recorded by a Histogram_sink.
+
+    Returns:
+        A dict "kind name" -> dict with n, mean, p50, p90 and p99 (s). The
+        quantiles are the upper bounds of the histogram buckets.
+    '''
+    return dict(("%s %s" % (r["kind"], r["name"]), {"n" : r["count"], \
+    "mean" : r["mean"], "p50" : r["p50"], "p90" : r["p90"], "p99" : r["p99"]}) \
+    for r in sorted(sink.summary(), key=lambda r : (r["kind"], r["name"])))
+
+
+def open_sim(latency=0.0) :
+    '''
+    Function to open a FCA3103 connected to an unthrottled simulated instrument.
+
+    Args:
+        latency (float) : Simulated instrument latency for each query (s).
+
+    Returns:
+        A FCA3103.
+    '''
+    sim = Sim_fca3103(time_scale=0, latency=latency, seed=1)
+    device = FCA3103(1, 1, 2, transport=sim, trig_cache=None)
+    device.trig_level[0] = device.trig_level[1] = 1.5
+    device.pps_period = 0.001
+    return device
+
+
+def response(n, tstamp=False, binary=False) :
+    '''
+    Function to build a FETCH:ARR? response like the instrument ones.
+    '''
+    values = np.random.default_rng(1).normal(1e-9, 20e-12, n)
+    if tstamp :
+        values = np.column_stack((values, np.arange(1, n+1, dtype=float))).ravel()
+    if binary :
+        data = values.astype(REAL).tobytes()
+        size = str(len(data))
+        return bytearray(("#%d%s" % (len(size), size)).encode("ascii") + data)
+    return ",".join(["%+.11E" % v for v in values])
+
+
+def run(device, mode, n, buf=None) :
+    '''
+    Function to run a benchmark once.
+
+    Args:
+        device (FCA3103) : Instrument, see open_sim.
+        mode (str) : A key of MODES.
+        n (int) : Number of samples.
+        buf : Response to parse in the decode modes, see response().
+    '''
+    function, tstamp, binary = MODES[mode]
+    if function == "mtint" :
+        device.mean_time_interval(n, 0)
+    elif function == "tint" :
+        device.time_interval(n, tstamp, binary)
+    else :
+        device._decode(buf, n, tstamp, binary)
+
+
+def bench(mode, n, latency=0.0) :
+    '''
+    Function to benchmark an acquisition mode with a capture size.
+
+    The capture is run three times, each time with a new simulated
+    instrument: the first one for the timings, the second one with a
+    Histogram_sink for the latency of every driver operation (so its cost
+    isn't in the timings) and the third one with tracemalloc for the memory
+    peak.
+
+    Args:
+        mode (str) : A key of MODES.
+        n (int) : Number of samples.
+        latency (float) : Simulated instrument latency for each query (s).
+
+    Returns:
+        A dict with the results.
+    '''
+    function, tstamp, binary = MODES[mode]
+    result = {"mode" : mode, "samples" : n}
+    # The response is built outside the timed section
+    buf = response(n, tstamp, binary) if function == "decode" else None
+
+    for step in ("timing", "latency", "memory") :
+        device = open_sim(latency)
+        try :
+            if function != "decode" :
+                # Setup: the whole configuration after a reset
+                t = time.perf_counter()
+                if function == "mtint" :
+                    device.configure(device.settings(levels=device.trig_level))
+                else :
+                    device.configure(device.settings(n, tstamp, device.trig_level, binary))
+                if step == "timing" :
+                    result["setup_s"] = time.perf_counter() - t
+            if step == "latency" :
+                sink = Histogram_sink()
+                device.drv.sinks.append(sink)
+            elif step == "memory" :
+                tracemalloc.start()
+            t = time.perf_counter()
+            run(device, mode, n, buf)
+            elapsed = time.perf_counter() - t
+            if step == "timing" :
+                result["seconds"] = elapsed
+                result["samples_per_s"] = n / elapsed if elapsed > 0 else math.inf
+            elif step == "latency" :
+                result["latency"] = latencies(sink)
+            else :
+                result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally :
+            if step == "memory" :
+                tracemalloc.stop()
+            device.drv.driver.close()
+    return result
+
+
+def compare(results, old) :
+    '''
+    Function to print the throughput of a run relative to a previous one.
+    '''
+    ref = dict(((r["mode"], r["samples"]), r) for r in old["results"])
+    print("%-22s %9s %14s %14s %8s" % ("mode", "samples", "samples/s", "before", "ratio"))
+    for r in results :
+        o = ref.get((r["mode"], r["samples"]))
+        if o is None :
+            continue
+        print("%-22s %9d %14.1f %14.1f %8.2f" % (r["mode"], r["samples"], \
+        r["samples_per_s"], o["samples_per_s"], r["samples_per_s"] / o["samples_per_s"]))
+
+
+def main() :
+    '''
+    Run the benchmarks and save the results as JSON
+    '''
+    parser = arg.ArgumentParser(description='Tektronix FCA3103 benchmarks')
+
+    parser.add_argument('--modes', '-m', help='Modes to run (default: all)', nargs='+', \
+    choices=list(MODES), default=list(MODES))
+    parser.add_argument('--sizes', '-s', help='Capture sizes', type=int, nargs='+', \
+    default=SIZES)
+    parser.add_argument('--max-roundtrips', help='Largest mtint size (a query per sample)', \
+    type=int, default=10000)
+    parser.add_argument('--latency', '-L', help='Simulated instrument latency (s)', \
+    type=float, default=0.0)
+    parser.add_argument('--output', '-o', help='Output JSON file', type=str)
+    parser.add_argument('--compare', '-c', help='Previous results to compare with', type=str)
+
+    args = parser.parse_args()
+
+    results = []
+    for mode in args.modes:
+        for n in args.sizes:
+            if mode == "mtint" and n > args.max_roundtrips:
+                continue
+            r = bench(mode, n, args.latency)
+            results.append(r)
+            setup = "%8.3f ms" % (r["setup_s"] * 1e3) if "setup_s" in r else "%8s   " % "-"
+            print("%-22s %9d %12.1f samples/s  setup %s  peak %10d B" % (mode, n, \
+            r["samples_per_s"], setup, r["peak_bytes"]))
+            sys.stdout.flush()
+
+    report = {
+        "date" : datetime.datetime.now().isoformat(),
+        "python" : platform.python_version(),
+        "numpy" : np.__version__,
+        "machine" : platform.machine(),
+        "latency" : args.latency,
+        "results" : results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+        print("Results writed to '%s'" % (args.output))
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__" :
+    main()
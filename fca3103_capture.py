@@ -0,0 +1,377 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Binary capture files for the time interval measures of the Tektronix FCA3103.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import os
+import math
+import mmap
+import json
+import time
+import uuid
+import struct
+import numpy as np
+
+## Magic number at the start of each run
+MAGIC = b"FCA3103C"
+## Version of the file format
+VERSION = 1
+## Run header: magic, version, flags, metadata length, number of records
+HEADER = struct.Struct("<8sHHIQ")
+## Flag of the runs with (value, timestamp) records
+FLAG_TSTAMP = 0x1
+## Record count of a run that wasn't closed (the writer crashed)
+OPEN = 0xffffffffffffffff
+## Record type of the runs without timestamp (little endian double)
+CAPTURE = np.dtype("<f8")
+## Record type of the runs with timestamp
+CAPTURE_TSTAMP = np.dtype([("value", "<f8"), ("timestamp", "<f8")])
+
+
+def metadata(device, n_samples, tstamp=False, **extra) :
+    '''
+    Function to build the metadata of a run.
+
+    Args:
+        device (FCA3103) : Instrument used.
+        n_samples (int) : Number of samples requested.
+        tstamp (bool) : The samples have timestamp.
+        extra : Other items to store.
+
+    Returns:
+        A dict with the serial number, channels, trigger levels, start time
+        (Unix time), sample period and a unique run id.
+    '''
+    meta = {
+        "run_id" : uuid.uuid4().hex,
+        "start" : time.time(),
+        "manufacturer" : device.drv.manufacturer,
+        "device" : device.drv.device,
+        "serial" : device.drv.serial,
+        "master_chan" : device.master_chan,
+        "slave_chan" : device.slave_chan,
+        "trig_level" : list(device.trig_level),
+        "samples" : n_samples,
+        "tstamp" : tstamp,
+        "pps_period" : device.pps_period,
+    }
+    meta.update(extra)
+    return meta
+
+
+def _open_end(f, start, size) :
+    '''
+    End of a run left open by a crashed writer: the next run header, if a run
+    was appended after the crash, or the end of the file.
+    '''
+    if start >= size :
+        return size
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data :
+        pos = data.find(MAGIC, start)
+        while pos >= 0 :
+            if pos + HEADER.size <= size :
+                version = HEADER.unpack_from(data, pos)[1]
+                if 1 <= version <= VERSION :
+                    return pos
+            pos = data.find(MAGIC, pos + 1)
+    return size
+
+
+def runs(path) :
+    '''
+    Function to walk the run headers of a capture file.
+
+    Args:
+        path (str) : Capture file.
+
+    Yields:
+        (header offset, flags, metadata (bytes), records offset, record count,
+        end offset) tuples. The count of a run left open is OPEN, its records
+        go up to the end offset.
+
+    Raises:
+        ValueError if the file is not a capture file.
+    '''
+    size = os.path.getsize(path)
+    with open(path, "rb") as f :
+        offset = 0
+        while offset + HEADER.size <= size :
+            f.seek(offset)
+            magic, version, flags, meta_len, count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version > VERSION :
+                raise ValueError("FCA3103 ERROR: Not a capture file (run at %d)" % offset)
+            meta = f.read(meta_len)
+            start = offset + HEADER.size + meta_len
+            if start > size :
+                # Header of a run whose writer crashed at once
+                return
+            dtype = CAPTURE_TSTAMP if flags & FLAG_TSTAMP else CAPTURE
+            if count == OPEN :
+                end = _open_end(f, start, size)
+            else :
+                end = start + count * dtype.itemsize
+            yield (offset, flags, meta, start, count, end)
+            offset = end
+
+
+def repair(path) :
+    '''
+    Function to close the run left open at the end of a capture file.
+
+    Its partial record (or an incomplete run header) is removed and its record
+    count is written, so new runs can be appended after it. Open runs
+    followed by other runs are left as they are, the reader finds their end.
+
+    Returns:
+        True if the file was changed.
+
+    Raises:
+        ValueError if the file is not a capture file.
+    '''
+    if not os.path.exists(path) :
+        return False
+    size = os.path.getsize(path)
+    end = 0
+    last = None
+    for last in runs(path) :
+        end = last[5]
+    if last is not None and last[4] == OPEN :
+        offset, flags, meta, start, count, end = last
+        itemsize = (CAPTURE_TSTAMP if flags & FLAG_TSTAMP else CAPTURE).itemsize
+        count = (end - start) // itemsize
+        end = start + count * itemsize
+        with open(path, "r+b") as f :
+            f.truncate(end)
+            f.seek(offset + HEADER.size - 8)
+            f.write(struct.pack("<Q", count))
+        return True
+    if end < size :
+        with open(path, "r+b") as f :
+            f.truncate(end)
+        return True
+    return False
+
+
+class Capture_writer() :
+    '''
+    Writer of a run at the end of a capture file.
+
+    A capture file is a sequence of runs. Each run has a fixed size header
+    (HEADER), its metadata as JSON padded to 8 bytes, and the records:
+    little endian doubles, or (value, timestamp) pairs of doubles when the
+    run has timestamps. The record count in the header is written when the
+    run is closed; a run left open by a crash is read up to the end of the
+    file, and closed (see repair) before a new run is appended.
+    '''
+
+    def __init__(self, path, meta, tstamp=False) :
+        '''
+        Constructor
+
+        Args:
+            path (str) : Capture file, created if it doesn't exist.
+            meta (dict) : Run metadata, see metadata().
+            tstamp (bool) : The samples have timestamp.
+
+        Raises:
+            ValueError if the file exists and is not a capture file.
+        '''
+        self.dtype = CAPTURE_TSTAMP if tstamp else CAPTURE
+        ## Number of records written
+        self.count = 0
+        repair(path)
+        raw = json.dumps(meta).encode()
+        raw += b" " * (-(HEADER.size + len(raw)) % 8)
+        self.file = open(path, "ab")
+        ## Offset of the run header
+        self.offset = self.file.tell()
+        self.file.write(HEADER.pack(MAGIC, VERSION, FLAG_TSTAMP if tstamp else 0, \
+        len(raw), OPEN))
+        self.file.write(raw)
+        self.file.flush()
+
+    # ------------------------------------------------------------------------ #
+
+    def write(self, values) :
+        '''
+        Method to append samples to the run.
+
+        Args:
+            values : A chunk yielded by FCA3103.time_interval_stream (a list of
+                values or (value, timestamp) tuples, or a numpy array).
+        '''
+        data = np.asarray(values)
+        if data.dtype != self.dtype :
+            data = np.asarray(values, self.dtype) if data.dtype.names is None \
+            else data.astype(self.dtype)
+        self.file.write(data.tobytes())
+        self.file.flush()
+        self.count += len(data)
+
+    # ------------------------------------------------------------------------ #
+
+    def close(self) :
+        '''
+        Method to write the record count and close the file.
+        '''
+        if self.file.closed :
+            return
+        self.file.close()
+        with open(self.file.name, "r+b") as f :
+            f.seek(self.offset + HEADER.size - 8)
+            f.write(struct.pack("<Q", self.count))
+
+    # ------------------------------------------------------------------------ #
+
+    def __enter__(self) :
+        return self
+
+    def __exit__(self, *exc) :
+        self.close()
+
+
+class Run() :
+    '''
+    A run of a capture file.
+    '''
+
+    def __init__(self, path, offset, meta, dtype, count) :
+        ## Capture file
+        self.path = path
+        ## Offset of the records in the file
+        self.offset = offset
+        ## Metadata, see metadata()
+        self.meta = meta
+        ## Record type
+        self.dtype = dtype
+        ## Number of records
+        self.count = count
+
+    # ------------------------------------------------------------------------ #
+
+    def data(self) :
+        '''
+        Method to map the records of the run.
+
+        Returns:
+            A read only numpy.memmap (a structured array with the fields
+            "value" and "timestamp" if the run has timestamps).
+        '''
+        if self.count == 0 :
+            return np.empty(0, self.dtype)
+        return np.memmap(self.path, self.dtype, "r", self.offset, (self.count,))
+
+    # ------------------------------------------------------------------------ #
+
+    def times(self) :
+        '''
+        Method to get the Unix time of each record.
+
+        It's computed from the start time and the instrument timestamps, or
+        from the sample period if the run has no timestamps.
+        '''
+        data = self.data()
+        if self.dtype.names is not None :
+            return self.meta["start"] + data["timestamp"]
+        return self.meta["start"] + np.arange(self.count) * self.meta["pps_period"]
+
+    # ------------------------------------------------------------------------ #
+
+    def time_slice(self, t_start=None, t_end=None) :
+        '''
+        Method to get the records taken in a time range without reading the others.
+
+        Args:
+            t_start (float) : Start of the range (Unix time), included.
+            t_end (float) : End of the range (Unix time), excluded.
+
+        Returns:
+            A view of data() with the records in the range.
+        '''
+        data = self.data()
+        start = self.meta["start"]
+        if self.dtype.names is not None :
+            # The timestamps are sorted, the search only touches a few pages
+            ts = data["timestamp"]
+            i = 0 if t_start is None else np.searchsorted(ts, t_start - start)
+            j = self.count if t_end is None else np.searchsorted(ts, t_end - start)
+        else :
+            period = self.meta["pps_period"]
+            i = 0 if t_start is None else max(0, int(math.ceil((t_start - start) / period)))
+            j = self.count if t_end is None else \
+            min(self.count, max(0, int(math.ceil((t_end - start) / period))))
+        return data[i:j]
+
+
+class Capture_file() :
+    '''
+    Reader of a capture file, see Capture_writer.
+
+    Only the run headers are read to build the run index, the records are
+    mapped on demand.
+    '''
+
+    def __init__(self, path) :
+        '''
+        Constructor
+
+        Args:
+            path (str) : Capture file.
+
+        Raises:
+            ValueError if the file is not a capture file.
+        '''
+        self.path = path
+        ## Index of the runs in the file
+        self.runs = []
+        for offset, flags, meta, start, count, end in runs(path) :
+            dtype = CAPTURE_TSTAMP if flags & FLAG_TSTAMP else CAPTURE
+            if count == OPEN :
+                count = (end - start) // dtype.itemsize
+            self.runs.append(Run(path, start, json.loads(meta), dtype, count))
+
+    # ------------------------------------------------------------------------ #
+
+    def __len__(self) :
+        return len(self.runs)
+
+    def __getitem__(self, i) :
+        return self.runs[i]
+
+    # ------------------------------------------------------------------------ #
+
+    def find(self, run_id) :
+        '''
+        Method to get a run from its id.
+
+        Returns:
+            The Run or None if it isn't in the file.
+        '''
+        for run in self.runs :
+            if run.meta.get("run_id") == run_id :
+                return run
+        return None
@@ -0,0 +1,260 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Client of the FCA3103 measurement daemon (fca3103_daemon)
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+'''
+
+# ----------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                         |
+#                 ------------------------------------                        |
+# This source file is free software; you can redistribute it and/or modify it |
+# under the terms of the GNU Lesser General Public License as published by the|
+# Free Software Foundation; either version 2.1 of the License, or (at your    |
+# option) any later version. This source is distributed in the hope that it   |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant  |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser  |
+# General Public License for more details. You should have received a copy of |
+# the GNU Lesser General Public License along with this  source; if not,      |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                  |
+# ----------------------------------------------------------------------------|
+
+# -----------------------------------------------------------------------------
+#                                   Import                                   --
+# -----------------------------------------------------------------------------
+import json
+import socket
+import datetime
+import argparse as arg
+
+from calibration_instrument import MeasureError
+from tektronix_fca3103_drv import SCPI_error, Command_error, Execution_error, \
+Device_error, Query_error
+from fca3103_daemon import socket_path
+from running_stats import t_factor
+
+## Exceptions raised for the error types reported by the daemon
+ERRORS = {
+    "ValueError" : ValueError,
+    "TimeoutError" : TimeoutError,
+    "MeasureError" : MeasureError,
+    "NotImplementedError" : NotImplementedError,
+    "SCPI_error" : SCPI_error,
+    "Command_error" : Command_error,
+    "Execution_error" : Execution_error,
+    "Device_error" : Device_error,
+    "Query_error" : Query_error,
+}
+
+
+class FCA3103_client() :
+    '''
+    Connection to a FCA3103 daemon.
+
+    Requests from several clients are queued by the daemon, so a request may
+    wait for the ones sent before it.
+    '''
+
+    def __init__(self, path=None) :
+        '''
+        Constructor
+
+        Args:
+            path (str) : Socket path. Default : fca3103_daemon.socket_path().
+        '''
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path if path is not None else socket_path())
+        self.file = self.sock.makefile("rb")
+
+    # ------------------------------------------------------------------------ #
+
+    def request(self, function, **args) :
+        '''
+        Generator to send a request and read its replies.
+
+        Args:
+            function (str) : info, mtint, tint or trigl.
+            args : Arguments of the request, see FCA3103_daemon.
+
+        Yields:
+            The {"values" : [...]} replies, and the result as the last one.
+
+        Raises:
+            The error reported by the daemon (IOError if its type is unknown).
+        '''
+        args["function"] = function
+        self.sock.sendall(json.dumps(args).encode() + b"\n")
+        for line in self.file :
+            reply = json.loads(line)
+            if "error" in reply :
+                raise ERRORS.get(reply.get("type"), IOError)(reply["error"])
+            if "result" in reply :
+                yield reply["result"]
+                return
+            yield reply["values"]
+        raise IOError("FCA3103 ERROR: Connection closed by the daemon")
+
+    # ------------------------------------------------------------------------ #
+
+    def _result(self, function, **args) :
+        for reply in self.request(function, **args) :
+            pass
+        return reply
+
+    # ------------------------------------------------------------------------ #
+
+    def info(self) :
+        '''
+        Method to get the instrument served by the daemon and its state.
+
+        Returns:
+            A dict with the identification, channels and trigger levels.
+        '''
+        return self._result("info")
+
+    # ------------------------------------------------------------------------ #
+
+    def mean_time_interval(self, n_samples, t_samples, ci=None, trigl=None, auto_trig=False, \
+    device_stats=False, timeout=None) :
+        '''
+        Method to measure the mean time interval, see FCA3103.mean_time_interval.
+
+        Args:
+            ci (float) : Stop when the confidence interval of the mean is
+                below ci (s), see FCA3103.mean_time_interval_ci.
+            device_stats (bool) : Average in the instrument, see
+                FCA3103.statistics.
+            timeout (float) : Maximum time to run the request (s). Default :
+                the daemon one.
+
+        Returns:
+            A dict with mean, stderr (None without ci or device_stats) and
+            samples.
+        '''
+        return self._result("mtint", samples=n_samples, interval=t_samples, ci=ci, \
+        trigl=trigl, auto_trig=auto_trig, device_stats=device_stats, timeout=timeout)
+
+    # ------------------------------------------------------------------------ #
+
+    def time_interval_stream(self, n_samples, tstamp=False, binary=False, trigl=None, \
+    auto_trig=False, timeout=None) :
+        '''
+        Generator to measure N samples, see FCA3103.time_interval_stream.
+
+        Args:
+            timeout (float) : Maximum time to run the request (s). Default :
+                the daemon one.
+
+        Yields:
+            Lists with the samples of each chunk ([value, timestamp] lists if
+            tstamp is set).
+        '''
+        replies = self.request("tint", samples=n_samples, tstamp=tstamp, binary=binary, \
+        trigl=trigl, auto_trig=auto_trig, timeout=timeout)
+        for reply in replies :
+            if isinstance(reply, list) :
+                yield reply
+
+    # ------------------------------------------------------------------------ #
+
+    def trigger_level(self, v_min=0, v_max=5) :
+        '''
+        Method to sweep the trigger level, see FCA3103.trigger_level.
+
+        Returns:
+            A dict with the new trig_level and the profile as [level, mean] pairs.
+        '''
+        return self._result("trigl", v_min=v_min, v_max=v_max)
+
+    # ------------------------------------------------------------------------ #
+
+    def close(self) :
+        '''
+        Method to close the connection.
+        '''
+        self.file.close()
+        self.sock.close()
+
+
+def main() :
+    '''
+    Send a measurement request to the FCA3103 daemon
+    '''
+    parser = arg.ArgumentParser(description='Tektronix FCA3103 daemon client')
+
+    parser.add_argument('--function', '-f', help='Measuring Function', \
+    choices=['mtint','tint','trigl','info'], required=True)
+    parser.add_argument('--interval', '-t', help='Time between samples', type=int, default=0)
+    parser.add_argument('--samples', '-s', help='Number of samples', type=int, \
+    default=1)
+    parser.add_argument('--output', '-o', help='Output data file', type=str)
+    parser.add_argument('--trigl','-g',help='Input trigger level (default: the daemon one)', \
+    type=float)
+    parser.add_argument('--auto-trig','-a',help='Check the cached trigger level, sweep if stale or drifted', \
+    action="store_true", default=False)
+    parser.add_argument('--tstamp','-x', help='Add timestamping for each measure',action="store_true", \
+    default=False)
+    parser.add_argument('--ci','-c', help='Stop mtint when the 95%% confidence interval of the mean is below CI ps',\
+    type=float)
+    parser.add_argument('--device-stats','-S', help='Average mtint in the instrument',action="store_true", \
+    default=False)
+    parser.add_argument('--binary','-b', help='Transfer the measures in binary format',action="store_true", \
+    default=False)
+    parser.add_argument('--socket', '-u', help='Socket path (default: %s)' % socket_path(), \
+    type=str)
+    parser.add_argument('--timeout', '-T', help='Maximum time to run the request (default: the daemon one)', \
+    type=float)
+
+    args = parser.parse_args()
+
+    try:
+        client = FCA3103_client(args.socket)
+    except OSError as e:
+        print("Can't connect to the daemon: %s" % (e))
+        exit(111)  # Connection refused
+
+    if args.function == 'info':
+        info = client.info()
+        print("%s %s (s/n : %s)" % (info["manufacturer"], info["device"], info["serial"]))
+        print("Channels: %d (ref) %d, trigger level: %s V" % (info["master_chan"], \
+        info["slave_chan"], info["trig_level"]))
+
+    elif args.function == 'trigl':
+        result = client.trigger_level()
+        print("Trigger level set at %f volts." % (result["trig_level"][0]))
+
+    elif args.function == 'mtint':
+        print("Measuring Mean Time Interval between the inputs (%d secs)..." % (args.samples))
+        result = client.mean_time_interval(args.samples, args.interval, \
+        args.ci*1e-12 if args.ci else None, args.trigl, args.auto_trig, args.device_stats, \
+        args.timeout)
+        if result["stderr"] is not None:
+            print("Mean Time Interval for %d samples: %g +- %g" % (result["samples"], \
+            result["mean"], t_factor(0.95, result["samples"] - 1) * result["stderr"]))
+        else:
+            print("Mean Time Interval for %d samples: %g" % (result["samples"], result["mean"]))
+
+    elif args.function == 'tint':
+        print("Measuring Time Interval between the inputs (%d secs)..." % (args.samples+10))
+        stream = client.time_interval_stream(args.samples, args.tstamp, args.binary, \
+        args.trigl, args.auto_trig, args.timeout)
+        file = open(args.output,'a+') if args.output else None
+        out = file.write if file else lambda s : print(s, end="")
+        out("# Time Interval Measurement (%d samples) with Tektronix FCA3103 (50ps)\n" % args.samples)
+        out("# %s\n" % datetime.datetime.now().strftime('%Y-%m-%d-%H-%M-%S'))
+        for values in stream:
+            for v in values:
+                out("%g\t%g\n" % (v[0], v[1]) if args.tstamp else "%s\n" % v)
+            if file:
+                file.flush()
+        if file:
+            file.close()
+            print("Output writed to '%s'" % (args.output))
+
+    client.close()
+
+if __name__ == "__main__" :
+    main()
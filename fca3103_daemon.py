@@ -0,0 +1,450 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Daemon that keeps a Tektronix FCA3103 open and serves measurement requests.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import os
+import json
+import time
+import queue
+import select
+import signal
+import socket
+import tempfile
+import threading
+import socketserver
+import argparse as arg
+
+# User modules
+from FCA3103 import *
+from fca3103_discovery import scan, find, Device_cache
+from sim_fca3103 import Sim_fca3103
+
+
+def socket_path() :
+    '''
+    Function to get the default path of the daemon socket.
+
+    Returns:
+        $XDG_RUNTIME_DIR/fca3103.sock (the temp dir if it isn't set).
+    '''
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, "fca3103.sock")
+
+
+class Cancelled(Exception) :
+    '''
+    Exception raised to stop a request whose client is gone.
+    '''
+    pass
+
+
+class Job() :
+    '''
+    A request waiting for (or being run by) the daemon worker.
+    '''
+
+    def __init__(self, request, timeout) :
+        '''
+        Constructor
+
+        Args:
+            request (dict) : Decoded request.
+            timeout (float) : Maximum time to run the request (s).
+        '''
+        self.request = request
+        self.timeout = timeout
+        ## Replies for the client, None marks the end
+        self.replies = queue.Queue()
+        ## Set when the client is gone, the worker stops as soon as it can
+        self.cancel = threading.Event()
+        ## time.monotonic() when the request must be done, set when it starts
+        self.deadline = None
+        self._stopped = False
+
+    # ------------------------------------------------------------------------ #
+
+    def check(self) :
+        '''
+        Method to stop the request if it was cancelled or ran out of time.
+
+        It's set as FCA3103.interrupt while the request runs. It raises only
+        once, so the measurement can still stop the instrument afterwards.
+
+        Raises:
+            Cancelled if the client is gone.
+            TimeoutError if the request took longer than timeout.
+        '''
+        if self._stopped :
+            return
+        if self.cancel.is_set() :
+            self._stopped = True
+            raise Cancelled("FCA3103 ERROR: Request cancelled")
+        if self.deadline is not None and time.monotonic() > self.deadline :
+            self._stopped = True
+            raise TimeoutError("FCA3103 ERROR: Request not done after %g s" % \
+            self.timeout)
+
+
+class Request_handler(socketserver.StreamRequestHandler) :
+    '''
+    Handler of a client connection.
+
+    Each line sent by the client is a JSON request. The replies are JSON lines
+    too: tint sends a {"values" : [...]} line for each chunk read from the
+    instrument, and every request ends with a {"result" : ...} or an
+    {"error" : ..., "type" : ...} line.
+    '''
+
+    def handle(self) :
+        for line in self.rfile :
+            try :
+                request = json.loads(line)
+                if not isinstance(request, dict) :
+                    raise ValueError("FCA3103 ERROR: A request must be a JSON object")
+            except ValueError as e :
+                self._send({"error" : str(e), "type" : "ValueError"})
+                continue
+            job = self.server.submit(request)
+            try :
+                while True :
+                    reply = self._next_reply(job)
+                    if reply is None :
+                        break
+                    self._send(reply)
+            except OSError :
+                job.cancel.set()
+                return
+
+    # ------------------------------------------------------------------------ #
+
+    def _next_reply(self, job) :
+        '''
+        Wait for the next reply of a job, cancelling it if the client is gone.
+        '''
+        while True :
+            try :
+                return job.replies.get(timeout=self.server.client_poll)
+            except queue.Empty :
+                pass
+            # The client closed the connection: readable with no data
+            if select.select([self.connection], [], [], 0)[0] and \
+            not self.connection.recv(1, socket.MSG_PEEK) :
+                raise ConnectionResetError("FCA3103 ERROR: Client gone")
+
+    # ------------------------------------------------------------------------ #
+
+    def _send(self, reply) :
+        self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+
+class FCA3103_daemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer) :
+    '''
+    Server of measurement requests on a Unix socket.
+
+    The FCA3103 is opened once and kept open, so its identification, its
+    configuration (see FCA3103.configure) and its trigger levels are reused by
+    all the requests. Clients are served in their own threads, but their
+    requests are queued and run one by one by a single worker thread, the only
+    one that talks to the instrument.
+
+    Requests (JSON objects, see fca3103_client):
+        {"function" : "info"}
+        {"function" : "mtint", "samples" : n, "interval" : t, "ci" : s,
+         "device_stats" : bool}
+        {"function" : "tint", "samples" : n, "tstamp" : bool, "binary" : bool}
+        {"function" : "trigl", "v_min" : v, "v_max" : v}
+
+    mtint and tint also accept "trigl" (a trigger level to use for that
+    request only) and "auto_trig" (check the trigger level first, see
+    FCA3103.check_trigger_level). All the requests accept "timeout", the
+    maximum time to run them (s), request_timeout by default. A request that
+    runs out of time, or whose client closes the connection, is stopped.
+
+    When a request fails, the measurement is aborted, the instrument errors
+    and pending responses are cleared and the whole configuration is sent
+    again by the next request, so one failure doesn't spoil the next ones.
+    '''
+
+    daemon_threads = True
+    ## Default maximum time to run a request (s)
+    request_timeout = 3600.0
+    ## Time between the checks of the client connection while it waits (s)
+    client_poll = 0.1
+
+    def __init__(self, device, path=None) :
+        '''
+        Constructor
+
+        Args:
+            device (FCA3103) : Instrument to serve, with its channels set.
+            path (str) : Socket path. Default : socket_path().
+
+        Raises:
+            OSError if another daemon is listening at path.
+        '''
+        if path is None :
+            path = socket_path()
+        self._remove_stale(path)
+        self.device = device
+        ## Requests waiting for the worker
+        self.jobs = queue.Queue()
+        socketserver.UnixStreamServer.__init__(self, path, Request_handler)
+        self.worker = threading.Thread(target=self._work, daemon=True)
+        self.worker.start()
+
+    # ------------------------------------------------------------------------ #
+
+    @staticmethod
+    def _remove_stale(path) :
+        '''
+        Remove the socket left by a daemon that didn't exit cleanly.
+        '''
+        if not os.path.exists(path) :
+            return
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try :
+            sock.connect(path)
+        except OSError :
+            os.unlink(path)
+            return
+        finally :
+            sock.close()
+        raise OSError("FCA3103 ERROR: A daemon is already listening at %s" % path)
+
+    # ------------------------------------------------------------------------ #
+
+    def submit(self, request) :
+        '''
+        Method to queue a request for the worker.
+
+        Returns:
+            The Job, its replies are put in job.replies.
+        '''
+        timeout = request.get("timeout")
+        job = Job(request, self.request_timeout if timeout is None else float(timeout))
+        self.jobs.put(job)
+        return job
+
+    # ------------------------------------------------------------------------ #
+
+    def _work(self) :
+        '''
+        Worker: run the queued requests one by one.
+        '''
+        while True :
+            job = self.jobs.get()
+            if job is None :
+                return
+            if job.cancel.is_set() :
+                continue
+            job.deadline = time.monotonic() + job.timeout
+            self.device.interrupt = job.check
+            replies = self.run(job.request)
+            try :
+                for reply in replies :
+                    job.replies.put(reply)
+                    job.check()
+            except Exception as e :
+                job.replies.put({"error" : str(e), "type" : type(e).__name__})
+                self._recover(replies)
+            finally :
+                self.device.interrupt = None
+                job.replies.put(None)
+
+    # ------------------------------------------------------------------------ #
+
+    def _recover(self, replies) :
+        '''
+        Method to bring the instrument back to a known state after a failed request.
+
+        The measurement is aborted, and the errors and the responses still
+        pending (e.g. a READ? that timed out) are cleared. The configuration
+        is sent again by the next request.
+
+        Args:
+            replies (generator) : The replies of the request, see run.
+        '''
+        dev = self.device
+        dev.reset()
+        try :
+            # A stream stops its measurement when it's closed
+            replies.close()
+            dev.drv.abort()
+        except Exception :
+            # The instrument doesn't answer, the next request will report it
+            pass
+
+    # ------------------------------------------------------------------------ #
+
+    def run(self, request) :
+        '''
+        Generator to run a request.
+
+        Yields:
+            The replies for the client.
+
+        Raises:
+            ValueError if the request is not valid.
+        '''
+        function = request.get("function")
+        if function not in ("info", "mtint", "tint", "trigl") :
+            raise ValueError("FCA3103 ERROR: Unknown function %r" % (function,))
+
+        dev = self.device
+        if function == "info" :
+            yield {"result" : {
+                "manufacturer" : dev.drv.manufacturer,
+                "device" : dev.drv.device,
+                "serial" : dev.drv.serial,
+                "master_chan" : dev.master_chan,
+                "slave_chan" : dev.slave_chan,
+                "trig_level" : dev.trig_level,
+                "queued" : self.jobs.qsize(),
+            }}
+            return
+
+        if function == "trigl" :
+            profile = dev.trigger_level(request.get("v_min", 0), request.get("v_max", 5))
+            yield {"result" : {"trig_level" : dev.trig_level, \
+            "profile" : [[k, v] for k, v in profile.items()]}}
+            return
+
+        levels = list(dev.trig_level)
+        if request.get("trigl") is not None :
+            dev.trig_level[0] = dev.trig_level[1] = float(request["trigl"])
+        elif request.get("auto_trig") :
+            dev.check_trigger_level()
+            levels = list(dev.trig_level)
+        try :
+            yield from self._measure(function, request)
+        finally :
+            # The level of the request isn't kept for the next ones
+            dev.trig_level[:] = levels
+
+    # ------------------------------------------------------------------------ #
+
+    def _measure(self, function, request) :
+        '''
+        Generator to run a mtint or tint request, see run.
+        '''
+        dev = self.device
+        samples = int(request.get("samples", dev.n_samples))
+        if function == "mtint" :
+            interval = request.get("interval", dev.t_samples)
+            if request.get("device_stats") :
+                stats = dev.statistics(samples)
+                mean, stderr, n = stats["mean"], stats["stdev"] / math.sqrt(samples), samples
+            elif request.get("ci") is not None :
+                mean, stderr, n = dev.mean_time_interval_ci(samples, interval, \
+                ci=float(request["ci"]))
+            else :
+                mean, stderr, n = dev.mean_time_interval(samples, interval), None, samples
+            yield {"result" : {"mean" : mean, "stderr" : stderr, "samples" : n}}
+            return
+
+        tstamp = bool(request.get("tstamp", False))
+        binary = bool(request.get("binary", False))
+        stream = dev.time_interval_stream(samples, tstamp, binary)
+        try :
+            for chunk in stream :
+                yield {"values" : chunk.tolist()}
+        finally :
+            stream.close()
+        yield {"result" : {"samples" : samples}}
+
+    # ------------------------------------------------------------------------ #
+
+    def server_close(self) :
+        '''
+        Method to stop the worker and remove the socket.
+        '''
+        socketserver.UnixStreamServer.server_close(self)
+        self.jobs.put(None)
+        try :
+            os.unlink(self.server_address)
+        except OSError :
+            pass
+
+
+def main() :
+    '''
+    Run the daemon until it is interrupted (SIGINT or SIGTERM)
+    '''
+    parser = arg.ArgumentParser(description='Tektronix FCA3103 measurement daemon')
+
+    parser.add_argument('--device', '-l', help="Device port", type=int, default=1)
+    parser.add_argument('--serial', '-n', help="Select the device by serial number instead of port", \
+    type=str)
+    parser.add_argument('--ref', '-r', help='Input channel for the reference',type=int, \
+    choices=[1,2],default=1)
+    parser.add_argument('--socket', '-u', help='Socket path (default: %s)' % socket_path(), \
+    type=str)
+    parser.add_argument('--debug', '-d', help="Enable debug output", action="store_true", \
+    default=False)
+    parser.add_argument('--sim', help='Use a simulated instrument instead of /dev/usbtmc', \
+    action="store_true", default=False)
+    parser.add_argument('--sim-speed', help='Simulated PPS periods per second (0: unthrottled)', \
+    type=float, default=1.0)
+    parser.add_argument('--request-timeout', '-T', help='Maximum time to run a request (default: %g s)' % \
+    FCA3103_daemon.request_timeout, type=float, default=FCA3103_daemon.request_timeout)
+
+    args = parser.parse_args()
+
+    transport = None
+    if args.sim:
+        transport = Sim_fca3103(time_scale=1/args.sim_speed if args.sim_speed > 0 else 0, \
+        serial="SIM%04d" % args.device)
+    elif args.serial:
+        args.device = find(args.serial, cache=Device_cache())
+        if args.device is None:
+            print("No device found with serial number %s" % (args.serial))
+            exit(6)  # No such device or address
+    elif args.device not in scan():
+        print("No device found at /dev/usbtmc%d" % (args.device))
+        exit(6)  # No such device or address
+
+    device = FCA3103(args.device, args.ref, 2 if args.ref == 1 else 1, transport=transport)
+    device.show_dbg = args.debug
+    if args.sim and args.sim_speed > 0:
+        device.pps_period = 1/args.sim_speed
+    if device.trig_level[0] is None:
+        device.trig_level[0] = device.trig_level[1] = 1.5
+
+    server = FCA3103_daemon(device, args.socket)
+    server.request_timeout = args.request_timeout
+    signal.signal(signal.SIGTERM, lambda signum, frame : exit(0))
+    print("Serving %s at %s" % (device.drv.deviceInfo(), server.server_address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,130 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Decoding of the measurement data sent by the Tektronix FCA3103.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import warnings
+import numpy as np
+
+## Sample type for FORMAT REAL (big endian double)
+REAL = np.dtype(">f8")
+## Sample type for FORMAT REAL with FORMAT:TINF ON
+REAL_TSTAMP = np.dtype([("value", ">f8"), ("timestamp", ">f8")])
+## Sample type of the decoded ASCII responses with FORMAT:TINF ON
+ASCII_TSTAMP = np.dtype([("value", "f8"), ("timestamp", "f8")])
+
+
+def block_payload(buf) :
+    '''
+    Function to get the data of an IEEE 488.2 definite length block.
+
+    Args:
+        buf (bytes) : Block with the header "#<n><length>", e.g. "#3800".
+
+    Returns:
+        A memoryview of the block data (no copy is made).
+
+    Raises:
+        ValueError if buf is not a definite length block or it is truncated.
+    '''
+    buf = memoryview(buf)
+    if len(buf) < 2 or buf[0] != ord("#") or not chr(buf[1]).isdigit() \
+    or buf[1] == ord("0") :
+        raise ValueError("FCA3103 ERROR: Not a definite length block")
+    n = buf[1] - ord("0")
+    start = 2 + n
+    length = int(bytes(buf[2:start]))
+    if len(buf) < start + length :
+        raise ValueError("FCA3103 ERROR: Truncated block (%d of %d bytes)" % \
+        (len(buf) - start, length))
+    return buf[start:start+length]
+
+
+def decode_real(buf, tstamp=False) :
+    '''
+    Function to decode a FETCH:ARR? response in REAL format.
+
+    The array is a view on buf, so buf must not be modified while it's used.
+
+    Args:
+        buf (bytes) : Definite length block sent by the instrument.
+        tstamp (bool) : The samples have timestamp (FORMAT:TINF ON).
+
+    Returns:
+        A numpy array of time intervals or, when tstamp is set, a structured
+        array with the fields "value" and "timestamp".
+    '''
+    return np.frombuffer(block_payload(buf), REAL_TSTAMP if tstamp else REAL)
+
+
+def decode_ascii(buf, tstamp=False, n=None) :
+    '''
+    Function to decode a FETCH:ARR? response in ASCII format.
+
+    The whole response is parsed by numpy in a single call, without
+    splitting it in Python strings.
+
+    Args:
+        buf (bytes) : Comma separated values sent by the instrument (str is
+            accepted too).
+        tstamp (bool) : The samples have timestamp (FORMAT:TINF ON).
+        n (int) : Number of samples expected. Default : all the response.
+
+    Returns:
+        A numpy array of time intervals or, when tstamp is set, a structured
+        array with the fields "value" and "timestamp" (ASCII_TSTAMP).
+
+    Raises:
+        ValueError if the response has less than n samples or a value can't
+        be parsed.
+    '''
+    if isinstance(buf, str) :
+        buf = buf.encode("ascii")
+    elif not isinstance(buf, bytes) :
+        buf = bytes(buf)
+    try :
+        with warnings.catch_warnings() :
+            # Old numpy versions warn and stop at the first invalid value
+            warnings.simplefilter("ignore", DeprecationWarning)
+            values = np.fromstring(buf, np.float64, sep=",") if buf.strip() else \
+            np.empty(0)
+    except ValueError :
+        values = None
+    # Every value must be parsed, there is one more than separators
+    if values is None or len(values) != (buf.count(b",") + 1 if buf.strip() else 0) :
+        raise ValueError("FCA3103 ERROR: Invalid value in the response: %r" % buf[:40])
+    width = 2 if tstamp else 1
+    if n is None :
+        if len(values) % width :
+            raise ValueError("FCA3103 ERROR: Response with %d values, pairs expected" % \
+            len(values))
+        n = len(values) // width
+    if len(values) < n * width :
+        raise ValueError("FCA3103 ERROR: Response with %d values, %d expected" % \
+        (len(values), n * width))
+    values = values[:n * width]
+    return values.view(ASCII_TSTAMP) if tstamp else values
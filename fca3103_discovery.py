@@ -0,0 +1,201 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Discovery of the Tektronix FCA3103 connected through usbtmc.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# User modules
+from tektronix_fca3103_drv import *
+from trigger_cache import cache_dir, load_json, save_json
+
+## Time to wait for the *IDN? response of each device when probing (s)
+PROBE_TIMEOUT = 0.5
+
+
+def scan(dev_dir="/dev") :
+    '''
+    Function to list the usbtmc ports, without opening them.
+
+    Args:
+        dev_dir (str) : Directory with the device nodes.
+
+    Returns:
+        A sorted list with the port numbers (N for /dev/usbtmcN).
+    '''
+    ports = []
+    try :
+        with os.scandir(dev_dir) as it :
+            for entry in it :
+                m = re.match(r"usbtmc(\d+)$", entry.name)
+                if m is not None :
+                    ports.append(int(m.group(1)))
+    except OSError :
+        pass
+    return sorted(ports)
+
+
+def probe(port, timeout=PROBE_TIMEOUT) :
+    '''
+    Function to read the identity of the device connected to a port.
+
+    Args:
+        port (int) : Port of the device.
+        timeout (float) : Maximum time to wait for *IDN? (s).
+
+    Returns:
+        A (manufacturer, device, serial) tuple, or None if the port can't be
+        opened or the device doesn't answer like a counter.
+    '''
+    try :
+        transport = Gen_usbtmc(port)
+    except OSError :
+        return None
+    try :
+        drv = FCA3103_drv(port, transport=transport, timeout=timeout)
+    # Another usbtmc device can answer anything, even bytes that aren't text
+    # (UnicodeDecodeError is a ValueError)
+    except (OSError, IndexError, ValueError) :
+        return None
+    finally :
+        transport.close()
+    return (drv.manufacturer, drv.device, drv.serial)
+
+
+class Device_cache() :
+    '''
+    Cache of the serial number -> port mappings found by discover().
+    '''
+
+    def __init__(self, path=None) :
+        '''
+        Constructor
+
+        Args:
+            path (str) : Cache file. Default : devices.json in cache_dir().
+        '''
+        if path is None :
+            path = os.path.join(cache_dir(), "devices.json")
+        self.path = path
+
+    # ------------------------------------------------------------------------ #
+
+    def get(self, serial) :
+        '''
+        Method to get the port where a device was found last time.
+
+        Returns:
+            The port or None if the device isn't in the cache.
+        '''
+        entry = load_json(self.path).get(serial)
+        return None if entry is None else entry["port"]
+
+    # ------------------------------------------------------------------------ #
+
+    def update(self, devices) :
+        '''
+        Method to store the devices found by discover().
+
+        Entries of other serials that were at the same ports are removed.
+
+        Args:
+            devices (dict) : port -> (manufacturer, device, serial).
+        '''
+        data = load_json(self.path)
+        ports = set(devices)
+        data = dict((k, v) for k, v in data.items() if v["port"] not in ports)
+        now = time.time()
+        for port, idn in devices.items() :
+            data[idn[2]] = {"port" : port, "idn" : list(idn), "timestamp" : now}
+        save_json(self.path, data)
+
+    # ------------------------------------------------------------------------ #
+
+    def forget(self, serial) :
+        '''
+        Method to remove a device from the cache.
+        '''
+        data = load_json(self.path)
+        if data.pop(serial, None) is not None :
+            save_json(self.path, data)
+
+
+def discover(ports=None, timeout=PROBE_TIMEOUT, cache=None) :
+    '''
+    Function to identify the devices connected to the usbtmc ports.
+
+    All the ports are probed in parallel.
+
+    Args:
+        ports (list) : Ports to probe. Default : all the ports found by scan().
+        timeout (float) : Maximum time to wait for each device (s).
+        cache (Device_cache) : Cache updated with the found devices.
+
+    Returns:
+        A dict port -> (manufacturer, device, serial) with the devices that
+        answered.
+    '''
+    if ports is None :
+        ports = scan()
+    if not ports :
+        return {}
+    with ThreadPoolExecutor(max_workers=len(ports)) as pool :
+        found = dict((p, idn) for p, idn in \
+        zip(ports, pool.map(lambda p : probe(p, timeout), ports)) if idn is not None)
+    if cache is not None :
+        cache.update(found)
+    return found
+
+
+def find(serial, timeout=PROBE_TIMEOUT, cache=None) :
+    '''
+    Function to get the port of a device from its serial number.
+
+    If the device is in the cache and its port exists, that port is returned
+    without opening any device. The caller should check the serial number
+    after opening it and call again with the cache entry removed if it
+    doesn't match. Otherwise all the ports are probed.
+
+    Args:
+        serial (str) : Serial number of the device.
+        timeout (float) : Maximum time to wait for each device (s).
+        cache (Device_cache) : Cache of serial number -> port mappings.
+
+    Returns:
+        The port or None if the device isn't connected.
+    '''
+    if cache is not None :
+        port = cache.get(serial)
+        if port is not None and port in scan() :
+            return port
+    for port, idn in discover(timeout=timeout, cache=cache).items() :
+        if idn[2] == serial :
+            return port
+    return None
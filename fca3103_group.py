@@ -0,0 +1,217 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Parallel acquisition from several Tektronix FCA3103.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import time
+import heapq
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# User modules
+from FCA3103 import *
+
+class FCA3103_group() :
+    '''
+    A set of FCA3103 that are configured and read in parallel.
+
+    Each instrument is handled by its own worker thread, so the setup time and
+    the acquisition time are close to the ones of a single instrument. The
+    samples of all of them are merged in a single stream sorted by host
+    monotonic time and tagged with the instrument serial number.
+    '''
+
+    def __init__(self, ports, master_chan=None, slave_chan=None, transports=None, \
+    trig_cache=True) :
+        '''
+        Constructor
+
+        The instruments are opened in parallel.
+
+        Args:
+            ports (list) : Ports of the instruments (/dev/usbtmc<port>).
+            master_chan (int) : Input channel for master's PPS signal.
+            slave_chan (int) : Input channel for slave's PPS signal.
+            transports (list) : Transport for each port, see FCA3103.
+            trig_cache : Trigger_cache used by every instrument, see FCA3103.
+        '''
+        if transports is None :
+            transports = [None] * len(ports)
+        self.pool = ThreadPoolExecutor(max_workers=max(len(ports), 1))
+        ## FCA3103 instances, in the same order as ports
+        self.devices = list(self.pool.map(lambda a : FCA3103(a[0], master_chan, \
+        slave_chan, transport=a[1], trig_cache=trig_cache), zip(ports, transports)))
+
+    # ------------------------------------------------------------------------ #
+
+    def _map(self, func) :
+        '''
+        Run func(device) for every instrument in parallel.
+
+        Returns:
+            A dict serial -> result.
+        '''
+        results = self.pool.map(func, self.devices)
+        return dict((d.drv.serial, r) for d, r in zip(self.devices, results))
+
+    # ------------------------------------------------------------------------ #
+
+    def configure(self, n_samples=1, tstamp=False, binary=False) :
+        '''
+        Method to configure all the instruments in parallel for time interval measures.
+
+        Args:
+            n_samples (int) : Number of samples taken for each INIT.
+            tstamp (bool) : Enable timestamp for each measure.
+            binary (bool) : Transfer the samples in REAL format.
+
+        Raises:
+            ValueError if the channels or the trigger level of an instrument
+            are not set.
+        '''
+        def configure(d) :
+            # Before the settings, that format the trigger levels
+            d._check_channels()
+            return d.configure(d.settings(n_samples, tstamp, d.trig_level, binary))
+        self._map(configure)
+
+    # ------------------------------------------------------------------------ #
+
+    def mean_time_interval(self, n_samples, t_samples, device_stats=False) :
+        '''
+        Method to measure the mean time interval with every instrument.
+
+        Args:
+            device_stats (bool) : Average in the instruments, see
+                FCA3103.mean_time_interval.
+
+        Returns:
+            A dict serial -> mean value.
+        '''
+        return self._map(lambda d : d.mean_time_interval(n_samples, t_samples, \
+        device_stats))
+
+    # ------------------------------------------------------------------------ #
+
+    def _acquire(self, dev, n_samples, tstamp, binary, out, stop) :
+        '''
+        Worker: read a time interval stream and push its chunks to out.
+        '''
+        try :
+            t0 = time.monotonic()
+            stream = dev.time_interval_stream(n_samples, tstamp, binary)
+            for chunk in stream :
+                out.put((dev, t0, time.monotonic(), chunk))
+                if stop.is_set() :
+                    stream.close()
+                    break
+        except Exception as e :
+            out.put((dev, e))
+        finally :
+            out.put((dev, None))
+
+    # ------------------------------------------------------------------------ #
+
+    def time_interval_stream(self, n_samples, tstamp=False, binary=False) :
+        '''
+        Generator to measure N samples with every instrument concurrently.
+
+        The host time of each sample is the host time of INIT plus the
+        instrument timestamp if tstamp is set. Otherwise it is estimated from
+        the time the chunk was received, assuming a sample each pps_period.
+        Samples are yielded in host time order: a sample is only released once
+        every instrument still running has delivered a later one.
+
+        Args:
+            n_samples (int) : Number of measures to be done by each instrument.
+            tstamp (bool) : Enable timestamp for each measure.
+            binary (bool) : Transfer the samples in REAL format.
+
+        Yields:
+            (host time, serial, value) tuples, or (host time, serial, value,
+            timestamp) if tstamp is set.
+
+        Raises:
+            The first exception raised by an instrument.
+        '''
+        self.configure(n_samples, tstamp, binary)
+
+        out = queue.Queue()
+        stop = threading.Event()
+        for dev in self.devices :
+            self.pool.submit(self._acquire, dev, n_samples, tstamp, binary, out, stop)
+
+        # Latest host time delivered by each running instrument
+        last = dict((dev, -math.inf) for dev in self.devices)
+        pending = []
+        seq = 0
+        try :
+            while last :
+                item = out.get()
+                dev = item[0]
+                if item[1] is None :
+                    del last[dev]
+                elif isinstance(item[1], Exception) :
+                    raise item[1]
+                else :
+                    t0, t, chunk = item[1:]
+                    n = len(chunk)
+                    for i, v in enumerate(chunk) :
+                        if tstamp :
+                            ts = float(v[1])
+                            rec = (t0 + ts, dev.drv.serial, float(v[0]), ts)
+                        else :
+                            rec = (t - (n-1-i) * dev.pps_period, dev.drv.serial, float(v))
+                        heapq.heappush(pending, (rec[0], seq, rec))
+                        seq += 1
+                    last[dev] = max(last[dev], rec[0])
+
+                watermark = min(last.values()) if last else math.inf
+                while pending and pending[0][0] <= watermark :
+                    yield heapq.heappop(pending)[2]
+        finally :
+            stop.set()
+
+    # ------------------------------------------------------------------------ #
+
+    def time_interval(self, n_samples, tstamp=False, binary=False) :
+        '''
+        Method to measure N samples with every instrument concurrently.
+
+        Returns:
+            A list of samples, see time_interval_stream.
+        '''
+        return list(self.time_interval_stream(n_samples, tstamp, binary))
+
+    # ------------------------------------------------------------------------ #
+
+    def close(self) :
+        '''
+        Method to stop the worker threads.
+        '''
+        self.pool.shutdown(wait=True)
@@ -0,0 +1,210 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Pipelined time interval acquisition for the Tektronix FCA3103.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import time
+import queue
+import threading
+import numpy as np
+
+# User modules
+from fca3103_decode import *
+from tektronix_fca3103_drv import is_block
+
+
+class Pipeline() :
+    '''
+    Acquisition where the instrument reads and the processing overlap.
+
+    A reader thread drains the instrument output buffer with FETCH:ARR?
+    into a pool of pre-allocated buffers, and the calling thread decodes
+    each one and passes the samples to the consumer. Only depth buffers
+    exist: when the consumer falls behind, the reader waits for a free one
+    (and the samples wait in the instrument buffer), so the memory used is
+    bounded.
+
+    Only the reader thread talks to the instrument while run is active.
+    '''
+
+    def __init__(self, device, depth=4) :
+        '''
+        Constructor
+
+        Args:
+            device (FCA3103) : Instrument, with its channels and trigger
+                levels set.
+            depth (int) : Number of buffers.
+        '''
+        self.device = device
+        self.depth = depth
+        ## Times the reader had to wait for a free buffer in the last run
+        self.stalls = 0
+        ## Time the reader waited for a free buffer in the last run (s)
+        self.stall_time = 0.0
+
+    # ------------------------------------------------------------------------ #
+
+    def _reader(self, n_samples, binary, free, full, stop) :
+        '''
+        Reader thread: fetch the samples into the free buffers.
+        '''
+        dev = self.device
+        remaining = n_samples
+        last = time.monotonic()
+        error = None
+        try :
+            while remaining > 0 and not stop.is_set() :
+                avail = int(dev.drv.query("DATA:POINTS?"))
+                if avail == 0 :
+                    dev._check_stall(last)
+                    # Wait for the next sample
+                    stop.wait(dev.pps_period)
+                    continue
+                n = min(avail, remaining, dev.fetch_size)
+                try :
+                    buf = free.get_nowait()
+                except queue.Empty :
+                    t = time.monotonic()
+                    buf = free.get()
+                    self.stalls += 1
+                    self.stall_time += time.monotonic() - t
+                if buf is None :
+                    break
+                length = dev.drv.query_into("FETCH:ARR? %d" % n, buf)
+                last = time.monotonic()
+                remaining -= n
+                full.put((buf, length, n))
+        except Exception as e :
+            error = e
+            full.put(e)
+        finally :
+            if isinstance(error, TimeoutError) :
+                # Clear the errors and the responses still pending too
+                dev.drv.abort()
+            elif remaining > 0 :
+                dev.drv.write("ABORT")
+            full.put(None)
+
+    # ------------------------------------------------------------------------ #
+
+    def run(self, n_samples, consumer, tstamp=False, binary=False, filter=None) :
+        '''
+        Method to measure N samples, passing them to consumer as they arrive.
+
+        Args:
+            n_samples (int) : Number of measures to be done
+            consumer (callable) : Called with each chunk of samples, a numpy
+                array like the ones yielded by FCA3103.time_interval_stream.
+                The chunks of binary runs are views on a pool buffer, which
+                is reused when consumer returns: copy them to keep them.
+            tstamp (bool) : Enable timestamp for each measure
+            binary (bool) : Transfer the samples in REAL format instead of ASCII
+            filter (callable) : Called with each chunk before consumer, it
+                returns the samples to keep.
+
+        Returns:
+            The number of samples read from the instrument.
+
+        Raises:
+            ValueError if master_chan or slave_chan are not set or trigger level not set.
+            SCPI_error if the instrument reports errors.
+            The exceptions raised by the reader thread or by consumer.
+        '''
+        dev = self.device
+        dev._check_channels()
+
+        # Initial device configuration --------------------
+        dev.configure(dev.settings(n_samples, tstamp, dev.trig_level, binary))
+
+        # Buffers big enough for a whole FETCH:ARR?
+        size = dev.fetch_size * (2 if tstamp else 1) * (8 if binary else 20) + 16
+        free = queue.Queue()
+        for i in range(self.depth) :
+            free.put(bytearray(size))
+        full = queue.Queue()
+        stop = threading.Event()
+        self.stalls = 0
+        self.stall_time = 0.0
+
+        # Initiate the sampling
+        dev.drv.write("INIT")
+        reader = threading.Thread(target=self._reader, \
+        args=(n_samples, binary, free, full, stop), daemon=True)
+        reader.start()
+
+        total = 0
+        try :
+            while True :
+                item = full.get()
+                if item is None :
+                    break
+                if isinstance(item, Exception) :
+                    raise item
+                buf, length, n = item
+                try :
+                    with memoryview(buf) as view :
+                        if binary :
+                            if not is_block(view[:2]) :
+                                raise ValueError("FCA3103 ERROR: Not a definite length block: %r" % \
+                                bytes(view[:20]))
+                            chunk = decode_real(view[:length], tstamp)
+                        else :
+                            chunk = decode_ascii(view[:length], tstamp, n)
+                        total += n
+                        if filter is not None :
+                            chunk = filter(chunk)
+                        consumer(chunk)
+                        del chunk
+                finally :
+                    free.put(buf)
+        finally :
+            stop.set()
+            # Wake the reader if it's waiting for a buffer
+            free.put(None)
+            reader.join()
+        if dev.drv.check_errors :
+            dev.drv.check()
+        return total
+
+    # ------------------------------------------------------------------------ #
+
+    def time_interval(self, n_samples, tstamp=False, binary=False) :
+        '''
+        Method to measure N samples, like FCA3103.time_interval.
+
+        Returns:
+            A numpy array with the measure values (a structured array with the
+            fields "value" and "timestamp" if tstamp is set).
+        '''
+        chunks = []
+        self.run(n_samples, lambda c : chunks.append(np.array(c)), tstamp, binary)
+        if chunks :
+            return np.concatenate(chunks)
+        if binary :
+            return np.empty(0, REAL_TSTAMP if tstamp else REAL)
+        return np.empty(0, ASCII_TSTAMP if tstamp else np.float64)
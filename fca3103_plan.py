@@ -0,0 +1,494 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Measurement plans: a sequence of measurements run in a single session.
+
+A plan is a JSON (or YAML, if PyYAML is installed) file like:
+
+    {
+        "defaults" : {"samples" : 100},
+        "steps" : [
+            {"name" : "sweep", "function" : "trigl"},
+            {"name" : "TI 1-2", "function" : "mtint", "device_stats" : true},
+            {"name" : "TI 2-1", "function" : "mtint", "master" : 2, "slave" : 1},
+            {"name" : "capture", "function" : "tint", "samples" : 3600,
+             "tstamp" : true, "binary" : true, "output" : "run.bin",
+             "format" : "bin"}
+        ]
+    }
+
+See STEP for the keys of each step and their defaults.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import os
+import sys
+import json
+import time
+import collections
+
+try :
+    import yaml
+except ImportError :
+    yaml = None
+
+# User modules
+from FCA3103 import *
+from fca3103_capture import Capture_writer, metadata
+
+## Keys of a plan step and their default values
+STEP = {
+    # Name shown in the report. Default : "<index> <function>"
+    "name" : None,
+    # trigl (trigger level sweep), check (check_trigger_level), mtint or tint
+    "function" : None,
+    # Input channels. Default : the ones of the device
+    "master" : None,
+    "slave" : None,
+    # Trigger level (V). Default : the current one of the device
+    "level" : None,
+    "samples" : 1,
+    # Time between samples for mtint (s)
+    "interval" : 0,
+    # mtint : average in the instrument, or stop at this confidence interval (ps)
+    "device_stats" : False,
+    "ci" : None,
+    # tint : timestamps, REAL transfer, output file and its format (txt or bin)
+    "tstamp" : False,
+    "binary" : False,
+    "output" : None,
+    "format" : "txt",
+    # trigl and check : range of the sweep (V)
+    "v_min" : 0,
+    "v_max" : 5,
+    # Don't move steps across this one
+    "barrier" : False,
+}
+
+## Functions that change the trigger levels, they are always barriers
+SWEEPS = ("trigl", "check")
+## Functions understood in a plan step
+FUNCTIONS = SWEEPS + ("mtint", "tint")
+
+## Result of a step, see Plan.run
+Step_result = collections.namedtuple("Step_result", \
+["index", "name", "function", "changes", "seconds", "result", "error"])
+
+
+def load_plan(path) :
+    '''
+    Function to read a plan file.
+
+    Files ending in .yaml or .yml are read with PyYAML, the rest as JSON.
+
+    Returns:
+        A list of steps (dicts), with the plan defaults and STEP applied.
+
+    Raises:
+        ValueError if the plan is not valid.
+    '''
+    with open(path) as f :
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml") :
+            if yaml is None :
+                raise ValueError("FCA3103 ERROR: PyYAML is needed to read %s" % path)
+            plan = yaml.safe_load(f)
+        else :
+            plan = json.load(f)
+    if isinstance(plan, list) :
+        plan = {"steps" : plan}
+    if not isinstance(plan, dict) or not isinstance(plan.get("steps"), list) :
+        raise ValueError("FCA3103 ERROR: The plan has no list of steps")
+    return steps(plan["steps"], plan.get("defaults", {}))
+
+
+def steps(plan, defaults=None) :
+    '''
+    Function to check the steps of a plan and fill in their defaults.
+
+    Args:
+        plan (list) : Steps (dicts).
+        defaults (dict) : Values for the keys missing in the steps.
+
+    Returns:
+        A list of steps with all the keys in STEP.
+
+    Raises:
+        ValueError if a step has unknown keys or functions.
+    '''
+    if defaults is None :
+        defaults = {}
+    out = []
+    for i, step in enumerate(plan) :
+        if not isinstance(step, dict) :
+            raise ValueError("FCA3103 ERROR: Plan step %d is not a mapping" % (i+1))
+        unknown = set(defaults) - set(STEP) or set(step) - set(STEP)
+        if unknown :
+            raise ValueError("FCA3103 ERROR: Unknown keys in plan step %d: %s" % \
+            (i+1, ", ".join(sorted(unknown))))
+        s = dict(STEP)
+        s.update(defaults)
+        s.update(step)
+        if s["function"] not in FUNCTIONS :
+            raise ValueError("FCA3103 ERROR: Unknown function in plan step %d: %r" % \
+            (i+1, s["function"]))
+        if s["format"] not in ("txt", "bin") :
+            raise ValueError("FCA3103 ERROR: Unknown format in plan step %d: %r" % \
+            (i+1, s["format"]))
+        if s["name"] is None :
+            s["name"] = "%d %s" % (i+1, s["function"])
+        out.append(s)
+    return out
+
+
+class Plan() :
+    '''
+    A measurement plan run with a FCA3103.
+
+    Each step is run with the FCA3103 measurement methods, and configure()
+    only sends the settings that differ from the previous step. To make those
+    deltas as small as possible the steps are reordered: steps with the same
+    configuration are run one after the other, and the groups are chained so
+    each one changes as few settings as possible. Steps are never moved across
+    a barrier (trigger sweeps or steps with barrier set), and the trigger
+    level of each step is resolved in plan order (see levels) and set before
+    it runs, so reordering doesn't change the level a step measures at.
+    Results are reported in plan order.
+    '''
+
+    def __init__(self, device, plan) :
+        '''
+        Constructor
+
+        Args:
+            device (FCA3103) : Instrument.
+            plan (list) : Steps, as returned by load_plan or steps().
+        '''
+        self.device = device
+        self.steps = plan
+
+    # ------------------------------------------------------------------------ #
+
+    def _channels(self, step) :
+        '''
+        Input channels (master, slave) of a step.
+        '''
+        master = step["master"] if step["master"] is not None else self.device.master_chan
+        slave = step["slave"] if step["slave"] is not None else self.device.slave_chan
+        return (master, slave)
+
+    # ------------------------------------------------------------------------ #
+
+    def settings(self, step, levels=None) :
+        '''
+        Method to build the configuration used by a step.
+
+        Args:
+            step (dict) : Plan step.
+            levels (list) : Trigger level for each input. Default : the level
+                of the step, or no level setting if it hasn't one.
+
+        Returns:
+            A tuple of (header, value) tuples, see FCA3103.settings, or None for
+            trigger sweeps.
+        '''
+        if step["function"] in SWEEPS :
+            return None
+        dev = self.device
+        chans = (dev.master_chan, dev.slave_chan)
+        dev.master_chan, dev.slave_chan = self._channels(step)
+        if levels is None and step["level"] is not None :
+            levels = [step["level"]] * 2
+        try :
+            if step["function"] == "tint" :
+                cfg = dev.settings(step["samples"], step["tstamp"], levels, step["binary"])
+            elif step["device_stats"] :
+                cfg = dev.settings(step["samples"], levels=levels, stats=True)
+            else :
+                cfg = dev.settings(levels=levels)
+        finally :
+            dev.master_chan, dev.slave_chan = chans
+        return tuple(cfg)
+
+    # ------------------------------------------------------------------------ #
+
+    def _segments(self) :
+        '''
+        Method to split the plan at the barriers.
+
+        Returns:
+            A list of lists with the indexes of the steps, in plan order. Each
+            barrier (trigger sweep or step with barrier set) is alone in its
+            segment, so no step is moved across it.
+        '''
+        segments = [[]]
+        for i, step in enumerate(self.steps) :
+            if step["function"] in SWEEPS or step["barrier"] :
+                segments.extend([[i], []])
+            else :
+                segments[-1].append(i)
+        return [seg for seg in segments if seg]
+
+    # ------------------------------------------------------------------------ #
+
+    def _cached_level(self, chans) :
+        '''
+        Trigger level in the trigger cache for a channel pair, or None.
+        '''
+        dev = self.device
+        if dev.trig_cache is None or None in chans :
+            return None
+        entry = dev.trig_cache.get(Trigger_cache.key(dev.drv, chans[0], chans[1]))
+        return None if entry is None else entry[0][0]
+
+    # ------------------------------------------------------------------------ #
+
+    def levels(self, segment) :
+        '''
+        Method to get the trigger level each step of a segment measures at.
+
+        The levels are resolved in plan order, so they don't depend on the run
+        order: a step uses its own level if it has one. Otherwise it uses the
+        cached level of its channels when they differ from the previous
+        step's, or the level of the previous step without its own level.
+
+        Args:
+            segment (list) : Indexes of the steps, in plan order.
+
+        Returns:
+            A dict index -> level (None if it isn't known).
+        '''
+        dev = self.device
+        chans = (dev.master_chan, dev.slave_chan)
+        level = dev.trig_level[0]
+        levels = {}
+        for i in segment :
+            step = self.steps[i]
+            if self._channels(step) != chans :
+                chans = self._channels(step)
+                cached = self._cached_level(chans)
+                if cached is not None :
+                    level = cached
+            levels[i] = step["level"] if step["level"] is not None else level
+        return levels
+
+    # ------------------------------------------------------------------------ #
+
+    def _order(self, segment, levels, state) :
+        '''
+        Method to order the steps of a segment.
+
+        Args:
+            segment (list) : Indexes of the steps.
+            levels (dict) : Trigger level of each step, see levels().
+            state (dict) : Instrument settings before the first one, updated
+                with the last one.
+
+        Returns:
+            A list with the indexes in run order.
+        '''
+        if self.steps[segment[0]]["function"] in SWEEPS :
+            # The sweep leaves its own configuration
+            state.clear()
+            return list(segment)
+
+        groups = collections.OrderedDict()
+        for i in segment :
+            lev = None if levels[i] is None else [levels[i]] * 2
+            groups.setdefault(self.settings(self.steps[i], lev), []).append(i)
+
+        order = []
+        while groups :
+            # The group that changes less settings, in plan order if tied
+            cfg = min(groups, key=lambda c : len(self.device.delta(c, state)))
+            order.extend(groups.pop(cfg))
+            state.update(cfg)
+        return order
+
+    # ------------------------------------------------------------------------ #
+
+    def schedule(self) :
+        '''
+        Method to get the order in which the steps are run.
+
+        The levels are resolved with the current trigger levels of the device,
+        run() resolves them again after each trigger sweep.
+
+        Returns:
+            A list with the indexes of the steps.
+        '''
+        order = []
+        state = dict(self.device.state or {})
+        for segment in self._segments() :
+            order.extend(self._order(segment, self.levels(segment), state))
+        return order
+
+    # ------------------------------------------------------------------------ #
+
+    def _tint(self, step) :
+        '''
+        Method to run a tint step.
+
+        Returns:
+            A dict with the number of samples and their mean.
+        '''
+        dev = self.device
+        stats = Running_stats()
+        out = None
+        if step["output"] and step["format"] == "bin" :
+            out = Capture_writer(step["output"], metadata(dev, step["samples"], \
+            step["tstamp"], step=step["name"]), step["tstamp"])
+        elif step["output"] :
+            out = open(step["output"], "a+")
+            out.write("# %s: Time Interval Measurement (%d samples) with Tektronix FCA3103\n" % \
+            (step["name"], step["samples"]))
+        try :
+            for chunk in dev.time_interval_stream(step["samples"], step["tstamp"], \
+            step["binary"]) :
+                values = chunk["value"] if step["tstamp"] else chunk
+                stats.extend(values.tolist())
+                if isinstance(out, Capture_writer) :
+                    out.write(chunk)
+                elif out is not None :
+                    if step["tstamp"] :
+                        chunk = np.column_stack((chunk["value"], chunk["timestamp"]))
+                    np.savetxt(out, chunk, fmt="%.12g", delimiter="\t")
+                    out.flush()
+        finally :
+            if out is not None :
+                out.close()
+        return {"samples" : stats.n, "mean" : stats.mean}
+
+    # ------------------------------------------------------------------------ #
+
+    def _run_step(self, step) :
+        '''
+        Method to run a step with the device already set for it.
+
+        Returns:
+            The result of the FCA3103 method.
+        '''
+        dev = self.device
+        f = step["function"]
+        if f == "trigl" :
+            dev.trigger_level(step["v_min"], step["v_max"])
+            return dev.trig_level[0]
+        if f == "check" :
+            dev.check_trigger_level(v_min=step["v_min"], v_max=step["v_max"])
+            return dev.trig_level[0]
+        if f == "tint" :
+            return self._tint(step)
+        if step["device_stats"] :
+            return dev.statistics(step["samples"])
+        if step["ci"] :
+            return dev.mean_time_interval_ci(step["samples"], step["interval"], \
+            ci=step["ci"]*1e-12)
+        return dev.mean_time_interval(step["samples"], step["interval"])
+
+    # ------------------------------------------------------------------------ #
+
+    def run(self, stop_on_error=False) :
+        '''
+        Method to run the plan.
+
+        Args:
+            stop_on_error (bool) : Stop at the first step that fails. Otherwise
+                its error is reported and the rest of steps are run.
+
+        Returns:
+            A list of Step_result in plan order. changes is the number of
+            settings sent to the instrument before the step (None for trigger
+            sweeps) and seconds its duration, configuration included.
+        '''
+        dev = self.device
+        results = [None] * len(self.steps)
+        state = dict(dev.state or {})
+        for segment in self._segments() :
+            # Resolved here, after the sweeps before the segment
+            levels = self.levels(segment)
+            for i in self._order(segment, levels, state) :
+                results[i] = self._run_at(i, levels[i], stop_on_error)
+        return results
+
+    # ------------------------------------------------------------------------ #
+
+    def _run_at(self, i, level, stop_on_error) :
+        '''
+        Method to run a step at its trigger level, see run.
+
+        The device trigger level is restored after a step with its own level.
+
+        Returns:
+            A Step_result.
+        '''
+        dev = self.device
+        step = self.steps[i]
+        dev.master_chan, dev.slave_chan = self._channels(step)
+        saved = list(dev.trig_level)
+        if level is not None and step["function"] not in SWEEPS :
+            dev.trig_level[0] = dev.trig_level[1] = level
+
+        changes = None
+        if step["function"] not in SWEEPS and dev.trig_level[0] is not None :
+            changes = len(dev.delta(self.settings(step, dev.trig_level)))
+
+        t0 = time.monotonic()
+        result = error = None
+        try :
+            result = self._run_step(step)
+        except (ValueError, MeasureError, TimeoutError, SCPI_error) as e :
+            if stop_on_error :
+                raise
+            error = str(e)
+            if isinstance(e, TimeoutError) :
+                # Don't let its error (-230) or a late response fail the next step
+                dev.drv.abort()
+        finally :
+            if step["level"] is not None :
+                dev.trig_level[:] = saved
+        return Step_result(i, step["name"], step["function"], changes, \
+        time.monotonic() - t0, result, error)
+
+
+def report(results, file=sys.stdout) :
+    '''
+    Function to print the results of a plan, a line per step.
+
+    Args:
+        results (list) : Step_result, as returned by Plan.run.
+        file : Output.
+    '''
+    file.write("# step\tname\tfunction\tchanges\tseconds\tresult\n")
+    for r in results :
+        if r.error is not None :
+            result = "ERROR: %s" % r.error
+        elif isinstance(r.result, dict) :
+            result = " ".join("%s=%g" % kv for kv in r.result.items())
+        elif isinstance(r.result, tuple) :
+            result = " ".join("%g" % v for v in r.result)
+        else :
+            result = "%g" % r.result
+        file.write("%d\t%s\t%s\t%s\t%.3f\t%s\n" % (r.index+1, r.name, r.function, \
+        "-" if r.changes is None else r.changes, r.seconds, result))
+    file.write("# total\t%.3f s\n" % sum(r.seconds for r in results))
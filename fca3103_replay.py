@@ -0,0 +1,319 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Recording of the transport traffic and offline replay of the recorded sessions.
+
+A session file starts with a header (magic, version, Unix start time) followed
+by a record per transport operation: type (b"W" write, b"R" read), time since
+the start (s), payload length and the payload.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import os
+import time
+import queue
+import struct
+import threading
+
+## Magic number at the start of a session file
+MAGIC = b"FCA3103S"
+## Version of the file format
+VERSION = 1
+## Session header: magic, version, Unix time of the start
+HEADER = struct.Struct("<8sHd")
+## Record header: type, time since the start, payload length
+RECORD = struct.Struct("<cdI")
+## Record types
+WRITE = b"W"
+READ = b"R"
+
+
+def load_session(path) :
+    '''
+    Function to read a session file.
+
+    A record cut by a crash of the recorder is ignored.
+
+    Returns:
+        A tuple (Unix start time, list of (type, time, payload) tuples).
+
+    Raises:
+        ValueError if the file is not a session file.
+    '''
+    with open(path, "rb") as f :
+        data = f.read()
+    if len(data) < HEADER.size :
+        raise ValueError("FCA3103 ERROR: Not a session file: %s" % path)
+    magic, version, start = HEADER.unpack_from(data)
+    if magic != MAGIC or version > VERSION :
+        raise ValueError("FCA3103 ERROR: Not a session file: %s" % path)
+    records = []
+    offset = HEADER.size
+    while offset + RECORD.size <= len(data) :
+        kind, t, size = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        if offset + size > len(data) :
+            break
+        records.append((kind, t, data[offset:offset+size]))
+        offset += size
+    return (start, records)
+
+
+class Recorder() :
+    '''
+    Transport wrapper that records every write and read to a session file.
+
+    It can be used wherever a transport is accepted (FCA3103_drv, FCA3103,
+    ...). Anything else (fileno, set_timeout, pollable, ...) is passed to
+    the wrapped transport.
+    '''
+
+    def __init__(self, transport, path) :
+        '''
+        Constructor
+
+        Args:
+            transport : Gen_usbtmc, Sim_fca3103 or any object with the same
+                write and read methods.
+            path (str) : Session file, it is overwritten.
+        '''
+        self.transport = transport
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, time.time()))
+        self._t0 = time.monotonic()
+
+    # ------------------------------------------------------------------------ #
+
+    def __getattr__(self, name) :
+        return getattr(self.transport, name)
+
+    # ------------------------------------------------------------------------ #
+
+    def _record(self, kind, data) :
+        '''
+        Append a record to the session file. It's flushed so a crash doesn't
+        lose the records before it.
+        '''
+        self.file.write(RECORD.pack(kind, time.monotonic() - self._t0, len(data)))
+        self.file.write(data)
+        self.file.flush()
+
+    # ------------------------------------------------------------------------ #
+
+    def write(self, cmd) :
+        '''
+        Write
+
+        Args:
+            cmd (bytes) : A command to write
+        '''
+        self.transport.write(cmd)
+        self._record(WRITE, bytes(cmd))
+
+    # ------------------------------------------------------------------------ #
+
+    def read(self, length=1) :
+        '''
+        Read
+
+        Args:
+            length (int) : Number of bytes to be read
+        '''
+        data = self.transport.read(length)
+        self._record(READ, data)
+        return data
+
+    # ------------------------------------------------------------------------ #
+
+    def readinto(self, buf) :
+        '''
+        Read into a pre-allocated buffer
+
+        Args:
+            buf (memoryview) : Writable buffer, at most len(buf) bytes are read
+
+        Returns:
+            The number of bytes read
+        '''
+        if hasattr(self.transport, "readinto") :
+            n = self.transport.readinto(buf)
+        else :
+            data = self.transport.read(len(buf))
+            n = len(data)
+            buf[:n] = data
+        self._record(READ, bytes(buf[:n]))
+        return n
+
+    # ------------------------------------------------------------------------ #
+
+    def close(self) :
+        '''
+        Close the session file and the wrapped transport.
+        '''
+        if not self.file.closed :
+            self.file.close()
+        self.transport.close()
+
+
+class Replay() :
+    '''
+    Transport that plays back a session recorded by Recorder.
+
+    Each write must be the next one of the session. The reads that followed
+    it in the session are then made available on a pipe, either at once or
+    with their original delay after the write. A write that doesn't match
+    the session raises ValueError, so a replay also checks that the code
+    still sends the same commands.
+    '''
+
+    ## Poll works on the pipe
+    pollable = True
+
+    def __init__(self, path, time_scale=0.0) :
+        '''
+        Constructor
+
+        Args:
+            path (str) : Session file.
+            time_scale (float) : Real seconds per recorded second. 0 replays
+                as fast as possible, 1 with the original timing.
+
+        Raises:
+            ValueError if the file is not a session file.
+        '''
+        self.time_scale = time_scale
+        ## Unix time of the start of the recorded session
+        self.start, self.records = load_session(path)
+        ## Index of the next record
+        self.pos = 0
+
+        self._rfd, self._wfd = os.pipe()
+        self._out = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    # ------------------------------------------------------------------------ #
+
+    def listDevices(self) :
+        '''
+        Method for listing detected devices, not recorded.
+        '''
+        return None
+
+    # ------------------------------------------------------------------------ #
+
+    def write(self, cmd) :
+        '''
+        Write
+
+        Args:
+            cmd (bytes) : A command to write
+
+        Raises:
+            ValueError if it isn't the next write of the session.
+        '''
+        cmd = bytes(cmd)
+        records = self.records
+        if self.pos >= len(records) :
+            raise ValueError("FCA3103 ERROR: Replay ended, unexpected write %r" % cmd)
+        kind, t_write, data = records[self.pos]
+        if kind != WRITE or data != cmd :
+            raise ValueError("FCA3103 ERROR: Replay diverged at record %d: expected %r, got %r" % \
+            (self.pos, data if kind == WRITE else "read", cmd))
+        self.pos += 1
+
+        now = time.monotonic()
+        while self.pos < len(records) and records[self.pos][0] == READ :
+            kind, t, data = records[self.pos]
+            self._out.put((now + (t - t_write) * self.time_scale, data))
+            self.pos += 1
+
+    # ------------------------------------------------------------------------ #
+
+    def read(self, length=1) :
+        '''
+        Read
+
+        Args:
+            length (int) : Number of bytes to be read
+        '''
+        return os.read(self._rfd, length)
+
+    # ------------------------------------------------------------------------ #
+
+    def readinto(self, buf) :
+        '''
+        Read into a pre-allocated buffer
+
+        Args:
+            buf (memoryview) : Writable buffer, at most len(buf) bytes are read
+
+        Returns:
+            The number of bytes read
+        '''
+        return os.readv(self._rfd, [buf])
+
+    # ------------------------------------------------------------------------ #
+
+    def fileno(self) :
+        '''
+        File descriptor where the responses can be read from.
+        '''
+        return self._rfd
+
+    # ------------------------------------------------------------------------ #
+
+    def close(self) :
+        '''
+        Stop the replay and release its file descriptors.
+        '''
+        if self._worker is None :
+            return
+        self._out.put(None)
+        self._worker.join(1)
+        self._worker = None
+        os.close(self._wfd)
+        os.close(self._rfd)
+
+    # ------------------------------------------------------------------------ #
+
+    def _run(self) :
+        '''
+        Worker thread: write the responses to the pipe when they are due.
+        '''
+        while True :
+            item = self._out.get()
+            if item is None :
+                return
+            due, data = item
+            delay = due - time.monotonic()
+            if delay > 0 :
+                time.sleep(delay)
+            out = memoryview(data)
+            try :
+                while out :
+                    out = out[os.write(self._wfd, out):]
+            except OSError :
+                return
@@ -0,0 +1,339 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Fixed size ring buffer for the long term monitoring with a Tektronix FCA3103.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import os
+import time
+import numpy as np
+
+## Magic number at the start of a ring buffer file
+MAGIC = b"FCA3103R"
+## Version of the file format
+VERSION = 1
+## Maximum number of decimation levels
+MAX_LEVELS = 4
+## File header. The write counters are the total number of records written,
+## the position of the next record is counter % capacity
+HEADER = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("levels", "<u4"),
+    ("capacity", "<u8"),
+    ("written", "<u8"),
+    ("level_period", "<f8", (MAX_LEVELS,)),
+    ("level_capacity", "<u8", (MAX_LEVELS,)),
+    ("level_written", "<u8", (MAX_LEVELS,)),
+])
+## Full resolution record: time interval and Unix time of the sample
+SAMPLE = np.dtype([("value", "<f8"), ("time", "<f8")])
+## Decimated record: statistics of the samples taken in a period
+SUMMARY = np.dtype([("time", "<f8"), ("min", "<f8"), ("mean", "<f8"), \
+("max", "<f8"), ("count", "<u8")])
+## Default decimation: per minute for a week and per hour for a year
+LEVELS = ((60, 7*24*60), (3600, 365*24))
+
+
+class Ring_buffer() :
+    '''
+    Time interval samples in a memory mapped ring buffer of fixed size.
+
+    The file holds the last capacity samples at full resolution and, for
+    each decimation level, the min/mean/max of the samples taken in each
+    period (e.g. each minute and each hour) for the last periods. The file
+    size is fixed when it is created, so the monitor can run forever.
+
+    There is a single writer. Any number of readers can open the same file
+    (readonly) and see the new samples as they are written: the records are
+    written before the counters in the header, and the data methods return
+    views on the mapped file, so nothing is copied unless the requested
+    records wrap around the end of the ring.
+    '''
+
+    def __init__(self, path, capacity=None, levels=LEVELS, readonly=False) :
+        '''
+        Constructor
+
+        Args:
+            path (str) : Ring buffer file. If it doesn't exist it's created.
+            capacity (int) : Number of samples at full resolution, needed to
+                create the file.
+            levels (tuple) : (period in seconds, number of periods) for each
+                decimation level, used when the file is created.
+            readonly (bool) : Open the file for reading only.
+
+        Raises:
+            ValueError if the file is not a ring buffer.
+        '''
+        if not os.path.exists(path) :
+            if readonly or capacity is None :
+                raise ValueError("FCA3103 ERROR: %s doesn't exist" % path)
+            self._create(path, capacity, levels)
+
+        self.path = path
+        self.mmap = np.memmap(path, np.uint8, "r" if readonly else "r+")
+        ## File header (a view on the file)
+        self.header = self.mmap[:HEADER.itemsize].view(HEADER)[0:1]
+        h = self.header[0]
+        if h["magic"] != MAGIC or h["version"] > VERSION :
+            raise ValueError("FCA3103 ERROR: %s is not a ring buffer" % path)
+        self.capacity = int(h["capacity"])
+        offset = HEADER.itemsize
+        ## Full resolution samples
+        self.samples = self.mmap[offset:offset + self.capacity * SAMPLE.itemsize].view(SAMPLE)
+        offset += self.capacity * SAMPLE.itemsize
+        ## (period, summary records) for each decimation level
+        self.levels = []
+        for i in range(int(h["levels"])) :
+            size = int(h["level_capacity"][i]) * SUMMARY.itemsize
+            self.levels.append((float(h["level_period"][i]), \
+            self.mmap[offset:offset + size].view(SUMMARY)))
+            offset += size
+        # Bucket being accumulated for each level: [id, min, sum, max, count]
+        self._pending = [None] * len(self.levels)
+
+    # ------------------------------------------------------------------------ #
+
+    @staticmethod
+    def _create(path, capacity, levels) :
+        '''
+        Create an empty ring buffer file.
+        '''
+        if len(levels) > MAX_LEVELS :
+            raise ValueError("FCA3103 ERROR: At most %d decimation levels" % MAX_LEVELS)
+        header = np.zeros(1, HEADER)
+        header["magic"] = MAGIC
+        header["version"] = VERSION
+        header["levels"] = len(levels)
+        header["capacity"] = capacity
+        for i, (period, n) in enumerate(levels) :
+            header["level_period"][0][i] = period
+            header["level_capacity"][0][i] = n
+        size = HEADER.itemsize + capacity * SAMPLE.itemsize + \
+        sum(n for _, n in levels) * SUMMARY.itemsize
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "wb") as f :
+            f.write(header.tobytes())
+            f.truncate(size)
+        os.replace(tmp, path)
+
+    # ------------------------------------------------------------------------ #
+
+    @staticmethod
+    def _put(ring, start, records) :
+        '''
+        Copy records into a ring from the absolute position start.
+        '''
+        n = len(ring)
+        if len(records) > n :
+            start += len(records) - n
+            records = records[-n:]
+        i = start % n
+        first = min(len(records), n - i)
+        ring[i:i+first] = records[:first]
+        ring[:len(records)-first] = records[first:]
+
+    # ------------------------------------------------------------------------ #
+
+    def append(self, values, times) :
+        '''
+        Method to add samples, updating the decimation levels.
+
+        Args:
+            values (array) : Time intervals.
+            times (array) : Unix time of each sample, in increasing order.
+        '''
+        n = len(values)
+        if n == 0 :
+            return
+        records = np.empty(n, SAMPLE)
+        records["value"] = values
+        records["time"] = times
+        written = int(self.header["written"][0])
+        self._put(self.samples, written, records)
+        # Publish the samples after they are in place
+        self.header["written"] = written + n
+
+        for i in range(len(self.levels)) :
+            self._decimate(i, records["time"], records["value"])
+
+    # ------------------------------------------------------------------------ #
+
+    def _decimate(self, level, t, v) :
+        '''
+        Accumulate samples in the buckets of a level, storing the completed ones.
+        '''
+        period, ring = self.levels[level]
+        ids = np.floor(t / period).astype(np.int64)
+        # Start of each run of samples in the same bucket
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        mins = np.minimum.reduceat(v, starts)
+        maxs = np.maximum.reduceat(v, starts)
+        sums = np.add.reduceat(v, starts)
+        counts = np.diff(np.r_[starts, len(v)])
+        buckets = [[ids[s], mins[k], sums[k], maxs[k], counts[k]] \
+        for k, s in enumerate(starts)]
+
+        pending = self._pending[level]
+        if pending is not None :
+            if pending[0] == buckets[0][0] :
+                b = buckets[0]
+                b[1] = min(b[1], pending[1])
+                b[2] += pending[2]
+                b[3] = max(b[3], pending[3])
+                b[4] += pending[4]
+            else :
+                buckets.insert(0, pending)
+        self._pending[level] = buckets.pop()
+        if not buckets :
+            return
+
+        done = np.empty(len(buckets), SUMMARY)
+        for k, (b, lo, s, hi, c) in enumerate(buckets) :
+            done[k] = (b * period, lo, s / c, hi, c)
+        written = int(self.header["level_written"][0][level])
+        self._put(ring, written, done)
+        self.header["level_written"][0][level] = written + len(done)
+
+    # ------------------------------------------------------------------------ #
+
+    @staticmethod
+    def _last(ring, written, n) :
+        '''
+        Get the last n records of a ring, oldest first.
+        '''
+        size = len(ring)
+        n = min(n, written, size)
+        end = written % size
+        if n <= end :
+            return ring[end-n:end]
+        # The records wrap around the end of the ring
+        return np.concatenate((ring[size-(n-end):], ring[:end]))
+
+    # ------------------------------------------------------------------------ #
+
+    def __len__(self) :
+        return int(min(self.header["written"][0], self.capacity))
+
+    # ------------------------------------------------------------------------ #
+
+    def written(self) :
+        '''
+        Method to get the number of samples written since the file was created.
+        '''
+        return int(self.header["written"][0])
+
+    # ------------------------------------------------------------------------ #
+
+    def latest(self, n=None) :
+        '''
+        Method to get the last samples at full resolution.
+
+        Args:
+            n (int) : Number of samples. Default : all the stored ones.
+
+        Returns:
+            A SAMPLE array, oldest first. It's a view on the file unless the
+            samples wrap around the end of the ring.
+        '''
+        return self._last(self.samples, self.written(), \
+        self.capacity if n is None else n)
+
+    # ------------------------------------------------------------------------ #
+
+    def summaries(self, level=0, n=None) :
+        '''
+        Method to get the last decimated records of a level.
+
+        The period being accumulated is not included.
+
+        Args:
+            level (int) : Decimation level.
+            n (int) : Number of records. Default : all the stored ones.
+
+        Returns:
+            A SUMMARY array, oldest first (see latest).
+        '''
+        period, ring = self.levels[level]
+        return self._last(ring, int(self.header["level_written"][0][level]), \
+        len(ring) if n is None else n)
+
+    # ------------------------------------------------------------------------ #
+
+    def flush(self) :
+        '''
+        Method to write the changes to the disk.
+        '''
+        self.mmap.flush()
+
+    # ------------------------------------------------------------------------ #
+
+    def close(self) :
+        '''
+        Method to close the file.
+        '''
+        if self.mmap.mode != "r" :
+            self.flush()
+        del self.samples, self.levels, self.header, self.mmap
+
+
+def monitor(device, ring, block=3600, stop=None) :
+    '''
+    Function to store time interval samples in a ring buffer until it is stopped.
+
+    The instrument measures in continuous mode with timestamps (in REAL
+    format), see FCA3103.continuous_stream, so no PPS edge is lost between
+    blocks. Each chunk fetched is appended to the ring with the host time
+    when the measurement started plus the instrument timestamp.
+
+    Args:
+        device (FCA3103) : Instrument, with its channels and trigger levels set.
+        ring (Ring_buffer) : Output.
+        block (int) : Number of samples between flushes of the ring.
+        stop (threading.Event) : Stop when it's set. Default : run forever.
+
+    Returns:
+        The number of samples stored.
+    '''
+    total = 0
+    pending = 0
+    t0 = time.time()
+    stream = device.continuous_stream(binary=True)
+    try :
+        for chunk in stream :
+            ring.append(chunk["value"], t0 + chunk["timestamp"])
+            total += len(chunk)
+            pending += len(chunk)
+            if pending >= block :
+                ring.flush()
+                pending = 0
+            if stop is not None and stop.is_set() :
+                break
+    finally :
+        stream.close()
+        ring.flush()
+    return total
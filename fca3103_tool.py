@@ -26,11 +26,95 @@ Terminal tool to make Time Interval measures using the Tektronix FCA3103
 # -----------------------------------------------------------------------------
 #                                   Import                                   --
 # -----------------------------------------------------------------------------
+import sys
 import datetime
 import argparse as arg
-from subprocess import check_output
 
 from FCA3103 import FCA3103
+from running_stats import t_factor
+from fca3103_discovery import scan, discover, find, Device_cache
+from fca3103_group import FCA3103_group
+from fca3103_capture import Capture_writer, metadata
+from fca3103_ring import Ring_buffer, monitor
+from fca3103_trace import Jsonl_sink, Prometheus_sink
+from fca3103_pipeline import Pipeline
+from fca3103_plan import Plan, load_plan, report
+from fca3103_replay import Recorder, Replay
+from sim_fca3103 import Sim_fca3103
+from gen_usbtmc import Gen_usbtmc
+
+
+def setup(device, args) :
+    '''
+    Apply the command line options to a FCA3103
+    '''
+    device.show_dbg = args.debug
+    if args.sim and args.sim_speed > 0:
+        device.pps_period = 1/args.sim_speed
+    device.t_samples = args.interval
+    device.n_samples = args.samples
+    device.skip_values = True if args.skip > 0 else False
+    if args.skip > 0:
+        device.error = args.skip
+    # TODO: Add de posibility of using different trigger values for the inputs
+    if args.trigl is not None:
+        device.trig_level[0] = device.trig_level[1] = args.trigl
+    elif args.auto_trig:
+        device.check_trigger_level()
+    elif device.trig_level[0] is None:
+        device.trig_level[0] = device.trig_level[1] = 1.5
+
+
+def check_serials(devices, args, cache) :
+    '''
+    Check that the devices opened are the ones selected by serial number
+
+    A cached port can be stale if the devices were reconnected.
+    '''
+    if args.sim or args.replay or not args.serial:
+        return
+    for device, serial in zip(devices, args.serial):
+        if device.drv.serial != serial:
+            cache.forget(serial)
+            print("Device %s moved, run the tool again or use --list" % (serial))
+            exit(6)  # No such device or address
+
+
+def write_text(file, values, tstamp) :
+    '''
+    Write a chunk of samples to a text file, a line per sample
+    '''
+    if tstamp:
+        file.write("".join(["%g\t%g\n" % (v, t) for v, t in \
+        zip(values["value"].tolist(), values["timestamp"].tolist())]))
+    else:
+        file.write("".join(["%s\n" % v for v in values.tolist()]))
+    file.flush()
+
+
+def start_trace(devices, args) :
+    '''
+    Attach the timing sinks selected in the command line to the devices
+    '''
+    sinks = []
+    if args.trace:
+        sinks.append(Jsonl_sink(args.trace))
+    if args.metrics:
+        sinks.append(Prometheus_sink())
+    for device in devices:
+        device.drv.sinks.extend(sinks)
+    return sinks
+
+
+def stop_trace(sinks, args) :
+    '''
+    Write the metrics and close the trace file
+    '''
+    for sink in sinks:
+        if isinstance(sink, Prometheus_sink):
+            sink.write(args.metrics)
+        else:
+            sink.close()
 
 
 def main() :
@@ -39,72 +123,264 @@ def main() :
     '''
     parser = arg.ArgumentParser(description='Tektronix FCA3103 tool')
 
-    parser.add_argument('--function', '-f', help='Measuring Function', choices=['mtint','tint'],\
-    required=True)
+    parser.add_argument('--function', '-f', help='Measuring Function', choices=['mtint','tint','cont','monitor'])
     parser.add_argument('--interval', '-t', help='Time between samples', type=int)
-    parser.add_argument('--samples', '-s', help='Number of samples', type=int, \
+    parser.add_argument('--samples', '-s', help='Number of samples (cont: 0 runs until Ctrl-C)', type=int, \
     default=1)
     parser.add_argument('--debug', '-d', help="Enable debug output", action="store_true", \
     default=False)
-    parser.add_argument('--device', '-l', help="Device port", type=int, default=1)
+    parser.add_argument('--device', '-l', help="Device port (several ports measure in parallel)", \
+    type=int, nargs='+', default=[1])
+    parser.add_argument('--serial', '-n', help="Select the devices by serial number instead of port", \
+    type=str, nargs='+')
+    parser.add_argument('--list', help="List the connected devices and exit", action="store_true", \
+    default=False)
+    parser.add_argument('--plan', '-p', help="Run the measurement plan in PLAN (JSON or YAML, see fca3103_plan)", \
+    type=str)
     parser.add_argument('--output', '-o', help='Output data file', type=str)
+    parser.add_argument('--format', '-m', help='Output file format (bin: capture file, see fca3103_capture)', \
+    choices=['txt','bin'], default='txt')
+    parser.add_argument('--window', '-w', help='Hours kept at full resolution by monitor', \
+    type=float, default=24)
     parser.add_argument('--ref', '-r', help='Input channel for the reference',type=int, \
     choices=[1,2],default=1)
-    parser.add_argument('--trigl','-g',help='Input trigger level', type=float, \
-    default=1.5)
+    parser.add_argument('--trigl','-g',help='Input trigger level (default: cached level or 1.5)', \
+    type=float)
+    parser.add_argument('--auto-trig','-a',help='Check the cached trigger level, sweep if stale or drifted', \
+    action="store_true", default=False)
     parser.add_argument('--skip','-i',help='Ignore values far from mean  plus error',type=int, \
     default=0)
     parser.add_argument('--tstamp','-x', help='Add timestamping for each measure',action="store_true", \
     default=False)
+    parser.add_argument('--ci','-c', help='Stop mtint when the 95%% confidence interval of the mean is below CI ps',\
+    type=float)
+    parser.add_argument('--device-stats','-S', help='Average mtint in the instrument (CALC:AVER) instead of reading every sample', \
+    action="store_true", default=False)
+    parser.add_argument('--binary','-b', help='Transfer the measures in binary format',action="store_true", \
+    default=False)
+    parser.add_argument('--trace', help='Append a JSON line with the timing of each command to TRACE', \
+    type=str)
+    parser.add_argument('--metrics', help='Write the command latencies to METRICS (Prometheus text format)', \
+    type=str)
+    parser.add_argument('--sim', help='Use a simulated instrument instead of /dev/usbtmc', \
+    action="store_true", default=False)
+    parser.add_argument('--sim-speed', help='Simulated PPS periods per second (0: unthrottled)', \
+    type=float, default=1.0)
+    parser.add_argument('--record', help='Record the commands and responses of the session to RECORD', \
+    type=str)
+    parser.add_argument('--replay', help='Replay the session recorded in REPLAY instead of using a device', \
+    type=str)
+    parser.add_argument('--replay-timing', help='Replay with the recorded timing (default: as fast as possible)', \
+    action="store_true", default=False)
 
     args = parser.parse_args()
 
-    valid_port = False
-    ports = check_output(["""ls /dev | grep usbtmc"""],shell=True)[:-1]
-    for p in ports.splitlines():
-        p = p.decode('utf-8')
-        if int(p[-1]) == args.device:
-            valid_port = True
-    if not valid_port:
-        print("No device found at /dev/usbtmc%d" % (args.device))
-        exit(6)  # No such device or address
-
-    device = FCA3103(args.device, args.ref, 2 if args.ref == 1 else 1)
-    device.show_dbg = args.debug
-    device.t_samples = args.interval
-    device.n_samples = args.samples
-    device.skip_values = True if args.skip > 0 else False
-    device.error = args.skip
-    # TODO: Add de posibility of using different trigger values for the inputs
-    device.trig_level[0] = device.trig_level[1] = args.trigl
+    cache = Device_cache()
+    if args.list:
+        for port, idn in sorted(discover(cache=cache).items()):
+            print("/dev/usbtmc%d\t%s %s (s/n : %s)" % ((port,) + idn))
+        return
+    if args.plan:
+        if len(args.device) > 1 or (args.serial and len(args.serial) > 1):
+            parser.error("--plan needs a single device")
+        try:
+            plan = load_plan(args.plan)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    elif args.function is None:
+        parser.error("the following arguments are required: --function/-f or --plan/-p")
+    if args.format == 'bin' and (not args.output or len(args.device) > 1 or \
+    (args.serial and len(args.serial) > 1)):
+        parser.error("--format bin needs --output and a single device")
+    if args.function == 'cont' and (len(args.device) > 1 or (args.serial and len(args.serial) > 1)):
+        parser.error("cont needs a single device")
+    if args.function == 'monitor' and (not args.output or len(args.device) > 1):
+        parser.error("monitor needs --output (the ring buffer file) and a single device")
+
+    if (args.record or args.replay) and (len(args.device) > 1 or \
+    (args.serial and len(args.serial) > 1)):
+        parser.error("--record and --replay need a single device")
+    if args.record and args.replay:
+        parser.error("--record and --replay can't be used together")
+
+    transports = [None] * len(args.device)
+    if args.replay:
+        try:
+            transports = [Replay(args.replay, 1.0 if args.replay_timing else 0.0)]
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    elif args.sim:
+        transports = [Sim_fca3103(time_scale=1/args.sim_speed if args.sim_speed > 0 else 0, \
+        serial="SIM%04d" % port) for port in args.device]
+    elif args.serial:
+        args.device = []
+        for serial in args.serial:
+            port = find(serial, cache=cache)
+            if port is None:
+                print("No device found with serial number %s" % (serial))
+                exit(6)  # No such device or address
+            args.device.append(port)
+        transports = [None] * len(args.device)
+    else:
+        ports = scan()
+        for port in args.device:
+            if port not in ports:
+                print("No device found at /dev/usbtmc%d" % (port))
+                exit(6)  # No such device or address
+
+    if args.record:
+        if transports[0] is None:
+            transports[0] = Gen_usbtmc(args.device[0])
+        transports[0] = Recorder(transports[0], args.record)
+
+    # A recorded session can't depend on the trigger levels cached in this host
+    session = args.record or args.replay
+    if len(args.device) > 1:
+        group = FCA3103_group(args.device, args.ref, 2 if args.ref == 1 else 1, transports, \
+        trig_cache=None if session else True)
+        check_serials(group.devices, args, cache)
+        sinks = start_trace(group.devices, args)
+        for device in group.devices:
+            setup(device, args)
+        measure_group(group, args)
+        group.close()
+        stop_trace(sinks, args)
+        return
+
+    device = FCA3103(args.device[0], args.ref, 2 if args.ref == 1 else 1, transport=transports[0], \
+    trig_cache=None if session else True)
+    check_serials([device], args, cache)
+    sinks = start_trace([device], args)
+    setup(device, args)
     # try:
-    if args.function == 'mtint':
+    if args.plan:
+        print("Running the measurement plan '%s' (%d steps)..." % (args.plan, len(plan)))
+        report(Plan(device, plan).run())
+
+    elif args.function == 'mtint':
         print("Measuring Mean Time Interval between the inputs (%d secs)..." % (args.samples))
-        mean = device.mean_time_interval(args.samples, args.interval)
-        print("Mean Time Interval for %d samples: %g" % (args.samples, mean))
+        if args.device_stats:
+            stats = device.statistics(args.samples)
+            print("Mean Time Interval for %d samples: %g (stdev %g, min %g, max %g, adev %g)" % \
+            (args.samples, stats["mean"], stats["stdev"], stats["min"], stats["max"], stats["adev"]))
+        elif args.ci:
+            mean, stderr, n = device.mean_time_interval_ci(args.samples, args.interval, ci=args.ci*1e-12)
+            print("Mean Time Interval for %d samples: %g +- %g" % (n, mean, \
+            t_factor(0.95, n - 1) * stderr))
+        else:
+            mean = device.mean_time_interval(args.samples, args.interval)
+            print("Mean Time Interval for %d samples: %g" % (args.samples, mean))
 
     elif args.function == 'tint':
         print("Measuring Time Interval between the inputs (%d secs)..." % (args.samples+10))
-        values = device.time_interval(args.samples, tstamp=args.tstamp)
-        if args.output:
+        # Fetching and writing overlap, see fca3103_pipeline
+        pipeline = Pipeline(device)
+        if args.output and args.format == 'bin':
+            meta = metadata(device, args.samples, args.tstamp)
+            with Capture_writer(args.output, meta, args.tstamp) as capture:
+                pipeline.run(args.samples, capture.write, args.tstamp, args.binary)
+            print("Run %s (%d samples) writed to '%s'" % (meta["run_id"], capture.count, args.output))
+        elif args.output:
             with open(args.output,'a+') as file:
                 file.write("# Time Interval Measurement (%d samples) with Tektronix FCA3103 (50ps)\n" % args.samples)
                 file.write("# %s\n" % datetime.datetime.now().strftime('%Y-%m-%d-%H-%M-%S'))
-                for v in values:
-                    if args.tstamp:
-                        file.write("%g\t%g\n" % (v[0], v[1]))
-                    else:
-                        file.write(str(v))
-                        file.write("\n")
+                file.flush()
+                # Write each chunk as soon as it is read, so nothing is lost on a crash
+                pipeline.run(args.samples, lambda values: write_text(file, values, args.tstamp), \
+                args.tstamp, args.binary)
             print("Output writed to '%s'" % (args.output))
         else:
             print("Time Interval Measurement (%d samples) with Tektronix FCA3103 (50ps)" % args.samples)
             print("%s\n" % datetime.datetime.now().strftime('%Y-%m-%d-%H-%M-%S'))
-            for v in values:
-                print(v)
+            pipeline.run(args.samples, lambda values: write_text(sys.stdout, values, args.tstamp), \
+            args.tstamp, args.binary)
+
+    elif args.function == 'cont':
+        print("Measuring Time Interval continuously between the inputs (Ctrl-C to stop)...")
+        measure_continuous(device, args)
+
+    elif args.function == 'monitor':
+        ring = Ring_buffer(args.output, int(args.window * 3600 / device.pps_period))
+        print("Monitoring the Time Interval between the inputs in '%s' (Ctrl-C to stop)..." % (args.output))
+        try:
+            monitor(device, ring)
+        except KeyboardInterrupt:
+            pass
+        print("%d samples stored in '%s'" % (ring.written(), args.output))
+        ring.close()
 
     # except Exception as e:
     #     print(e)
 
+    stop_trace(sinks, args)
+    if args.record:
+        transports[0].close()
+        print("Session recorded in '%s'" % (args.record))
+
+
+def report_gaps(gaps, file=sys.stderr) :
+    '''
+    Print the gap statistics of a continuous measurement in a single line
+    '''
+    r = gaps.report()
+    file.write("\r%d samples, %d gaps (%d missed, %.3g%%), %d duplicates, %d misaligned, %d overflows " % \
+    (r["samples"], r["gaps"], r["missed"], 100*r["loss"], r["duplicates"], r["misaligned"], r["overflows"]))
+    file.flush()
+
+
+def measure_continuous(device, args) :
+    '''
+    Measure in continuous mode, writing the samples and the gap statistics as they arrive
+    '''
+    n_samples = args.samples if args.samples > 0 else None
+    if args.output and args.format == 'bin':
+        meta = metadata(device, n_samples, True, continuous=True)
+        out = Capture_writer(args.output, meta, True)
+        write = out.write
+    else:
+        out = open(args.output,'a+') if args.output else sys.stdout
+        out.write("# Continuous Time Interval Measurement with Tektronix FCA3103 (50ps)\n")
+        out.write("# %s\n" % datetime.datetime.now().strftime('%Y-%m-%d-%H-%M-%S'))
+        write = lambda values: write_text(out, values, True)
+
+    stream = device.continuous_stream(args.binary, n_samples)
+    try:
+        for chunk in stream:
+            write(chunk)
+            report_gaps(device.gaps)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stream.close()
+        sys.stderr.write("\n")
+        if out is not sys.stdout:
+            out.close()
+    if args.output:
+        print("%d samples writed to '%s'" % (device.gaps.samples, args.output))
+
+
+def measure_group(group, args) :
+    '''
+    Run the selected function with several instruments in parallel
+    '''
+    if args.function == 'mtint':
+        print("Measuring Mean Time Interval between the inputs (%d secs)..." % (args.samples))
+        means = group.mean_time_interval(args.samples, args.interval, args.device_stats)
+        for serial in means:
+            print("%s Mean Time Interval for %d samples: %g" % (serial, args.samples, means[serial]))
+
+    elif args.function == 'tint':
+        print("Measuring Time Interval between the inputs (%d secs)..." % (args.samples+10))
+        file = open(args.output,'a+') if args.output else sys.stdout
+        file.write("# Time Interval Measurement (%d samples) with Tektronix FCA3103 (50ps)\n" % args.samples)
+        file.write("# %s\n" % datetime.datetime.now().strftime('%Y-%m-%d-%H-%M-%S'))
+        file.write("# serial\thost time\tvalue%s\n" % ("\ttimestamp" if args.tstamp else ""))
+        for rec in group.time_interval_stream(args.samples, tstamp=args.tstamp, binary=args.binary):
+            file.write("%s\t%.6f\t%s\n" % (rec[1], rec[0], "\t".join(repr(v) for v in rec[2:])))
+            file.flush()
+        if args.output:
+            file.close()
+            print("Output writed to '%s'" % (args.output))
+
 if __name__ == "__main__" :
     main()
@@ -0,0 +1,287 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Timing events of the Tektronix FCA3103 driver and their sinks.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import os
+import json
+import time
+import bisect
+import threading
+import functools
+from collections import namedtuple
+
+## A timed operation:
+##   kind : "write" or "query" (driver) or "method" (FCA3103).
+##   name : Command header (see command_name) or method name.
+##   bytes_out, bytes_in : Bytes written to and read from the instrument.
+##   wait : Time waiting for the instrument to answer, or pacing (s).
+##   transfer : Time in the transport write and read calls (s).
+##   total : Duration of the operation (s), the rest is host processing
+##           and sleeps.
+##   time : Unix time at the end of the operation.
+##   error : Name of the exception raised, or None.
+Event = namedtuple("Event", "kind name bytes_out bytes_in wait transfer total time error")
+
+## Upper bounds of the latency histogram buckets (s)
+BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 0.01, \
+0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 100)
+
+
+def command_name(cmd) :
+    '''
+    Function to get the name used to group the events of a command.
+
+    Only the header of the first command of a program is kept, so the names
+    don't depend on the command arguments.
+
+    Args:
+        cmd (str) : Command or program sent to the instrument.
+    '''
+    name = cmd.split(";")[0].split()
+    return name[0].upper() if name else ""
+
+
+def traced(method) :
+    '''
+    Decorator to emit a "method" event for each call of a FCA3103 method.
+
+    The event carries the bytes, wait and transfer time of all the driver
+    operations done during the call. Nothing is measured if the driver has
+    no sinks.
+    '''
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs) :
+        drv = self.drv
+        if not getattr(drv, "sinks", None) :
+            return method(self, *args, **kwargs)
+        before = list(drv.trace_totals)
+        t0 = time.perf_counter()
+        error = None
+        try :
+            return method(self, *args, **kwargs)
+        except Exception as e :
+            error = type(e).__name__
+            raise
+        finally :
+            total = time.perf_counter() - t0
+            delta = [a - b for a, b in zip(drv.trace_totals, before)]
+            drv.emit(Event("method", method.__name__, delta[0], delta[1], delta[2], \
+            delta[3], total, time.time(), error))
+    return wrapper
+
+
+class Histogram_sink() :
+    '''
+    Sink that keeps a latency histogram and totals for each command.
+    '''
+
+    def __init__(self, buckets=BUCKETS) :
+        '''
+        Constructor
+
+        Args:
+            buckets (tuple) : Upper bounds of the buckets (s), increasing.
+        '''
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        ## (kind, name) -> [counts per bucket (+Inf last), count, total,
+        ## wait, transfer, bytes out, bytes in, errors]
+        self.stats = {}
+
+    # ------------------------------------------------------------------------ #
+
+    def emit(self, event) :
+        '''
+        Method to add an event.
+        '''
+        with self._lock :
+            s = self.stats.get((event.kind, event.name))
+            if s is None :
+                s = self.stats[(event.kind, event.name)] = \
+                [[0] * (len(self.buckets) + 1), 0, 0.0, 0.0, 0.0, 0, 0, 0]
+            s[0][bisect.bisect_left(self.buckets, event.total)] += 1
+            s[1] += 1
+            s[2] += event.total
+            s[3] += event.wait
+            s[4] += event.transfer
+            s[5] += event.bytes_out
+            s[6] += event.bytes_in
+            s[7] += event.error is not None
+
+    # ------------------------------------------------------------------------ #
+
+    def quantile(self, kind, name, q) :
+        '''
+        Method to estimate a latency quantile from the histogram.
+
+        Returns:
+            The upper bound of the bucket with the quantile (s), inf if it's
+            beyond the last bucket, or nan if there are no events.
+        '''
+        with self._lock :
+            s = self.stats.get((kind, name))
+            counts = list(s[0]) if s is not None else []
+        n = sum(counts)
+        if n == 0 :
+            return float("nan")
+        acc = 0
+        for i, c in enumerate(counts) :
+            acc += c
+            if acc >= q * n :
+                break
+        return self.buckets[i] if i < len(self.buckets) else float("inf")
+
+    # ------------------------------------------------------------------------ #
+
+    def summary(self) :
+        '''
+        Method to summarize the events.
+
+        Returns:
+            A list of dicts (kind, name, count, total, mean, wait, transfer,
+            bytes_out, bytes_in, errors, p50, p90, p99), the slowest first.
+        '''
+        with self._lock :
+            items = [(k, list(s)) for k, s in self.stats.items()]
+        rows = []
+        for (kind, name), s in items :
+            rows.append({"kind" : kind, "name" : name, "count" : s[1], "total" : s[2], \
+            "mean" : s[2] / s[1], "wait" : s[3], "transfer" : s[4], "bytes_out" : s[5], \
+            "bytes_in" : s[6], "errors" : s[7], \
+            "p50" : self.quantile(kind, name, 0.5), "p90" : self.quantile(kind, name, 0.9), \
+            "p99" : self.quantile(kind, name, 0.99)})
+        rows.sort(key=lambda r : r["total"], reverse=True)
+        return rows
+
+    # ------------------------------------------------------------------------ #
+
+    def reset(self) :
+        '''
+        Method to remove all the events.
+        '''
+        with self._lock :
+            self.stats = {}
+
+
+class Prometheus_sink(Histogram_sink) :
+    '''
+    Histogram sink that can be exported in the Prometheus text format.
+
+    The output can be served by any HTTP server or written to the textfile
+    collector directory of node_exporter with write().
+    '''
+
+    ## Prefix of the metric names
+    prefix = "fca3103"
+
+    def exposition(self) :
+        '''
+        Method to render the metrics in the Prometheus text exposition format.
+
+        Returns:
+            A str.
+        '''
+        p = self.prefix
+        with self._lock :
+            items = sorted((k, [list(s[0])] + s[1:]) for k, s in self.stats.items())
+        lines = [
+            "# HELP %s_operation_seconds Duration of the FCA3103 operations." % p,
+            "# TYPE %s_operation_seconds histogram" % p,
+        ]
+        for (kind, name), s in items :
+            labels = 'kind="%s",name="%s"' % (kind, name.replace("\\", "\\\\").replace('"', '\\"'))
+            acc = 0
+            for le, c in zip(self.buckets + (float("inf"),), s[0]) :
+                acc += c
+                lines.append('%s_operation_seconds_bucket{%s,le="%s"} %d' % (p, labels, \
+                "+Inf" if le == float("inf") else repr(le), acc))
+            lines.append("%s_operation_seconds_sum{%s} %r" % (p, labels, s[2]))
+            lines.append("%s_operation_seconds_count{%s} %d" % (p, labels, s[1]))
+        for i, metric, kind_, help_ in ((3, "wait_seconds_total", "counter", \
+        "Time waiting for the instrument."), (4, "transfer_seconds_total", "counter", \
+        "Time in transport reads and writes."), (5, "bytes_out_total", "counter", \
+        "Bytes written to the instrument."), (6, "bytes_in_total", "counter", \
+        "Bytes read from the instrument."), (7, "errors_total", "counter", \
+        "Operations that raised an exception.")) :
+            lines.append("# HELP %s_%s %s" % (p, metric, help_))
+            lines.append("# TYPE %s_%s %s" % (p, metric, kind_))
+            for (kind, name), s in items :
+                labels = 'kind="%s",name="%s"' % (kind, name.replace("\\", "\\\\").replace('"', '\\"'))
+                lines.append("%s_%s{%s} %r" % (p, metric, labels, s[i]))
+        return "\n".join(lines) + "\n"
+
+    # ------------------------------------------------------------------------ #
+
+    def write(self, path) :
+        '''
+        Method to write the metrics to a file atomically.
+        '''
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "w") as f :
+            f.write(self.exposition())
+        os.replace(tmp, path)
+
+
+class Jsonl_sink() :
+    '''
+    Sink that writes each event as a JSON line.
+    '''
+
+    def __init__(self, file) :
+        '''
+        Constructor
+
+        Args:
+            file : Path of the trace file (events are appended) or an open
+                text file.
+        '''
+        self._own = isinstance(file, str)
+        self.file = open(file, "a") if self._own else file
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------------ #
+
+    def emit(self, event) :
+        '''
+        Method to write an event.
+        '''
+        line = json.dumps(event._asdict()) + "\n"
+        with self._lock :
+            self.file.write(line)
+
+    # ------------------------------------------------------------------------ #
+
+    def close(self) :
+        '''
+        Method to flush the trace, closing the file if it was opened by the sink.
+        '''
+        with self._lock :
+            if self._own :
+                self.file.close()
+            else :
+                self.file.flush()
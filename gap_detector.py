@@ -0,0 +1,116 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Detection of missing and duplicated samples from their timestamps.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import numpy as np
+
+class Gap_detector() :
+    '''
+    Check that timestamped samples arrive once per period.
+
+    The timestamps are compared with the previous one: a step of k periods
+    means k-1 missing samples (a gap), a step of 0 periods (or backwards) a
+    duplicated sample. Steps that are far from a whole number of periods are
+    counted as misaligned.
+    '''
+
+    def __init__(self, period=1.0, tolerance=0.25) :
+        '''
+        Constructor
+
+        Args:
+            period (float) : Expected time between samples (s).
+            tolerance (float) : Maximum deviation of a step from a whole
+                number of periods (fraction of period).
+        '''
+        self.period = period
+        self.tolerance = tolerance
+        ## Number of samples checked
+        self.samples = 0
+        ## Number of gaps (steps of more than a period)
+        self.gaps = 0
+        ## Number of samples missing in the gaps
+        self.missed = 0
+        ## Number of duplicated (or backwards) samples
+        self.duplicates = 0
+        ## Number of steps that aren't a whole number of periods
+        self.misaligned = 0
+        ## Number of times the output buffer was found full (samples may be lost)
+        self.overflows = 0
+        ## Timestamp of the last sample
+        self.last = None
+
+    # ------------------------------------------------------------------------ #
+
+    def add(self, timestamps) :
+        '''
+        Method to check new samples.
+
+        Args:
+            timestamps (array) : Timestamps of the samples (s), in the order
+                they were taken.
+
+        Returns:
+            The number of samples missing before or between these ones.
+        '''
+        ts = np.asarray(timestamps, np.float64)
+        if len(ts) == 0 :
+            return 0
+        if self.last is not None :
+            ts = np.concatenate(([self.last], ts))
+        steps = np.diff(ts) / self.period
+        k = np.rint(steps)
+        missed = int(np.sum(k[k > 1] - 1))
+        self.gaps += int(np.count_nonzero(k > 1))
+        self.missed += missed
+        self.duplicates += int(np.count_nonzero(k < 1))
+        self.misaligned += int(np.count_nonzero(np.abs(steps - k) > self.tolerance))
+        self.samples += len(ts) - (self.last is not None)
+        self.last = float(ts[-1])
+        return missed
+
+    # ------------------------------------------------------------------------ #
+
+    def report(self) :
+        '''
+        Method to get the current counters.
+
+        Returns:
+            A dict with samples, gaps, missed, duplicates, misaligned,
+            overflows and loss (fraction of the expected samples missing).
+        '''
+        expected = self.samples + self.missed
+        return {
+            "samples" : self.samples,
+            "gaps" : self.gaps,
+            "missed" : self.missed,
+            "duplicates" : self.duplicates,
+            "misaligned" : self.misaligned,
+            "overflows" : self.overflows,
+            "loss" : self.missed / expected if expected else 0.0,
+        }
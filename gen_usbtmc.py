@@ -29,12 +29,18 @@ This file contains a generic userspace driver for usbtmc devices.
 #-------------------------------------------------------------------------------
 # Import system modules
 import os
+import fcntl
+import struct
 
 class Gen_usbtmc() :
     '''
 
     '''
     device = "/dev/usbtmc"
+    ## poll doesn't wait for the instrument, read blocks until it answers
+    pollable = False
+    ## USBTMC_IOCTL_SET_TIMEOUT from linux/usb/tmc.h : _IOW('[', 10, __u32)
+    IOCTL_SET_TIMEOUT = 0x40045b0a
 
     def __init__(self, port, full_support=False):
         '''
@@ -77,3 +83,47 @@ class Gen_usbtmc() :
             length (int) : Number of bytes to be read
         '''
         return os.read(self.device, length)
+
+    def readinto(self, buf):
+        '''
+        Read into a pre-allocated buffer
+
+        Args:
+            buf (memoryview) : Writable buffer, at most len(buf) bytes are read
+
+        Returns:
+            The number of bytes read
+        '''
+        return os.readv(self.device, [buf])
+
+    def set_timeout(self, timeout):
+        '''
+        Set the kernel timeout for read and write operations
+
+        Read and write block inside the usbtmc driver until the instrument
+        answers, so this bounds how long they can take. Kernels without the
+        ioctl keep their default timeout (5 s).
+
+        Args:
+            timeout (float) : Timeout in seconds
+        '''
+        try:
+            fcntl.ioctl(self.device, self.IOCTL_SET_TIMEOUT, \
+            struct.pack("I", int(timeout*1000)))
+        except OSError:
+            pass
+
+    def fileno(self):
+        '''
+        File descriptor of the device
+        '''
+        return self.device
+
+    def close(self):
+        '''
+        Close the device
+        '''
+        if self.driver != None :
+            os.close(self.driver)
+            self.driver = None
+        os.close(self.device)
@@ -0,0 +1,195 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Running statistics (mean and variance) computed sample by sample.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import math
+import functools
+from statistics import NormalDist
+
+## Degrees of freedom from which t_factor uses the series expansion
+T_SERIES_DF = 30
+
+
+def _t_central(t, df) :
+    '''
+    Probability of |T| < t for a Student t variable with df degrees of freedom
+    (closed form for integer df, Abramowitz and Stegun 26.7.3 and 26.7.4).
+    '''
+    theta = math.atan(t / math.sqrt(df))
+    c2 = math.cos(theta) ** 2
+    term = total = 1.0
+    if df % 2 :
+        if df == 1 :
+            return 2 * theta / math.pi
+        for k in range(1, (df - 1) // 2) :
+            term *= 2 * k / (2 * k + 1) * c2
+            total += term
+        return 2 / math.pi * (theta + math.sin(theta) * math.cos(theta) * total)
+    for k in range(1, df // 2) :
+        term *= (2 * k - 1) / (2 * k) * c2
+        total += term
+    return math.sin(theta) * total
+
+
+@functools.lru_cache(maxsize=256)
+def t_factor(confidence, df) :
+    '''
+    Function to get the Student t quantile of a two sided confidence interval.
+
+    The confidence interval of the mean of n samples is the mean +- t_factor(
+    confidence, n - 1) standard errors. It's solved from the t distribution
+    for less than T_SERIES_DF degrees of freedom, and with the Cornish-Fisher
+    expansion around the normal quantile for the rest (error below 1e-7).
+
+    Args:
+        confidence (float) : Confidence level, e.g. 0.95.
+        df (int) : Degrees of freedom.
+
+    Returns:
+        The number of standard errors of the half width of the interval, inf
+        with less than 1 degree of freedom.
+    '''
+    if df < 1 :
+        return math.inf
+    if df >= T_SERIES_DF :
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        return z + (z**3 + z) / (4 * df) + \
+        (5*z**5 + 16*z**3 + 3*z) / (96 * df**2) + \
+        (3*z**7 + 19*z**5 + 17*z**3 - 15*z) / (384 * df**3) + \
+        (79*z**9 + 776*z**7 + 1482*z**5 - 1920*z**3 - 945*z) / (92160 * df**4)
+    lo, hi = 0.0, 1.0
+    while _t_central(hi, df) < confidence :
+        hi *= 2
+    for i in range(100) :
+        mid = (lo + hi) / 2
+        if _t_central(mid, df) < confidence :
+            lo = mid
+        else :
+            hi = mid
+    return (lo + hi) / 2
+
+class Running_stats() :
+    '''
+    Mean and variance updated with each new sample (Welford's algorithm).
+
+    It doesn't store the samples, and it's numerically stable even when the
+    mean is much bigger than the standard deviation (e.g. ns skews with ps
+    jitter).
+    '''
+
+    def __init__(self) :
+        '''
+        Constructor
+        '''
+        ## Number of samples
+        self.n = 0
+        ## Mean value
+        self.mean = 0.0
+        ## Sum of squared differences from the mean
+        self.m2 = 0.0
+        ## Minimum value
+        self.min = math.inf
+        ## Maximum value
+        self.max = -math.inf
+
+    # ------------------------------------------------------------------------ #
+
+    def add(self, x) :
+        '''
+        Method to add a new sample.
+
+        Args:
+            x (float) : Sample value.
+        '''
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        if x < self.min :
+            self.min = x
+        if x > self.max :
+            self.max = x
+
+    # ------------------------------------------------------------------------ #
+
+    def extend(self, values) :
+        '''
+        Method to add several samples.
+
+        Args:
+            values (iterable) : Sample values.
+        '''
+        for x in values :
+            self.add(x)
+
+    # ------------------------------------------------------------------------ #
+
+    def variance(self) :
+        '''
+        Sample variance (n-1 denominator), nan with less than 2 samples.
+        '''
+        if self.n < 2 :
+            return math.nan
+        return self.m2 / (self.n - 1)
+
+    # ------------------------------------------------------------------------ #
+
+    def stdev(self) :
+        '''
+        Sample standard deviation, nan with less than 2 samples.
+        '''
+        return math.sqrt(self.variance())
+
+    # ------------------------------------------------------------------------ #
+
+    def stderr(self) :
+        '''
+        Standard error of the mean, nan with less than 2 samples.
+        '''
+        return math.sqrt(self.variance() / self.n) if self.n >= 2 else math.nan
+
+    # ------------------------------------------------------------------------ #
+
+    def ci(self, confidence=0.95) :
+        '''
+        Half width of the confidence interval of the mean, nan with less than
+        2 samples.
+
+        It uses the Student t quantile (see t_factor), not the normal one: with
+        few samples the standard deviation is itself uncertain, and e.g. with
+        5 samples the 95% interval is 2.78 standard errors, not 1.96. It
+        assumes independent, normally distributed samples taken in a fixed
+        number: stopping as soon as it is narrow enough (see
+        FCA3103.mean_time_interval_ci) makes its real confidence lower.
+
+        Args:
+            confidence (float) : Confidence level, e.g. 0.95.
+        '''
+        if self.n < 2 :
+            return math.nan
+        return t_factor(confidence, self.n - 1) * self.stderr()
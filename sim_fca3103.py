@@ -0,0 +1,710 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+Simulated Tektronix FCA3103 that can be used as transport in place of Gen_usbtmc.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import os
+import re
+import math
+import time
+import queue
+import random
+import struct
+import threading
+import collections
+
+## Long form -> short form of the SCPI mnemonics understood by the simulator
+_MNEMONICS = {
+    "ABORT"       : "ABOR",
+    "ALL"         : "ALL",
+    "ARM"         : "ARM",
+    "AUTO"        : "AUTO",
+    "AVERAGE"     : "AVER",
+    "CALCULATE"   : "CALC",
+    "CONFIGURE"   : "CONF",
+    "CONTINUOUS"  : "CONT",
+    "COUNT"       : "COUN",
+    "COUPLING"    : "COUP",
+    "DATA"        : "DATA",
+    "ERROR"       : "ERR",
+    "FETCH"       : "FETC",
+    "ARRAY"       : "ARR",
+    "FORMAT"      : "FORM",
+    "IMMEDIATE"   : "IMM",
+    "IMPEDANCE"   : "IMP",
+    "INITIATE"    : "INIT",
+    "INPUT"       : "INP",
+    "LEVEL"       : "LEV",
+    "NEXT"        : "NEXT",
+    "POINTS"      : "POIN",
+    "READ"        : "READ",
+    "STATE"       : "STAT",
+    "SYSTEM"      : "SYST",
+    "TINFORMATION": "TINF",
+    "TINTERVAL"   : "TINT",
+    "TRIGGER"     : "TRIG",
+}
+
+## SCPI errors generated by the simulator
+ERR_UNDEFINED_HEADER = (-113, "Undefined header")
+ERR_DATA_TYPE        = (-104, "Data type error")
+ERR_ILLEGAL_PARAM    = (-224, "Illegal parameter value")
+ERR_DATA_STALE       = (-230, "Data corrupt or stale")
+ERR_QUEUE_OVERFLOW   = (-350, "Queue overflow")
+
+## Standard event status bit set by the errors of each class (-100, -200...)
+ESR_BITS = {1 : 0x20, 2 : 0x10, 3 : 0x08, 4 : 0x04}
+
+## Order of the statistics returned by CALC:AVER:ALL?
+AVER_ALL = ("mean", "stdev", "max", "min", "adev")
+
+## Not a Number value as returned by SCPI instruments
+NAN = 9.91e37
+
+
+def _node(token) :
+    '''
+    Convert a header node to its canonical short form keeping its numeric suffix.
+
+    Args:
+        token (str) : Header node, e.g. "INPut2" or "TINTERVAL".
+
+    Returns:
+        The canonical node, e.g. "INP2" or "TINT".
+    '''
+    m = re.match(r"([A-Za-z*]+)(\d*)$", token)
+    if m is None :
+        return token.upper()
+    name, suffix = m.group(1).upper(), m.group(2)
+    if name in _MNEMONICS :
+        name = _MNEMONICS[name]
+    else :
+        for long, short in _MNEMONICS.items() :
+            if name.startswith(short) and long.startswith(name) :
+                name = short
+                break
+    return name + suffix
+
+
+class Sim_fca3103() :
+    '''
+    In-process simulation of a Tektronix FCA3103 Timer/Counter/Analyzer.
+
+    It implements the same transport interface as Gen_usbtmc (write, read,
+    fileno, listDevices and close), so it can be given to FCA3103_drv or
+    FCA3103 instead of a /dev/usbtmc port.
+
+    Commands are executed by a worker thread that behaves as the instrument:
+    responses are written to a pipe after the configured latency, once the
+    requested samples have been "measured". A sample is produced for every PPS
+    period after INIT, and each one is the time interval between the slave and
+    the master PPS: skew plus gaussian jitter, plus a penalty that grows as
+    the trigger levels move away from the ideal one.
+
+    Only the SCPI subset used by this tool is understood.
+    '''
+
+    ## Manufacturer, model and firmware reported by *IDN?
+    manufacturer = "Tektronix"
+    model = "FCA3103"
+    firmware = "V1.0 SIM"
+
+    def __init__(self, skew=1e-9, jitter=20e-12, latency=0.0005, \
+    buffer_depth=100000, pps_period=1.0, time_scale=1.0, ideal_level=1.5, \
+    level_slope=1e-10, amplitude=5.0, serial="SIM0001", seed=None, drop_rate=0.0) :
+        '''
+        Constructor
+
+        Args:
+            skew (float) : Mean time interval slave to master (s).
+            jitter (float) : Standard deviation of the time interval (s).
+            latency (float) : Delay between a query and its response (s).
+            buffer_depth (int) : Number of samples the output buffer can hold.
+            pps_period (float) : Period of the PPS signals (s).
+            time_scale (float) : Real seconds per simulated second. 0 produces
+                samples as fast as they are requested.
+            ideal_level (float) : Trigger level with the lowest time interval (V).
+            level_slope (float) : Time interval increment per volt away from
+                ideal_level (s/V).
+            amplitude (float) : PPS amplitude (V). Levels outside [0,amplitude)
+                never trigger.
+            serial (str) : Serial number reported by *IDN?.
+            seed (int) : Seed for the jitter generator.
+            drop_rate (float) : Probability of missing a PPS edge (no sample
+                is produced for it).
+        '''
+        self.skew = skew
+        self.jitter = jitter
+        self.latency = latency
+        self.buffer_depth = buffer_depth
+        self.pps_period = pps_period
+        self.time_scale = time_scale
+        self.ideal_level = ideal_level
+        self.level_slope = level_slope
+        self.amplitude = amplitude
+        self.serial = serial
+        self.drop_rate = drop_rate
+
+        self._rng = random.Random(seed)
+        self._errors = collections.deque()
+        # Status registers, not changed by *RST
+        self._esr = 0
+        self._ese = 0
+        self._sre = 0
+        self._buf = collections.deque()
+        self._reset()
+
+        self._rfd, self._wfd = os.pipe()
+        self._cmds = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    # ------------------------------------------------------------------------ #
+    # Transport interface                                                      #
+    # ------------------------------------------------------------------------ #
+
+    def listDevices(self) :
+        '''
+        Method for listing detected devices, not supported by the simulator.
+        '''
+        return None
+
+    # ------------------------------------------------------------------------ #
+
+    def write(self, cmd) :
+        '''
+        Write
+
+        Args:
+            cmd (bytes) : A command to write
+        '''
+        self._cmds.put((time.monotonic(), bytes(cmd)))
+
+    # ------------------------------------------------------------------------ #
+
+    def read(self, length=1) :
+        '''
+        Read
+
+        Args:
+            length (int) : Number of bytes to be read
+        '''
+        return os.read(self._rfd, length)
+
+    # ------------------------------------------------------------------------ #
+
+    def readinto(self, buf) :
+        '''
+        Read into a pre-allocated buffer
+
+        Args:
+            buf (memoryview) : Writable buffer, at most len(buf) bytes are read
+
+        Returns:
+            The number of bytes read
+        '''
+        return os.readv(self._rfd, [buf])
+
+    # ------------------------------------------------------------------------ #
+
+    def fileno(self) :
+        '''
+        File descriptor where the responses can be read from.
+        '''
+        return self._rfd
+
+    # ------------------------------------------------------------------------ #
+
+    def close(self) :
+        '''
+        Stop the simulated instrument and release its file descriptors.
+        '''
+        if self._worker is None :
+            return
+        self._cmds.put(None)
+        self._worker.join(1)
+        self._worker = None
+        os.close(self._wfd)
+        os.close(self._rfd)
+
+    # ------------------------------------------------------------------------ #
+    # Instrument                                                               #
+    # ------------------------------------------------------------------------ #
+
+    def _reset(self) :
+        '''
+        Set the instrument default configuration (*RST).
+        '''
+        self.settings = {
+            "INIT:CONT"  : "OFF",
+            "CONF"       : "FREQ",
+            "TRIG:COUN"  : 1,
+            "ARM:COUN"   : 1,
+            "FORM"       : "ASC",
+            "FORM:TINF"  : "OFF",
+            "CALC:AVER:STAT" : "OFF",
+            "CALC:AVER:COUN" : 100,
+        }
+        for ch in (1, 2) :
+            self.settings["INP%d:COUP" % ch] = "AC"
+            self.settings["INP%d:IMP" % ch] = "1E6"
+            self.settings["INP%d:LEV:AUTO" % ch] = "ON"
+            self.settings["INP%d:LEV" % ch] = 0.0
+        self._abort()
+
+    # ------------------------------------------------------------------------ #
+
+    def _abort(self) :
+        '''
+        Stop the current measurement and clear the output buffer.
+        '''
+        self._running = False
+        self._t0 = None
+        self._produced = 0
+        self._total = 0
+        self._buf.clear()
+        # Samples of the measurement, for the statistics
+        self._stat_values = []
+
+    # ------------------------------------------------------------------------ #
+
+    def _initiate(self) :
+        '''
+        Start a new measurement.
+        '''
+        self._abort()
+        if self.settings["CONF"] != "TINT" :
+            self._error(ERR_DATA_STALE)
+            return
+        self._running = True
+        self._t0 = time.monotonic()
+        if self.settings["INIT:CONT"] == "ON" :
+            self._total = None
+        else :
+            self._total = self.settings["ARM:COUN"] * self.settings["TRIG:COUN"]
+
+    # ------------------------------------------------------------------------ #
+
+    def _error(self, err) :
+        '''
+        Push an error in the error queue.
+        '''
+        if len(self._errors) >= 30 :
+            self._errors[-1] = ERR_QUEUE_OVERFLOW
+        else :
+            self._errors.append(err)
+        self._esr |= ESR_BITS.get(-err[0] // 100, 0x08)
+
+    # ------------------------------------------------------------------------ #
+
+    def _level(self, ch) :
+        '''
+        Effective trigger level for the input channel ch.
+        '''
+        if self.settings["INP%d:LEV:AUTO" % ch] == "ON" :
+            return self.ideal_level
+        return self.settings["INP%d:LEV" % ch]
+
+    # ------------------------------------------------------------------------ #
+
+    def _triggers(self) :
+        '''
+        Whether the configured trigger levels are crossed by the PPS signals.
+        '''
+        for ch in (1, 2) :
+            lev = self._level(ch)
+            if lev < 0 or lev >= self.amplitude :
+                return False
+        return True
+
+    # ------------------------------------------------------------------------ #
+
+    def _edge_time(self, k) :
+        '''
+        Host monotonic time of the k-th PPS edge of the current measurement.
+        '''
+        return self._t0 + (k+1) * self.pps_period * self.time_scale
+
+    # ------------------------------------------------------------------------ #
+
+    def _sample(self, k) :
+        '''
+        Generate the k-th sample as a (time interval, timestamp) tuple.
+        '''
+        penalty = (abs(self._level(1) - self.ideal_level) + \
+        abs(self._level(2) - self.ideal_level)) / 2
+        ti = self.skew + self.level_slope * penalty + self._rng.gauss(0, self.jitter)
+        return (ti, (k+1) * self.pps_period)
+
+    # ------------------------------------------------------------------------ #
+
+    def _advance(self, now) :
+        '''
+        Produce all the samples whose PPS edge happened before now.
+        '''
+        if not self._running or not self._triggers() :
+            return
+        if self.time_scale > 0 :
+            target = int((now - self._t0) / (self.pps_period * self.time_scale))
+        else :
+            target = self._produced + self.buffer_depth - len(self._buf)
+        if self._total is not None :
+            target = min(target, self._total)
+        stat = self.settings["CALC:AVER:STAT"] == "ON"
+        while self._produced < target :
+            if self.drop_rate and self._rng.random() < self.drop_rate :
+                self._produced += 1
+                continue
+            if len(self._buf) < self.buffer_depth or stat :
+                sample = self._sample(self._produced)
+                if len(self._buf) < self.buffer_depth :
+                    self._buf.append(sample)
+                if stat :
+                    self._stat_values.append(sample[0])
+            self._produced += 1
+
+    # ------------------------------------------------------------------------ #
+
+    def _wait_samples(self, n) :
+        '''
+        Wait until n samples are stored in the output buffer.
+
+        Args:
+            n (int) : Number of samples.
+
+        Returns:
+            False if they will never be available.
+        '''
+        self._advance(time.monotonic())
+        missing = n - len(self._buf)
+        if missing <= 0 :
+            return True
+        if not self._running or not self._triggers() or \
+        n > self.buffer_depth :
+            return False
+        if self._total is not None and self._produced + missing > self._total :
+            return False
+        if self.time_scale > 0 :
+            delay = self._edge_time(self._produced + missing - 1) - time.monotonic()
+            if delay > 0 :
+                time.sleep(delay)
+        self._advance(time.monotonic())
+        return len(self._buf) >= n
+
+    # ------------------------------------------------------------------------ #
+
+    def _fetch(self, n) :
+        '''
+        Remove n samples from the output buffer and format them.
+
+        ASCII values are separated by commas. REAL values are sent as an
+        IEEE 488.2 definite length block of big endian doubles.
+        '''
+        tinf = self.settings["FORM:TINF"] == "ON"
+        values = []
+        for i in range(n) :
+            ti, ts = self._buf.popleft()
+            values.append(ti)
+            if tinf :
+                values.append(ts)
+        if self.settings["FORM"] == "REAL" :
+            data = struct.pack(">%dd" % len(values), *values)
+            size = str(len(data))
+            return ("#%d%s" % (len(size), size)).encode("ascii") + data
+        return ",".join(["%+.11E" % v for v in values])
+
+    # ------------------------------------------------------------------------ #
+    # Command handlers                                                         #
+    # ------------------------------------------------------------------------ #
+
+    def _cmd_rst(self, arg) :
+        self._reset()
+
+    def _cmd_cls(self, arg) :
+        self._errors.clear()
+        self._esr = 0
+
+    def _cmd_ese(self, arg) :
+        self._ese = self._register(arg, self._ese)
+
+    def _cmd_sre(self, arg) :
+        self._sre = self._register(arg, self._sre)
+
+    def _cmd_esr(self, arg) :
+        esr, self._esr = self._esr, 0
+        return "%d" % esr
+
+    def _cmd_stb(self, arg) :
+        # EAV: error queue not empty, ESB: enabled standard event
+        stb = (0x04 if self._errors else 0) | (0x20 if self._esr & self._ese else 0)
+        if stb & self._sre :
+            stb |= 0x40
+        return "%d" % stb
+
+    def _cmd_idn(self, arg) :
+        return "%s,%s,%s,%s" % (self.manufacturer, self.model, self.serial, \
+        self.firmware)
+
+    def _cmd_opc(self, arg) :
+        # INIT is an overlapped command, wait until the measurement is complete
+        if self._running and self._total is not None and self._triggers() :
+            self._wait_samples(min(self._total - self._produced + len(self._buf), \
+            self.buffer_depth))
+        return "1"
+
+    def _cmd_init(self, arg) :
+        self._initiate()
+
+    def _cmd_abort(self, arg) :
+        self._abort()
+
+    def _cmd_conf_tint(self, arg) :
+        chans = re.findall(r"@\s*(\d)", arg)
+        if len(chans) != 2 or not set(chans) <= set("12") :
+            self._error(ERR_ILLEGAL_PARAM)
+            return
+        self._abort()
+        self.settings["CONF"] = "TINT"
+        self.settings["TRIG:COUN"] = 1
+        self.settings["ARM:COUN"] = 1
+
+    def _cmd_read(self, arg) :
+        self._initiate()
+        return self._cmd_fetch(arg)
+
+    def _cmd_fetch(self, arg) :
+        if not self._wait_samples(1) :
+            self._error(ERR_DATA_STALE)
+            return None
+        return self._fetch(1)
+
+    def _cmd_fetch_array(self, arg) :
+        try :
+            n = int(arg)
+        except ValueError :
+            self._error(ERR_DATA_TYPE)
+            return None
+        if n < 1 or not self._wait_samples(n) :
+            self._error(ERR_DATA_STALE)
+            return None
+        return self._fetch(n)
+
+    def _cmd_data_points(self, arg) :
+        self._advance(time.monotonic())
+        return "%d" % len(self._buf)
+
+    def _cmd_calc_aver_all(self, arg) :
+        self._advance(time.monotonic())
+        v = self._stat_values[:self.settings["CALC:AVER:COUN"]]
+        if self.settings["CALC:AVER:STAT"] != "ON" or not v :
+            self._error(ERR_DATA_STALE)
+            return None
+        n = len(v)
+        mean = sum(v) / n
+        stats = {
+            "mean" : mean,
+            "stdev" : math.sqrt(sum((x - mean)**2 for x in v) / (n-1)) if n > 1 else 0.0,
+            "max" : max(v),
+            "min" : min(v),
+            "adev" : math.sqrt(sum((b - a)**2 for a, b in zip(v, v[1:])) / (2*(n-1))) \
+            if n > 1 else 0.0,
+        }
+        return ",".join(["%+.11E" % stats[k] for k in AVER_ALL])
+
+    def _register(self, arg, old) :
+        # Value of a status enable register, unchanged if arg is not valid
+        try :
+            val = int(arg)
+            if not 0 <= val <= 255 :
+                raise ValueError(arg)
+        except ValueError :
+            self._error(ERR_ILLEGAL_PARAM)
+            return old
+        return val
+
+    def _cmd_syst_err(self, arg) :
+        code, msg = self._errors.popleft() if self._errors else (0, "No error")
+        return '%d,"%s"' % (code, msg)
+
+    ## Commands: canonical header -> handler
+    _commands = {
+        "*RST"       : _cmd_rst,
+        "*CLS"       : _cmd_cls,
+        "*ESE"       : _cmd_ese,
+        "*SRE"       : _cmd_sre,
+        "*ESR?"      : _cmd_esr,
+        "*STB?"      : _cmd_stb,
+        "*IDN?"      : _cmd_idn,
+        "*OPC?"      : _cmd_opc,
+        "INIT"       : _cmd_init,
+        "INIT:IMM"   : _cmd_init,
+        "ABOR"       : _cmd_abort,
+        "CONF:TINT"  : _cmd_conf_tint,
+        "READ?"      : _cmd_read,
+        "FETC?"      : _cmd_fetch,
+        "FETC:ARR?"  : _cmd_fetch_array,
+        "DATA:POIN?" : _cmd_data_points,
+        "CALC:AVER:ALL?" : _cmd_calc_aver_all,
+        "SYST:ERR?"  : _cmd_syst_err,
+        "SYST:ERR:NEXT?" : _cmd_syst_err,
+    }
+
+    ## Settings: canonical header -> type of the value
+    _settings = {
+        "INIT:CONT"  : ("ON", "OFF"),
+        "TRIG:COUN"  : int,
+        "ARM:COUN"   : int,
+        "FORM"       : ("ASC", "REAL"),
+        "FORM:TINF"  : ("ON", "OFF"),
+        "COUP"       : ("AC", "DC"),
+        "IMP"        : ("50", "1E6"),
+        "LEV:AUTO"   : ("ON", "OFF"),
+        "LEV"        : float,
+        "CALC:AVER:STAT" : ("ON", "OFF"),
+        "CALC:AVER:COUN" : int,
+    }
+
+    ## Aliases for setting values
+    _values = {"1" : "ON", "0" : "OFF", "ASCII" : "ASC", "MAX" : "1E6", \
+    "MIN" : "50", "1000000" : "1E6"}
+
+    # ------------------------------------------------------------------------ #
+
+    def _setting(self, header, arg, query) :
+        '''
+        Set or query a configuration setting.
+
+        Returns:
+            The setting value for queries, None otherwise.
+        '''
+        m = re.match(r"INP(\d?):(.*)$", header)
+        if m is not None :
+            ch = m.group(1) or "1"
+            if ch not in "12" :
+                self._error(ERR_UNDEFINED_HEADER)
+                return None
+            kind = self._settings.get(m.group(2))
+            header = "INP%s:%s" % (ch, m.group(2))
+        else :
+            kind = self._settings.get(header)
+        if kind is None or header not in self.settings :
+            self._error(ERR_UNDEFINED_HEADER)
+            return None
+
+        if query :
+            val = self.settings[header]
+            return ("%+.3E" % val) if isinstance(val, float) else str(val)
+
+        try :
+            if isinstance(kind, tuple) :
+                val = arg.upper()
+                val = self._values.get(val, val)
+                if val not in kind :
+                    raise ValueError(arg)
+            else :
+                val = kind(arg)
+        except ValueError :
+            self._error(ERR_ILLEGAL_PARAM)
+            return None
+        self.settings[header] = val
+        # Continuous mode starts measuring without INIT, also after a
+        # completed block
+        if header == "INIT:CONT" and val == "ON" and (not self._running or \
+        self._total is not None and self._produced >= self._total) :
+            self._initiate()
+        return None
+
+    # ------------------------------------------------------------------------ #
+
+    def _execute(self, program) :
+        '''
+        Execute a SCPI program message.
+
+        Args:
+            program (str) : Commands separated by ';'.
+
+        Returns:
+            The response message (bytes) or None if there is nothing to answer.
+        '''
+        responses = []
+        path = []
+        for unit in program.strip().split(";") :
+            unit = unit.strip()
+            if not unit :
+                continue
+            parts = unit.split(None, 1)
+            header, arg = parts[0], (parts[1] if len(parts) > 1 else "")
+            query = header.endswith("?")
+            header = header.rstrip("?")
+
+            if header.startswith("*") :
+                nodes = [header.upper()]
+            elif header.startswith(":") :
+                nodes = [_node(n) for n in header[1:].split(":")]
+                path = nodes[:-1]
+            else :
+                nodes = path + [_node(n) for n in header.split(":")]
+                path = nodes[:-1]
+            key = ":".join(nodes)
+
+            handler = self._commands.get(key + ("?" if query else ""))
+            if handler is not None :
+                ret = handler(self, arg.strip())
+            else :
+                ret = self._setting(key, arg.strip(), query)
+            if ret is not None :
+                if isinstance(ret, str) :
+                    ret = ret.encode("ascii")
+                responses.append(ret)
+
+        if not responses :
+            return None
+        return b";".join(responses)
+
+    # ------------------------------------------------------------------------ #
+
+    def _run(self) :
+        '''
+        Worker thread: execute the commands and write back their responses.
+        '''
+        while True :
+            item = self._cmds.get()
+            if item is None :
+                return
+            t_rx, msg = item
+            ret = self._execute(msg.decode("ascii", "replace"))
+            if ret is None :
+                continue
+            delay = t_rx + self.latency - time.monotonic()
+            if delay > 0 :
+                time.sleep(delay)
+            out = memoryview(ret + b"\n")
+            try :
+                while out :
+                    out = out[os.write(self._wfd, out):]
+            except OSError :
+                return
@@ -28,25 +28,267 @@ Driver for the Tektronix FCA 3103 Timer/Counter/Analyzer
 #                                   Import                                    --
 #-------------------------------------------------------------------------------
 # Import system modules
+import re
 import time
+import select
+import collections
 
 # User modules
 from gen_usbtmc import *
+from fca3103_trace import Event, command_name
+
+
+def missing_bytes(buf) :
+    '''
+    Function to know if a response message has been completely received.
+
+    A response ends with a new line, except IEEE 488.2 definite length blocks
+    (#<n><length><data>), whose data can contain any byte and must be framed
+    by their length. Indefinite length blocks (#0<data>) have no length, they
+    are read up to the new line sent with the END message.
+
+    Args:
+        buf (bytearray) : Bytes received so far (a memoryview is accepted).
+
+    Returns:
+        0 if the response is complete, the number of bytes still needed if it
+        is known, or -1 if it isn't (keep reading until the terminator).
+    '''
+    if buf[:1] == b"#" and buf[1:2] != b"0" :
+        if len(buf) < 2 or len(buf) < 2 + buf[1] - 0x30 :
+            return -1
+        start = 2 + buf[1] - 0x30
+        total = start + int(bytes(buf[2:start])) + 1 # Data and terminator
+        return max(total - len(buf), 0)
+    return 0 if buf[-1:] == b"\n" else -1
+
+
+def is_block(buf) :
+    '''
+    Function to check if a response is an IEEE 488.2 definite length block.
+    '''
+    return len(buf) >= 2 and buf[0] == ord("#") and 0x31 <= buf[1] <= 0x39
+
+
+## Standard event status bits of the errors: QYE, DDE, EXE and CME
+ESR_ERRORS = 0x3c
+## Status byte bit set while the error queue isn't empty (EAV)
+STB_EAV = 0x04
+## Status byte bit set when an enabled standard event happened (ESB)
+STB_ESB = 0x20
+## Program that aborts the measurement and clears the errors, answered when done
+ABORT_CLEAR = "ABORT;*CLS;*OPC?"
+
+
+class SCPI_error(Exception) :
+    '''
+    Errors reported by the instrument in its error queue.
+    '''
+
+    def __init__(self, errors, commands=()) :
+        '''
+        Constructor
+
+        Args:
+            errors (list) : (code, message) tuples, in queue order. A string
+                is taken as the whole error message (e.g. relayed by
+                fca3103_daemon).
+            commands (list) : Commands sent since the previous check, the
+                offending one is among them.
+        '''
+        ## Commands sent since the previous check
+        self.commands = list(commands)
+        if isinstance(errors, str) :
+            ## (code, message) tuples, in queue order
+            self.errors = []
+            Exception.__init__(self, errors)
+            return
+        self.errors = list(errors)
+        msg = "; ".join('%d,"%s"' % e for e in self.errors)
+        if self.commands :
+            msg += " (after: %s)" % " | ".join(self.commands)
+        Exception.__init__(self, "FCA3103 ERROR: %s" % msg)
+
+
+class Command_error(SCPI_error) :
+    '''
+    Syntax and header errors (codes -100 to -199).
+    '''
+
+
+class Execution_error(SCPI_error) :
+    '''
+    Valid commands that couldn't be executed, e.g. out of range (-200 to -299).
+    '''
+
+
+class Device_error(SCPI_error) :
+    '''
+    Device specific errors (-300 to -399 and positive codes).
+    '''
+
+
+class Query_error(SCPI_error) :
+    '''
+    Responses lost or interrupted (-400 to -499).
+    '''
+
+
+## Exception for each standard event status error bit, the first set is used
+ESR_CLASSES = ((0x20, Command_error), (0x10, Execution_error), \
+(0x08, Device_error), (0x04, Query_error))
+
+
+def parse_errors(response) :
+    '''
+    Function to decode one or several responses to SYST:ERR?.
+
+    Returns:
+        A list of (code, message) tuples, "No error" entries included.
+    '''
+    return [(int(c), m) for c, m in re.findall(r'([+-]?\d+)\s*,\s*"([^"]*)"', response)]
+
+
+def scpi_error(errors, commands=(), esr=0) :
+    '''
+    Function to build the exception for the errors found in a check.
+
+    The class depends on the first error, or on the event status register if
+    the error queue was empty.
+
+    Args:
+        errors (list) : (code, message) tuples.
+        commands (list) : Commands sent since the previous check.
+        esr (int) : Standard event status register.
+
+    Returns:
+        A SCPI_error subclass instance.
+    '''
+    if not errors :
+        cls = next((c for bit, c in ESR_CLASSES if esr & bit), Device_error)
+        return cls([(0, "Event status 0x%02x" % esr)], commands)
+    cls = {1 : Command_error, 2 : Execution_error, 3 : Device_error, \
+    4 : Query_error}.get(-errors[0][0] // 100, Device_error)
+    return cls(errors, commands)
+
+
+def status_program(cmd=None, enable=False) :
+    '''
+    Function to build the program that reads the status byte, see FCA3103_drv.check.
+
+    Args:
+        cmd (str) : Command sent before *STB?, in the same message.
+        enable (bool) : Enable the error bits of the status registers first.
+
+    Returns:
+        The SCPI program.
+    '''
+    program = "*STB?" if cmd is None else "%s;*STB?" % cmd
+    if enable :
+        program = "*ESE %d;*SRE %d;%s" % (ESR_ERRORS, STB_EAV | STB_ESB, program)
+    return program
+
+
+def status_errors(response) :
+    '''
+    Function to decode the response to a status_program.
+
+    Returns:
+        True if the status byte reports errors.
+    '''
+    return bool(int(response.rsplit(";", 1)[-1]) & (STB_EAV | STB_ESB))
+
+
+def errors_program(batch, esr=False) :
+    '''
+    Function to build the program that reads batch entries of the error queue.
+
+    Args:
+        batch (int) : Number of SYST:ERR? in the message.
+        esr (bool) : Read the event status register (*ESR?) first.
+
+    Returns:
+        The SCPI program.
+    '''
+    program = ";:".join(["SYST:ERR?"] * batch)
+    return "*ESR?;:" + program if esr else program
+
+
+def parse_errors_batch(response, batch, esr=False) :
+    '''
+    Function to decode the response to an errors_program.
+
+    Args:
+        response (str) : The response.
+        batch (int) : Number of SYST:ERR? in the program.
+        esr (bool) : The program read the event status register.
+
+    Returns:
+        A tuple (event status register or None, list of (code, message) tuples
+        without the "No error" entries, True if the queue may have more).
+    '''
+    reg = int(response.split(";", 1)[0]) if esr else None
+    entries = parse_errors(response)
+    more = len(entries) == batch and entries[-1][0] != 0
+    return (reg, [e for e in entries if e[0] != 0], more)
+
 
 class FCA3103_drv() :
     '''
     Tektronix FCA 3103 driver.
+
+    Responses are read as soon as the instrument makes them available: the
+    driver waits on the transport file descriptor for at most timeout seconds,
+    or, for transports with pollable = False (usbtmc, whose poll only reports
+    SRQs), the kernel read timeout is set to timeout and read blocks until
+    the instrument answers. No delay is added between commands unless a
+    pacing interval is set.
+
+    Each write and query is reported as an Event (see fca3103_trace) to the
+    objects in sinks. With no sinks nothing is measured. The wait time is the
+    time spent in poll: with usbtmc, that isn't polled, the instrument latency
+    is counted as transfer time.
     '''
 
-    def __init__(self, port,full_support=False) :
+    ## Maximum time to wait for a response (s)
+    timeout = 5.0
+    ## Minimum time between two consecutive commands (s), 0 disables pacing
+    pacing = 0.0
+    ## Size of each read when transferring data blocks (bytes)
+    chunk = 65536
+    ## Check the status byte at the sync points (see check)
+    check_errors = True
+    ## Number of SYST:ERR? sent in each message when reading the error queue
+    error_batch = 8
+
+    def __init__(self, port,full_support=False, transport=None, timeout=None) :
         '''
         Constructor
 
         Args:
-            port (int) : Port index of usbtmc device (from 0 to 16)
+            port (int) : Port index of usbtmc device
             full_support (boolean) : Indicates if custom usbtmc driver is loaded
+            transport : Object used instead of Gen_usbtmc to talk to the
+                instrument (e.g. Sim_fca3103). It must implement the same
+                write, read and listDevices methods.
+            timeout (float) : Maximum time to wait for a response (s).
+                Default : FCA3103_drv.timeout.
         '''
-        self.driver = Gen_usbtmc(port,full_support)
+        if transport is None :
+            transport = Gen_usbtmc(port,full_support)
+        self.driver = transport
+        if timeout is not None :
+            self.timeout = timeout
+        self._t_last = 0
+        self._drv_timeout = None
+        ## Objects with an emit(event) method that receive the timing events
+        self.sinks = []
+        ## Bytes out, bytes in, wait and transfer time of the traced operations
+        self.trace_totals = [0, 0, 0.0, 0.0]
+        self._tracing = False
+        # Commands sent since the last check, for the error messages
+        self._sent = collections.deque(maxlen=8)
+        self._status_enabled = False
 
         if full_support :
             devices = self.driver.listDevices()
@@ -74,50 +316,463 @@ class FCA3103_drv() :
 
     # ------------------------------------------------------------------------ #
 
-    def query(self, cmd, length=100) :
+    def emit(self, event) :
+        '''
+        Method to send an event to all the sinks.
+        '''
+        for sink in self.sinks :
+            sink.emit(event)
+
+    # ------------------------------------------------------------------------ #
+
+    def _traced(self, kind, cmd, func, *args) :
+        '''
+        Run func(*args) and emit its event. Nested operations (the write of a
+        query) are only accounted in the outer one.
+        '''
+        if self._tracing :
+            return func(*args)
+        self._tracing = True
+        before = list(self.trace_totals)
+        t0 = time.perf_counter()
+        error = None
+        try :
+            return func(*args)
+        except Exception as e :
+            error = type(e).__name__
+            raise
+        finally :
+            total = time.perf_counter() - t0
+            self._tracing = False
+            delta = [a - b for a, b in zip(self.trace_totals, before)]
+            self.emit(Event(kind, command_name(cmd), delta[0], delta[1], delta[2], \
+            delta[3], total, time.time(), error))
+
+    # ------------------------------------------------------------------------ #
+
+    def _pace(self) :
+        '''
+        Apply the pacing policy: wait until pacing seconds have elapsed since
+        the previous command.
+        '''
+        if self.pacing > 0 :
+            delay = self._t_last + self.pacing - time.monotonic()
+            if delay > 0 :
+                time.sleep(delay)
+        self._t_last = time.monotonic()
+
+    # ------------------------------------------------------------------------ #
+
+    def wait(self, timeout=None) :
+        '''
+        Method to wait until the instrument has data in its output buffer.
+
+        Transports that can't be polled return at once, the next read blocks
+        at most timeout seconds (usbtmc raises TimeoutError then).
+
+        Args:
+            timeout (float) : Maximum time to wait (s). Default : self.timeout.
+
+        Raises:
+            TimeoutError if the instrument doesn't answer in time.
+        '''
+        if timeout is None :
+            timeout = self.timeout
+        # Blocking transports (usbtmc) wait inside read, bound it too
+        if timeout != self._drv_timeout and hasattr(self.driver, "set_timeout") :
+            self.driver.set_timeout(timeout)
+            self._drv_timeout = timeout
+        # usbtmc poll never reports a pending response, read waits for it
+        if not getattr(self.driver, "pollable", True) :
+            return
+        poller = select.poll()
+        poller.register(self.driver.fileno(), select.POLLIN)
+        if not poller.poll(timeout * 1000) :
+            raise TimeoutError("FCA3103 ERROR: No response after %g s" % timeout)
+
+    # ------------------------------------------------------------------------ #
+
+    def query(self, cmd, length=None, timeout=None) :
         '''
         Method to write a command and read the result.
 
         Args:
             cmd (str) :  A SCPI valid command for the device.
-            length (int) : Length of the input read. Default : 100.
+            length (int) : Size of each read, the response is read until its
+                terminator whatever its length. Default : self.chunk.
+            timeout (float) : Maximum time to wait for each part of the
+                response (s). Default : self.timeout.
 
         Returns:
             Command "cmd" response.
+
+        Raises:
+            TimeoutError if the instrument doesn't answer in time.
         '''
-        self.driver.write(str.encode(cmd))
-        time.sleep(1)
-        ret = self.driver.read(length)[:-1]
+        if self.sinks :
+            return self._traced("query", cmd, self._query, cmd, length, timeout)
+        return self._query(cmd, length, timeout)
 
-        return bytes.decode(ret)
+    # ------------------------------------------------------------------------ #
+
+    def _query(self, cmd, length, timeout) :
+        self._write(cmd)
+        return self.read_response(timeout, length).decode()
+
+    # ------------------------------------------------------------------------ #
+
+    def query_raw(self, cmd, timeout=None) :
+        '''
+        Method to write a command and read the result without decoding it.
+
+        Args:
+            cmd (str) :  A SCPI valid command for the device.
+            timeout (float) : Maximum time to wait for each part of the
+                response (s). Default : self.timeout.
+
+        Returns:
+            A bytearray with the response without the terminator.
+
+        Raises:
+            TimeoutError if the instrument doesn't answer in time.
+        '''
+        if self.sinks :
+            return self._traced("query", cmd, self._query_raw, cmd, timeout)
+        return self._query_raw(cmd, timeout)
+
+    # ------------------------------------------------------------------------ #
+
+    def _query_raw(self, cmd, timeout) :
+        self._write(cmd)
+        return self.read_response(timeout)
 
     # ------------------------------------------------------------------------ #
 
-    def read(self, length=1) :
+    def read(self, length=1, timeout=None) :
         '''
         Method to read from output buffer of the instrument
 
         Args:
             length (int) : Number of bytes to read. Default : 1.
+            timeout (float) : Maximum time to wait for data (s).
+                Default : self.timeout.
+
+        Raises:
+            TimeoutError if the instrument doesn't answer in time.
         '''
+        self.wait(timeout)
         ret = self.driver.read(length)[:-1]
         return bytes.decode(ret)
 
     # ------------------------------------------------------------------------ #
 
+    def _read_more(self, buf, length, timeout) :
+        '''
+        Append at most length bytes from the instrument to buf.
+        '''
+        if not self.sinks :
+            self.wait(timeout)
+            data = self.driver.read(length)
+        else :
+            t0 = time.perf_counter()
+            self.wait(timeout)
+            t1 = time.perf_counter()
+            data = self.driver.read(length)
+            totals = self.trace_totals
+            totals[1] += len(data)
+            totals[2] += t1 - t0
+            totals[3] += time.perf_counter() - t1
+        if not data :
+            raise IOError("FCA3103 ERROR: Connection closed")
+        buf += data
+
+    # ------------------------------------------------------------------------ #
+
+    def read_response(self, timeout=None, length=None) :
+        '''
+        Method to read a whole response message from the instrument.
+
+        It keeps reading until the message terminator is received. If the
+        response is an IEEE 488.2 definite length block (#<n><length><data>),
+        its length is used instead, since the data can contain any byte.
+
+        Args:
+            timeout (float) : Maximum time to wait for each part of the
+                response (s). Default : self.timeout.
+            length (int) : Size of each read (bytes). Default : self.chunk.
+
+        Returns:
+            A bytearray with the response without the terminator.
+
+        Raises:
+            TimeoutError if the instrument doesn't answer in time.
+        '''
+        if length is None :
+            length = self.chunk
+        buf = bytearray()
+        missing = -1
+        while missing :
+            self._read_more(buf, missing if missing > 0 else length, timeout)
+            missing = missing_bytes(buf)
+
+        del buf[-1:]
+        return buf
+
+    # ------------------------------------------------------------------------ #
+
+    def _read_into(self, view, timeout) :
+        '''
+        Read at most len(view) bytes from the instrument into view.
+
+        Returns:
+            The number of bytes read.
+        '''
+        t0 = time.perf_counter()
+        self.wait(timeout)
+        t1 = time.perf_counter()
+        if hasattr(self.driver, "readinto") :
+            n = self.driver.readinto(view)
+        else :
+            data = self.driver.read(len(view))
+            n = len(data)
+            view[:n] = data
+        if not n :
+            raise IOError("FCA3103 ERROR: Connection closed")
+        if self.sinks :
+            totals = self.trace_totals
+            totals[1] += n
+            totals[2] += t1 - t0
+            totals[3] += time.perf_counter() - t1
+        return n
+
+    # ------------------------------------------------------------------------ #
+
+    def read_response_into(self, buf, timeout=None) :
+        '''
+        Method to read a whole response message into a pre-allocated buffer.
+
+        Like read_response, but the response is stored at the start of buf
+        without allocating a new buffer. buf is only enlarged if the response
+        doesn't fit in it.
+
+        Args:
+            buf (bytearray) : Buffer for the response.
+            timeout (float) : Maximum time to wait for each part of the
+                response (s). Default : self.timeout.
+
+        Returns:
+            The length of the response without the terminator.
+
+        Raises:
+            TimeoutError if the instrument doesn't answer in time.
+        '''
+        n = 0
+        missing = -1
+        while missing :
+            if missing > 0 :
+                size = missing
+            else :
+                # Fill the free space of buf before enlarging it
+                size = len(buf) - n if len(buf) > n else self.chunk
+            if len(buf) < n + size :
+                buf.extend(bytes(max(n + size - len(buf), len(buf))))
+            with memoryview(buf) as view :
+                n += self._read_into(view[n:n+size], timeout)
+                missing = missing_bytes(view[:n])
+        return n - 1
+
+    # ------------------------------------------------------------------------ #
+
+    def query_into(self, cmd, buf, timeout=None) :
+        '''
+        Method to write a command and read the result into a pre-allocated buffer.
+
+        See read_response_into.
+
+        Returns:
+            The length of the response without the terminator.
+        '''
+        if self.sinks :
+            return self._traced("query", cmd, self._query_into, cmd, buf, timeout)
+        return self._query_into(cmd, buf, timeout)
+
+    # ------------------------------------------------------------------------ #
+
+    def _query_into(self, cmd, buf, timeout) :
+        self._write(cmd)
+        return self.read_response_into(buf, timeout)
+
+    # ------------------------------------------------------------------------ #
+
+    def read_block(self, timeout=None) :
+        '''
+        Method to read an IEEE 488.2 definite length block (#<n><length><data>).
+
+        Args:
+            timeout (float) : Maximum time to wait for each part of the block (s).
+                Default : self.timeout.
+
+        Returns:
+            A bytearray with the block, header included, without the terminator.
+
+        Raises:
+            TimeoutError if the instrument doesn't answer in time.
+            ValueError if the response is not a definite length block.
+        '''
+        buf = self.read_response(timeout)
+        if not is_block(buf) :
+            raise ValueError("FCA3103 ERROR: Not a definite length block: %r" % \
+            bytes(buf[:20]))
+        return buf
+
+    # ------------------------------------------------------------------------ #
+
+    def query_block(self, cmd, timeout=None) :
+        '''
+        Method to write a command and read its definite length block response.
+
+        Args:
+            cmd (str) :  A SCPI valid command for the device.
+            timeout (float) : Maximum time to wait for the response (s).
+                Default : self.timeout.
+
+        Returns:
+            A bytearray with the block, header included.
+        '''
+        if self.sinks :
+            return self._traced("query", cmd, self._query_block, cmd, timeout)
+        return self._query_block(cmd, timeout)
+
+    # ------------------------------------------------------------------------ #
+
+    def _query_block(self, cmd, timeout) :
+        self._write(cmd)
+        return self.read_block(timeout)
+
+    # ------------------------------------------------------------------------ #
+
     def write(self, cmd, check=False) :
         '''
         Method for writing to input buffer of the instrument.
 
         Args:
             cmd (str) : A SCPI valid command for the device.
-            check (boolean) : When true the driver will ask for errors in previous command.
+            check (boolean) : Check the errors of the command, see check. The
+                status byte is read in the same message.
 
-        Returns:
-            If check=True it returns a tuple (error code,error message).
+        Raises:
+            SCPI_error if check is set and the instrument reports errors.
         '''
-        self.driver.write(str.encode(cmd))
-        time.sleep(1)
-
         if check :
-            return self.query("syst:err?")
+            self.check(cmd)
+            return
+        if self.sinks :
+            self._traced("write", cmd, self._write, cmd)
+        else :
+            self._write(cmd)
+
+    # ------------------------------------------------------------------------ #
+
+    def _write(self, cmd) :
+        '''
+        Pace and write a command.
+        '''
+        self._sent.append(cmd)
+        if not self.sinks :
+            self._pace()
+            self.driver.write(str.encode(cmd))
+            return
+        t0 = time.perf_counter()
+        self._pace()
+        t1 = time.perf_counter()
+        data = str.encode(cmd)
+        self.driver.write(data)
+        totals = self.trace_totals
+        totals[0] += len(data)
+        totals[2] += t1 - t0
+        totals[3] += time.perf_counter() - t1
+
+    # ------------------------------------------------------------------------ #
+
+    def sync(self, timeout=None) :
+        '''
+        Method to wait until all the previous commands have been executed.
+
+        It uses *OPC? instead of a fixed delay, so it returns as soon as the
+        instrument is ready. If check_errors is set, the status byte is read
+        in the same message, see check.
+
+        Args:
+            timeout (float) : Maximum time to wait (s). Default : self.timeout.
+
+        Raises:
+            TimeoutError if the instrument doesn't answer in time.
+            SCPI_error if the instrument reports errors.
+        '''
+        if self.check_errors :
+            self.check("*OPC?", timeout)
+        else :
+            self.query("*OPC?", timeout=timeout)
+
+    # ------------------------------------------------------------------------ #
+
+    def check(self, cmd=None, timeout=None) :
+        '''
+        Method to check if the previous commands caused errors.
+
+        The status byte (*STB?) is read, in the same message as cmd if it is
+        given, so a check costs a single round trip. The error queue is only
+        read when the status byte reports errors. The error bits of the event
+        status register are enabled (*ESE, *SRE) in the first check.
+
+        Args:
+            cmd (str) : Command sent before *STB?, in the same message.
+            timeout (float) : Maximum time to wait (s). Default : self.timeout.
+
+        Raises:
+            SCPI_error (the subclass of the first error) with all the errors
+            in the queue and the commands sent since the previous check.
+        '''
+        enable = not self._status_enabled
+        self._status_enabled = True
+        commands = list(self._sent)
+        if cmd is not None :
+            commands.append(cmd)
+        reply = self.query(status_program(cmd, enable), timeout=timeout)
+        self._sent.clear()
+        if status_errors(reply) :
+            esr, errors = self.errors()
+            raise scpi_error(errors, commands, esr)
+
+    # ------------------------------------------------------------------------ #
+
+    def abort(self) :
+        '''
+        Method to abort the measurement and clear the errors.
+
+        Responses of previous queries still pending (e.g. a FETCH that timed
+        out) are discarded.
+        '''
+        self.write(ABORT_CLEAR)
+        while self.read_response() != b"1" :
+            pass
+
+    # ------------------------------------------------------------------------ #
+
+    def errors(self) :
+        '''
+        Method to read and clear the event status register and the error queue.
+
+        The queue is drained with error_batch SYST:ERR? in each message.
+
+        Returns:
+            A tuple (event status register, list of (code, message) tuples).
+        '''
+        esr, errors, more = parse_errors_batch(self.query(errors_program( \
+        self.error_batch, esr=True)), self.error_batch, esr=True)
+        while more :
+            _, batch, more = parse_errors_batch(self.query(errors_program( \
+            self.error_batch)), self.error_batch)
+            errors.extend(batch)
+        self._sent.clear()
+        return (esr, errors)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*
+'''
+Fixtures of the tests, run against the simulated instrument.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import os
+import sys
+
+import pytest
+
+# The modules are not installed, import them from the source tree
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FCA3103 import FCA3103
+from sim_fca3103 import Sim_fca3103
+
+
+@pytest.fixture
+def sim() :
+    '''
+    Unthrottled simulated instrument, with a fixed seed.
+    '''
+    sim = Sim_fca3103(time_scale=0, latency=0, seed=1)
+    yield sim
+    sim.close()
+
+
+@pytest.fixture
+def device(sim) :
+    '''
+    FCA3103 connected to the simulated instrument, ready to measure.
+    '''
+    device = FCA3103(0, 1, 2, transport=sim, trig_cache=None)
+    device.trig_level[0] = device.trig_level[1] = 1.5
+    device.pps_period = 0.001
+    return device
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the stability analysis, against direct implementations of the
+definitions.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+from fca3103_analysis import *
+
+
+def naive_adev(x, m, tau0) :
+    n = len(x)
+    s = sum((x[i+2*m] - 2*x[i+m] + x[i])**2 for i in range(n - 2*m))
+    return math.sqrt(s / (2 * (n - 2*m))) / (m * tau0)
+
+
+def naive_mdev(x, m, tau0) :
+    n = len(x)
+    s = 0.0
+    for j in range(n - 3*m + 1) :
+        s += sum(x[i+2*m] - 2*x[i+m] + x[i] for i in range(j, j + m))**2
+    return math.sqrt(s / (2 * (n - 3*m + 1))) / (m * m * tau0)
+
+
+def naive_mtie(x, m) :
+    return max(max(x[i:i+m+1]) - min(x[i:i+m+1]) for i in range(len(x) - m))
+
+
+@pytest.fixture
+def series() :
+    rng = random.Random(1)
+    x = [0.0]
+    for i in range(40) :
+        x.append(x[-1] + rng.gauss(0, 1e-12) + 3e-13)
+    return x
+
+
+def test_octave_taus() :
+    assert list(octave_taus(9, 2)) == [1, 2, 4]
+    assert list(octave_taus(8, 2)) == [1, 2]
+    assert list(octave_taus(2, 2)) == []
+
+
+def test_adev(series) :
+    m = [1, 2, 3, 5, 8]
+    tau, dev = adev(series, 0.5, m)
+    np.testing.assert_allclose(tau, np.array(m) * 0.5)
+    np.testing.assert_allclose(dev, [naive_adev(series, k, 0.5) for k in m], rtol=1e-12)
+
+
+def test_mdev_and_tdev(series) :
+    m = [1, 2, 3, 5, 8]
+    tau, dev = mdev(series, 2.0, m)
+    ref = [naive_mdev(series, k, 2.0) for k in m]
+    np.testing.assert_allclose(dev, ref, rtol=1e-12)
+    tau, dev = tdev(series, 2.0, m)
+    np.testing.assert_allclose(dev, [k * 2.0 / math.sqrt(3) * r for k, r in \
+    zip(m, ref)], rtol=1e-12)
+
+
+def test_mtie(series) :
+    tau, dev = mtie(series, 0.5)
+    m = [1, 2, 4, 8, 16, 32]
+    np.testing.assert_allclose(tau, np.array(m) * 0.5)
+    np.testing.assert_allclose(dev, [naive_mtie(series, k) for k in m], rtol=1e-12)
+
+
+@pytest.mark.parametrize("n", [9, 10])
+def test_largest_tau(n) :
+    x = [0.0, 3.0, -1.0, 4.0, 1.0, -5.0, 9.0, 2.0, -6.0, 5.0][:n]
+    # The largest m with 2m < n leaves a single (n odd) or two second differences
+    m = (n - 1) // 2
+    np.testing.assert_allclose(adev(x, 1.0, [m])[1], [naive_adev(x, m, 1.0)], rtol=1e-12)
+    m = (n - 1) // 3
+    np.testing.assert_allclose(mdev(x, 1.0, [m])[1], [naive_mdev(x, m, 1.0)], rtol=1e-12)
+    tau, dev = mtie(x)
+    assert list(tau) == [1, 2, 4, 8]
+    np.testing.assert_allclose(dev, [naive_mtie(x, k) for k in [1, 2, 4, 8]], rtol=1e-12)
+
+
+@pytest.mark.parametrize("func, m", [(adev, 5), (mdev, 4), (adev, 0)])
+def test_not_enough_samples(func, m) :
+    with pytest.raises(ValueError, match="Not enough samples") :
+        func(np.zeros(10), 1.0, [m])
+
+
+def test_analyze_structured(series) :
+    data = np.zeros(len(series), [("value", "<f8"), ("timestamp", "<f8")])
+    data["value"] = series
+    result = analyze(data, 1.0)
+    assert list(result["tau"]) == [1, 2, 4, 8, 16, 32]
+    np.testing.assert_allclose(result["adev"][:5], adev(series)[1])
+    # 2*32 and 3*16 samples are more than the series has
+    assert np.isnan(result["adev"][5]) and np.isnan(result["mdev"][4:]).all()
+    np.testing.assert_allclose(result["mtie"], mtie(series)[1])
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the asyncio driver and measurement methods.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import os
+import time
+import asyncio
+
+import pytest
+
+from async_fca3103 import *
+from sim_fca3103 import Sim_fca3103
+
+
+class Blocking_sim(Sim_fca3103) :
+    '''
+    Simulated instrument that can't be polled and blocks in read, like usbtmc.
+    '''
+
+    pollable = False
+    ## Delay before each read returns (s)
+    delay = 0.0
+
+    def __init__(self, *args, **kwargs) :
+        super().__init__(*args, **kwargs)
+        self.read_timeout = 5.0
+        os.set_blocking(self.fileno(), False)
+
+    def set_timeout(self, timeout) :
+        self.read_timeout = timeout
+
+    def read(self, length=1) :
+        time.sleep(self.delay)
+        t = time.monotonic()
+        while True :
+            try :
+                return super().read(length)
+            except BlockingIOError :
+                if time.monotonic() - t > self.read_timeout :
+                    raise TimeoutError("usbtmc read timed out")
+                time.sleep(0.001)
+
+
+async def open_device(transport) :
+    device = await AsyncFCA3103.open(0, 1, 2, transport=transport, trig_cache=None)
+    device.trig_level[0] = device.trig_level[1] = 1.5
+    device.pps_period = 0.001
+    return device
+
+
+@pytest.mark.parametrize("cls", [Sim_fca3103, Blocking_sim])
+def test_measurements(cls) :
+    async def main() :
+        device = await open_device(cls(time_scale=0, latency=0, seed=1))
+        try :
+            mean = await device.mean_time_interval(3, 0)
+            ci = await device.mean_time_interval_ci(50, 0)
+            values = await device.time_interval(5, binary=True)
+            chunks = [c async for c in device.continuous_stream(n_samples=5)]
+            return mean, ci, values, chunks, device.gaps
+        finally :
+            device.drv.driver.close()
+    mean, ci, values, chunks, gaps = asyncio.run(main())
+    assert abs(mean - 1e-9) < 1e-10
+    assert abs(ci[0] - 1e-9) < 1e-10 and ci[2] >= 5
+    assert len(values) == 5
+    assert sum(len(c) for c in chunks) == 5 and gaps.samples == 5
+
+
+def test_trigger_level() :
+    async def main() :
+        device = await open_device(Sim_fca3103(time_scale=0, latency=0, seed=1))
+        try :
+            profile = await device.trigger_level(1, 2, coarse=0.5, resolution=0.05)
+            assert device.trig_profile == profile
+            return device, profile, await device.check_trigger_level(v_min=1, v_max=2)
+        finally :
+            device.drv.driver.close()
+    device, profile, swept = asyncio.run(main())
+    assert abs(device.trig_level[0] - 1.5) <= 0.1
+    assert min(profile) == 1 and max(profile) <= 2
+    # No trigger cache, so the check sweeps again
+    assert swept
+
+
+def test_errors() :
+    async def main() :
+        device = await open_device(Sim_fca3103(time_scale=0, latency=0))
+        try :
+            await device.drv.write("BOGUS")
+            with pytest.raises(Command_error) :
+                await device.drv.sync()
+            await device.drv.sync()
+        finally :
+            device.drv.driver.close()
+    asyncio.run(main())
+
+
+def test_cancelled_read_does_not_take_the_next_response() :
+    async def main() :
+        sim = Blocking_sim(time_scale=0, latency=0)
+        drv = await AsyncFCA3103_drv.open(0, sim)
+        sim.delay = 0.2
+        try :
+            with pytest.raises(asyncio.TimeoutError) :
+                await asyncio.wait_for(drv.query("*IDN?"), 0.05)
+            return await drv.query("*OPC?")
+        finally :
+            sim.close()
+    assert asyncio.run(main()) == "1"
+
+
+def test_stream_closed_early() :
+    async def main() :
+        sim = Sim_fca3103(time_scale=0, latency=0, seed=1)
+        sent = []
+        write = sim.write
+        sim.write = lambda cmd : sent.append(bytes(cmd).decode()) or write(cmd)
+        device = await open_device(sim)
+        device.fetch_size = 10
+        try :
+            stream = device.time_interval_stream(100)
+            assert len(await stream.__anext__()) == 10
+            await stream.aclose()
+            assert "ABORT" in sent[-1].split(";")
+            return await device.time_interval(5)
+        finally :
+            sim.close()
+    assert len(asyncio.run(main())) == 5
+
+
+def test_stream_without_samples() :
+    async def main() :
+        sim = Sim_fca3103(time_scale=0, latency=0, seed=1, amplitude=1.0)
+        device = await open_device(sim)
+        device.drv.timeout = 0.05
+        try :
+            with pytest.raises(TimeoutError, match="No samples") :
+                await device.time_interval(5)
+            sim.amplitude = 5.0
+            return await device.time_interval(5)
+        finally :
+            sim.close()
+    assert len(asyncio.run(main())) == 5
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the capture files: appending runs and recovering from a crash.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import numpy as np
+import pytest
+
+import fca3103_capture
+from fca3103_capture import *
+
+
+def crash(path, name, values, tail=b"") :
+    '''
+    Write a run and leave it open, like a writer killed while writing.
+    '''
+    w = Capture_writer(path, {"run_id" : name, "start" : 0, "pps_period" : 1})
+    w.write(values)
+    w.file.write(tail)
+    w.file.close()
+
+
+def listing(path) :
+    return [(run.meta["run_id"], list(run.data())) for run in Capture_file(path)]
+
+
+def test_append_runs(tmp_path) :
+    path = str(tmp_path / "c.cap")
+    for name, values in (("a", [1.0, 2.0]), ("b", [3.0])) :
+        with Capture_writer(path, {"run_id" : name, "start" : 0, "pps_period" : 1}) as w :
+            w.write(values)
+    assert listing(path) == [("a", [1.0, 2.0]), ("b", [3.0])]
+    assert Capture_file(path).find("b").count == 1
+
+
+def test_tstamp_run(tmp_path) :
+    path = str(tmp_path / "c.cap")
+    data = np.array([(1e-9, 1.0), (2e-9, 2.0), (3e-9, 3.0)], CAPTURE_TSTAMP)
+    with Capture_writer(path, {"run_id" : "a", "start" : 100.0}, tstamp=True) as w :
+        w.write(data)
+    run = Capture_file(path)[0]
+    np.testing.assert_array_equal(run.data(), data)
+    np.testing.assert_array_equal(run.times(), [101.0, 102.0, 103.0])
+    assert list(run.time_slice(101.5, 103.0)["value"]) == [2e-9]
+
+
+def test_crashed_run_is_read(tmp_path) :
+    path = str(tmp_path / "c.cap")
+    crash(path, "a", [1.0, 2.0, 3.0], tail=b"\x01\x02\x03")
+    assert listing(path) == [("a", [1.0, 2.0, 3.0])]
+
+
+def test_append_after_crash(tmp_path) :
+    path = str(tmp_path / "c.cap")
+    crash(path, "a", [1.0, 2.0, 3.0], tail=b"\x01\x02\x03")
+    with Capture_writer(path, {"run_id" : "b", "start" : 0}) as w :
+        w.write([4.0, 5.0])
+    assert listing(path) == [("a", [1.0, 2.0, 3.0]), ("b", [4.0, 5.0])]
+    assert not repair(path)
+
+
+def test_run_appended_without_repair(tmp_path, monkeypatch) :
+    # Files written before repair existed: the open run ends at the next run
+    path = str(tmp_path / "c.cap")
+    crash(path, "a", [1.0, 2.0, 3.0])
+    monkeypatch.setattr(fca3103_capture, "repair", lambda path : False)
+    with Capture_writer(path, {"run_id" : "b", "start" : 0}) as w :
+        w.write([4.0, 5.0])
+    assert listing(path) == [("a", [1.0, 2.0, 3.0]), ("b", [4.0, 5.0])]
+
+
+def test_crash_in_the_header(tmp_path) :
+    path = str(tmp_path / "c.cap")
+    with Capture_writer(path, {"run_id" : "a", "start" : 0}) as w :
+        w.write([1.0])
+    with open(path, "ab") as f :
+        f.write(MAGIC + b"\x01")
+    assert listing(path) == [("a", [1.0])]
+    assert repair(path)
+    assert listing(path) == [("a", [1.0])]
+
+
+def test_not_a_capture_file(tmp_path) :
+    path = tmp_path / "c.cap"
+    path.write_bytes(b"x" * 100)
+    with pytest.raises(ValueError) :
+        Capture_file(str(path))
+
+
+def test_sim_capture(tmp_path, device) :
+    path = str(tmp_path / "c.cap")
+    with Capture_writer(path, metadata(device, 30, True), tstamp=True) as w :
+        for chunk in device.time_interval_stream(30, tstamp=True, binary=True) :
+            w.write(chunk)
+    run = Capture_file(path)[0]
+    assert run.count == 30
+    assert run.meta["serial"] == "SIM0001"
+    assert np.all(np.diff(run.data()["timestamp"]) > 0)
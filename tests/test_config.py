@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the configuration deltas sent by FCA3103.configure.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import pytest
+
+from FCA3103 import *
+
+
+@pytest.fixture
+def sent(device, monkeypatch) :
+    '''
+    Programs written to the simulated instrument.
+    '''
+    programs = []
+    write = device.drv.driver.write
+    monkeypatch.setattr(device.drv.driver, "write", \
+    lambda cmd : (programs.append(bytes(cmd).decode()), write(cmd))[1])
+    return programs
+
+
+def configure(device, sent, *args, **kwargs) :
+    '''
+    Configure the device and get the program sent, without the status check.
+    '''
+    del sent[:]
+    changed = device.configure(device.settings(*args, **kwargs))
+    return changed, [p.rsplit(";*STB?", 1)[0] for p in sent]
+
+
+def test_first_configuration_resets(device, sent) :
+    changed, programs = configure(device, sent, levels=device.trig_level)
+    assert changed
+    assert len(programs) == 1
+    assert "*RST" in programs[0].split(";")
+    assert ":INPUT1:LEVEL 1.500" in programs[0]
+
+
+def test_same_configuration_sends_nothing(device, sent) :
+    configure(device, sent, levels=device.trig_level)
+    changed, programs = configure(device, sent, levels=device.trig_level)
+    assert not changed
+    assert programs == []
+
+
+def test_only_changed_settings_are_sent(device, sent) :
+    configure(device, sent, levels=device.trig_level)
+    changed, programs = configure(device, sent, levels=(1.2, 1.2))
+    assert changed
+    assert programs[0].split(";") == [":INPUT1:LEVEL 1.200", ":INPUT2:LEVEL 1.200"]
+
+
+def test_function_change_resends_the_rest(device) :
+    device.configure(device.settings(levels=device.trig_level))
+    device.slave_chan, device.master_chan = 1, 2
+    delta = device.delta(device.settings(levels=device.trig_level))
+    headers = [h for h, v in delta]
+    assert headers[0] == FCA3103.FUNCTION
+    assert "INPUT1:LEVEL" in headers and "FORMAT" in headers
+
+
+def test_delta_against_a_given_state(device) :
+    settings = device.settings(levels=device.trig_level)
+    assert device.delta(settings, dict(settings)) == []
+    assert device.delta(settings, {}) == settings
+
+
+def test_error_discards_the_state(device) :
+    device.configure(device.settings(levels=device.trig_level))
+    with pytest.raises(Execution_error) :
+        device.configure([("INPUT1:LEVEL", "abc")])
+    assert device.state is None
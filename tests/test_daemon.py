@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the measurement daemon and its client.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import json
+import time
+import socket
+import threading
+
+import pytest
+
+from fca3103_daemon import *
+from fca3103_client import *
+
+
+@pytest.fixture
+def server(device, tmp_path) :
+    '''
+    Daemon serving the simulated instrument from a thread.
+    '''
+    server = FCA3103_daemon(device, str(tmp_path / "fca3103.sock"))
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), \
+    daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def client(server) :
+    client = FCA3103_client(server.server_address)
+    yield client
+    client.close()
+
+
+def test_info(client) :
+    info = client.info()
+    assert info["serial"] == "SIM0001"
+    assert (info["master_chan"], info["slave_chan"]) == (1, 2)
+    assert info["trig_level"] == [1.5, 1.5]
+
+
+def test_mtint(client) :
+    result = client.mean_time_interval(5, 0)
+    assert result["samples"] == 5 and result["stderr"] is None
+    assert abs(result["mean"] - 1e-9) < 1e-10
+    result = client.mean_time_interval(50, 0, ci=1e-9)
+    assert result["samples"] < 50 and result["stderr"] > 0
+
+
+@pytest.mark.parametrize("tstamp", [False, True])
+def test_tint(client, server, tstamp) :
+    server.device.fetch_size = 7
+    chunks = list(client.time_interval_stream(20, tstamp=tstamp, binary=True))
+    assert [len(c) for c in chunks] == [7, 7, 6]
+    assert all(len(v) == 2 for v in chunks[0]) if tstamp else \
+    all(isinstance(v, float) for v in chunks[0])
+
+
+def test_bad_request(server) :
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(server.server_address)
+    f = sock.makefile("rb")
+    try :
+        for line in (b"not json\n", b"[1, 2]\n") :
+            sock.sendall(line)
+            assert json.loads(f.readline())["type"] == "ValueError"
+    finally :
+        f.close()
+        sock.close()
+
+
+def test_errors_are_sent_to_the_client(client) :
+    with pytest.raises(ValueError, match="Unknown function") :
+        client._result("foo")
+    # The connection is still usable
+    assert client.info()["serial"] == "SIM0001"
+
+
+def test_failed_request_leaves_the_instrument_ready(client, server) :
+    server.device.drv.timeout = 0.05
+    # The inputs never reach 9 V, READ? times out
+    with pytest.raises(TimeoutError) :
+        client.mean_time_interval(3, 0, trigl=9)
+    assert server.device.trig_level == [1.5, 1.5]
+    result = client.mean_time_interval(3, 0, trigl=1.5)
+    assert abs(result["mean"] - 1e-9) < 1e-10
+    assert server.device.drv.errors() == (0, [])
+
+
+def test_request_timeout(client) :
+    with pytest.raises(TimeoutError, match="not done") :
+        client.mean_time_interval(1000, 0.01, timeout=0.1)
+    assert client.mean_time_interval(3, 0)["samples"] == 3
+
+
+def test_request_cancelled_when_the_client_is_gone(server) :
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(server.server_address)
+    sock.sendall(b'{"function" : "mtint", "samples" : 1000, "interval" : 0.01}\n')
+    time.sleep(0.1)
+    sock.close()
+    client = FCA3103_client(server.server_address)
+    try :
+        t = time.monotonic()
+        assert client.mean_time_interval(3, 0)["samples"] == 3
+        assert time.monotonic() - t < 2
+    finally :
+        client.close()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the decoding of FETCH:ARR? responses.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import numpy as np
+import pytest
+
+from fca3103_decode import *
+
+VALUES = [1.0123456789e-09, -2.5e-12, 3.0]
+
+
+def block(data) :
+    size = str(len(data))
+    return bytearray(("#%d%s" % (len(size), size)).encode() + data)
+
+
+def test_ascii() :
+    buf = b",".join(b"%+.11E" % v for v in VALUES)
+    np.testing.assert_array_equal(decode_ascii(buf), VALUES)
+    np.testing.assert_array_equal(decode_ascii(buf.decode()), VALUES)
+    assert len(decode_ascii(buf, n=2)) == 2
+
+
+def test_ascii_tstamp() :
+    buf = b"+1.0E-09,+1.0E+00,+2.0E-09,+2.0E+00"
+    data = decode_ascii(buf, tstamp=True)
+    assert data.dtype == ASCII_TSTAMP
+    np.testing.assert_array_equal(data["value"], [1e-9, 2e-9])
+    np.testing.assert_array_equal(data["timestamp"], [1.0, 2.0])
+
+
+def test_real() :
+    data = decode_real(block(np.array(VALUES, REAL).tobytes()))
+    np.testing.assert_array_equal(data, VALUES)
+
+
+def test_real_tstamp() :
+    pairs = np.array([(1e-9, 1.0), (2e-9, 2.0)], REAL_TSTAMP)
+    data = decode_real(block(pairs.tobytes()), tstamp=True)
+    np.testing.assert_array_equal(data["value"], [1e-9, 2e-9])
+    np.testing.assert_array_equal(data["timestamp"], [1.0, 2.0])
+
+
+def test_real_is_a_view() :
+    buf = block(np.array(VALUES, REAL).tobytes())
+    data = decode_real(buf)
+    assert not data.flags.owndata
+
+
+@pytest.mark.parametrize("buf", [b"", b"1,2", b"#0", b"#3800"])
+def test_not_a_block(buf) :
+    with pytest.raises(ValueError) :
+        block_payload(buf)
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_sim_tstamp(device, binary) :
+    data = device.time_interval(20, tstamp=True, binary=binary)
+    assert len(data) == 20
+    assert np.all(np.diff(data["timestamp"]) > 0)
+    assert abs(data["value"].mean() - 1e-9) < 1e-10
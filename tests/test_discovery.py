@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the discovery of the usbtmc counters.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import pytest
+
+import fca3103_discovery
+from fca3103_discovery import *
+from sim_fca3103 import Sim_fca3103
+
+
+@pytest.fixture
+def ports(monkeypatch) :
+    '''
+    Simulated instruments at ports 0 and 3 (port -> serial), opened in place of
+    /dev/usbtmcN.
+    '''
+    ports = {0 : "SIM0000", 3 : "SIM0003"}
+
+    def open_port(port) :
+        if port not in ports :
+            raise FileNotFoundError("/dev/usbtmc%d" % port)
+        return Sim_fca3103(time_scale=0, latency=0, serial=ports[port])
+
+    monkeypatch.setattr(fca3103_discovery, "Gen_usbtmc", open_port)
+    monkeypatch.setattr(fca3103_discovery, "scan", lambda : sorted(ports))
+    return ports
+
+
+def test_scan(tmp_path) :
+    for name in ("usbtmc0", "usbtmc12", "usbtmc", "usbtmc1a", "ttyUSB0") :
+        (tmp_path / name).write_text("")
+    assert scan(str(tmp_path)) == [0, 12]
+    assert scan(str(tmp_path / "missing")) == []
+
+
+def test_probe(ports) :
+    assert probe(3) == ("Tektronix", "FCA3103", "SIM0003")
+    assert probe(1) is None
+
+
+@pytest.mark.parametrize("idn", [b"\xff\xfe\x80", b"FOO"])
+def test_probe_other_device(ports, monkeypatch, idn) :
+    # Another usbtmc device answering *IDN? with bytes that aren't a counter's
+    def open_port(port) :
+        sim = Sim_fca3103(time_scale=0, latency=0)
+        sim._commands = dict(Sim_fca3103._commands)
+        sim._commands["*IDN?"] = lambda self, arg : idn
+        return sim
+
+    monkeypatch.setattr(fca3103_discovery, "Gen_usbtmc", open_port)
+    assert probe(0) is None
+
+
+def test_discover(ports, tmp_path) :
+    cache = Device_cache(str(tmp_path / "devices.json"))
+    assert discover(cache=cache) == {0 : ("Tektronix", "FCA3103", "SIM0000"), \
+    3 : ("Tektronix", "FCA3103", "SIM0003")}
+    assert cache.get("SIM0003") == 3
+    assert discover([]) == {}
+
+
+def test_find(ports, tmp_path, monkeypatch) :
+    cache = Device_cache(str(tmp_path / "devices.json"))
+    assert find("SIM0003", cache=cache) == 3
+    assert find("SIM0009", cache=cache) is None
+    # A cached port is returned without probing
+    monkeypatch.setattr(fca3103_discovery, "probe", lambda port, timeout : None)
+    assert find("SIM0003", cache=cache) == 3
+    # Unless it's gone
+    del ports[3]
+    assert find("SIM0003", cache=cache) is None
+
+
+def test_cache_update_and_forget(tmp_path) :
+    cache = Device_cache(str(tmp_path / "devices.json"))
+    cache.update({1 : ("T", "FCA3103", "A"), 2 : ("T", "FCA3103", "B")})
+    # B was reconnected at port 1
+    cache.update({1 : ("T", "FCA3103", "B")})
+    assert cache.get("A") is None
+    assert cache.get("B") == 1
+    cache.forget("B")
+    assert cache.get("B") is None
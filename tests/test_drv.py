@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the waits, the response framing and the error checks of FCA3103_drv.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import time
+
+import pytest
+
+from tektronix_fca3103_drv import *
+
+IDN = b"Tektronix,FCA3103,TEST01,V1.0\n"
+
+
+class Canned() :
+    '''
+    Transport that answers each write with the next canned response, a few
+    bytes in each read.
+    '''
+
+    pollable = False
+
+    def __init__(self, responses, size=5) :
+        self.responses = [IDN] + list(responses)
+        self.size = size
+        self.out = bytearray()
+        self.written = []
+
+    def write(self, cmd) :
+        self.written.append(bytes(cmd).decode())
+        self.out += self.responses.pop(0)
+
+    def read(self, length=1) :
+        data = bytes(self.out[:min(length, self.size)])
+        del self.out[:len(data)]
+        return data
+
+    def readinto(self, buf) :
+        data = self.read(len(buf))
+        buf[:len(data)] = data
+        return len(data)
+
+
+def block(data) :
+    size = str(len(data))
+    return ("#%d%s" % (len(size), size)).encode() + data
+
+
+@pytest.mark.parametrize("buf, missing", [
+    (b"", -1), (b"1,2", -1), (b"1,2\n", 0), (b"#", -1), (b"#2", -1),
+    (b"#210", 11), (b"#210\n\n\n", 8), (block(b"0123456789") + b"\n", 0),
+    (b"#0", -1), (b"#0abc", -1), (b"#0abc\n", 0),
+])
+def test_missing_bytes(buf, missing) :
+    assert missing_bytes(bytearray(buf)) == missing
+
+
+def test_response_in_pieces() :
+    drv = FCA3103_drv(0, transport=Canned([b"+1.5E-09,+2.5E-09\n"]))
+    assert drv.serial == "TEST01"
+    assert drv.query_raw("FETCH:ARR? 2") == b"+1.5E-09,+2.5E-09"
+
+
+def test_indefinite_length_block() :
+    drv = FCA3103_drv(0, transport=Canned([b"#0" + b"\x01\x02" * 10 + b"\n"]))
+    assert drv.query_raw("FETCH:ARR? 5") == b"#0" + b"\x01\x02" * 10
+    with pytest.raises(ValueError, match="Not a definite length block") :
+        drv = FCA3103_drv(0, transport=Canned([b"#0\x01\x02\n"]))
+        drv.query_block("FETCH:ARR? 1")
+
+
+def test_block_with_terminators_inside() :
+    data = b"\n\n12\n4567\n"
+    drv = FCA3103_drv(0, transport=Canned([block(data) + b"\n", b"1\n"]))
+    assert bytes(drv.query_block("FETCH:ARR? 1")) == block(data)
+    # The next response is not mixed with the block
+    assert drv.query("*OPC?") == "1"
+
+
+def test_query_into_reuses_the_buffer() :
+    data = b"\n" * 300
+    drv = FCA3103_drv(0, transport=Canned([block(data) + b"\n"], size=64))
+    buf = bytearray(1000)
+    n = drv.query_into("FETCH:ARR? 1", buf)
+    assert len(buf) == 1000
+    assert bytes(buf[:n]) == block(data)
+
+
+def test_query_block_rejects_ascii() :
+    drv = FCA3103_drv(0, transport=Canned([b"1,2\n"]))
+    with pytest.raises(ValueError) :
+        drv.query_block("FETCH:ARR? 2")
+
+
+def test_parse_errors() :
+    assert parse_errors('-113,"Undefined header";0,"No error"') == \
+    [(-113, "Undefined header"), (0, "No error")]
+
+
+@pytest.mark.parametrize("code, cls", [
+    (-113, Command_error), (-224, Execution_error), (-350, Device_error),
+    (-410, Query_error), (100, Device_error),
+])
+def test_error_class(code, cls) :
+    e = scpi_error([(code, "x")], ["CMD"])
+    assert type(e) is cls
+    assert isinstance(e, SCPI_error)
+    assert e.errors == [(code, "x")]
+
+
+def test_error_class_from_esr() :
+    assert type(scpi_error([], esr=0x20)) is Command_error
+    assert type(scpi_error([], esr=0x04)) is Query_error
+
+
+def test_status_program() :
+    assert status_program() == "*STB?"
+    assert status_program("*OPC?", True) == "*ESE %d;*SRE %d;*OPC?;*STB?" % \
+    (ESR_ERRORS, STB_EAV | STB_ESB)
+    assert not status_errors("1;0")
+    assert status_errors("1;%d" % STB_EAV)
+
+
+def test_errors_batch() :
+    reply = ";".join(['-113,"Undefined header"'] * 2)
+    assert parse_errors_batch("32;" + reply, 2, esr=True) == \
+    (32, [(-113, "Undefined header")] * 2, True)
+    assert parse_errors_batch('-113,"Undefined header";0,"No error"', 2) == \
+    (None, [(-113, "Undefined header")], False)
+
+
+def test_sim_errors(device) :
+    drv = device.drv
+    drv.write("BOGUS")
+    drv.write("INPUT1:LEVEL abc")
+    with pytest.raises(Command_error) as e :
+        drv.check()
+    assert [c for c, m in e.value.errors] == [-113, -224]
+    assert "BOGUS" in str(e.value)
+    # The queue was emptied
+    drv.check()
+
+
+def test_sim_long_error_queue(device) :
+    drv = device.drv
+    for i in range(drv.error_batch * 2 + 3) :
+        drv.write("BOGUS")
+    esr, errors = drv.errors()
+    assert esr & 0x20
+    assert len(errors) == drv.error_batch * 2 + 3
+    assert drv.errors() == (0, [])
+
+
+def test_no_delay_between_commands(device) :
+    t = time.monotonic()
+    for i in range(20) :
+        assert device.drv.query("*OPC?") == "1"
+    assert time.monotonic() - t < 1.0
+
+
+def test_pacing(device) :
+    device.drv.pacing = 0.02
+    t = time.monotonic()
+    for i in range(5) :
+        device.drv.query("*OPC?")
+    assert time.monotonic() - t >= 0.08
+
+
+def test_no_response(device) :
+    device.drv.write("*CLS")
+    with pytest.raises(TimeoutError) :
+        device.drv.read(timeout=0.05)
+
+
+def test_not_pollable_transport() :
+    # Canned has no fileno: it must be read without polling
+    drv = FCA3103_drv(0, transport=Canned([b"1\n"], size=100))
+    assert drv.serial == "TEST01"
+    assert drv.query("*OPC?") == "1"
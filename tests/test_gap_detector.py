@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the timestamp gap detector and the continuous acquisition.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import numpy as np
+import pytest
+
+from FCA3103 import *
+from sim_fca3103 import Sim_fca3103
+
+
+def test_regular_steps() :
+    gaps = Gap_detector(0.5)
+    assert gaps.add([1.0, 1.5, 2.0]) == 0
+    assert gaps.add([]) == 0
+    assert gaps.add([2.5, 3.0]) == 0
+    assert gaps.report() == {"samples" : 5, "gaps" : 0, "missed" : 0, \
+    "duplicates" : 0, "misaligned" : 0, "overflows" : 0, "loss" : 0.0}
+
+
+def test_gaps_between_and_across_chunks() :
+    gaps = Gap_detector(1.0)
+    assert gaps.add([1, 2, 5]) == 2
+    # The step from the last sample of the previous chunk counts too
+    assert gaps.add([7, 8]) == 1
+    report = gaps.report()
+    assert (report["samples"], report["gaps"], report["missed"]) == (5, 2, 3)
+    assert report["loss"] == pytest.approx(3 / 8)
+
+
+def test_duplicates_and_misaligned() :
+    gaps = Gap_detector(1.0, tolerance=0.2)
+    gaps.add([1.0, 2.0, 2.0, 1.5, 2.7, 3.9])
+    report = gaps.report()
+    assert report["duplicates"] == 2
+    # 1.5 -> 2.7 is 1.2 periods (and 2.0 -> 1.5 is -0.5)
+    assert report["misaligned"] == 2
+    assert report["gaps"] == 0
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_continuous_stream(device, sim, binary) :
+    device.fetch_size = 30
+    # Unthrottled, the simulator refills its buffer before each poll
+    device.buffer_depth = sim.buffer_depth = 1000
+    chunks = list(device.continuous_stream(binary, n_samples=100, \
+    gaps=Gap_detector(sim.pps_period)))
+    assert [len(c) for c in chunks] == [30, 30, 30, 10]
+    ts = np.concatenate([c["timestamp"] for c in chunks])
+    np.testing.assert_allclose(np.diff(ts), sim.pps_period)
+    assert device.gaps.samples == 100 and device.gaps.missed == 0
+    assert device.gaps.overflows == 4
+    # Continuous mode is turned off at the end
+    assert device.drv.query("INIT:CONT?") in ("0", "OFF")
+    assert device.state["INIT:CONT"] == "OFF"
+
+
+def test_continuous_stream_counts_lost_edges(device, sim) :
+    sim.buffer_depth = 1000
+    sim.drop_rate = 0.2
+    chunks = list(device.continuous_stream(n_samples=200, \
+    gaps=Gap_detector(sim.pps_period)))
+    ts = np.concatenate([c["timestamp"] for c in chunks])
+    # Edges lost before the first sample are not seen
+    assert device.gaps.missed == round((ts[-1] - ts[0]) / sim.pps_period) + 1 - 200
+    assert device.gaps.missed > 0
+
+
+def test_continuous_stream_closed(device, sim) :
+    sim.buffer_depth = 1000
+    stream = device.continuous_stream(gaps=Gap_detector(sim.pps_period))
+    next(stream)
+    stream.close()
+    assert device.state["INIT:CONT"] == "OFF"
+    assert len(device.time_interval(5)) == 5
+
+
+def test_continuous_stream_without_samples(device, sim) :
+    sim.buffer_depth = 1000
+    sim.amplitude = 1.0
+    device.drv.timeout = 0.05
+    with pytest.raises(TimeoutError, match="No samples") :
+        list(device.continuous_stream(n_samples=10))
+    assert device.state["INIT:CONT"] == "OFF"
+    sim.amplitude = 5.0
+    assert len(device.time_interval(5)) == 5
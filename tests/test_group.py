@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the measurements with several instruments in parallel.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import pytest
+
+from fca3103_group import *
+from trigger_cache import Trigger_cache
+from sim_fca3103 import Sim_fca3103
+
+
+@pytest.fixture
+def group() :
+    group = FCA3103_group([0, 1], 1, 2, [Sim_fca3103(time_scale=0, latency=0, \
+    serial="SIM%04d" % i, seed=i) for i in range(2)], trig_cache=None)
+    yield group
+    group.close()
+    for d in group.devices :
+        d.drv.driver.close()
+
+
+def test_configure_without_level(group) :
+    with pytest.raises(ValueError, match="Trigger level not set") :
+        group.configure()
+
+
+def test_time_interval_in_host_time_order(group) :
+    for d in group.devices :
+        d.trig_level[0] = d.trig_level[1] = 1.5
+        d.pps_period = 0.001
+    records = group.time_interval(5, tstamp=True)
+    assert len(records) == 10
+    assert sorted(r[1] for r in records) == ["SIM0000"] * 5 + ["SIM0001"] * 5
+    assert [r[0] for r in records] == sorted(r[0] for r in records)
+
+
+def test_trig_cache(tmp_path) :
+    cache = Trigger_cache(str(tmp_path / "trigger_levels.json"))
+    group = FCA3103_group([0, 1], 1, 2, [Sim_fca3103(time_scale=0, latency=0, \
+    serial="SIM%04d" % i) for i in range(2)], trig_cache=cache)
+    try :
+        assert all(d.trig_cache is cache for d in group.devices)
+    finally :
+        group.close()
+        for d in group.devices :
+            d.drv.driver.close()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the time interval measurements of FCA3103.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import pytest
+
+
+@pytest.fixture
+def sent(sim) :
+    '''
+    Programs written to the simulated instrument.
+    '''
+    sent = []
+    write = sim.write
+
+    def spy(cmd) :
+        sent.append(bytes(cmd).decode())
+        return write(cmd)
+
+    sim.write = spy
+    return sent
+
+
+def test_stream_chunks(device) :
+    device.fetch_size = 7
+    chunks = list(device.time_interval_stream(30, binary=True))
+    assert [len(c) for c in chunks] == [7, 7, 7, 7, 2]
+
+
+def test_time_interval(device) :
+    values = device.time_interval(30)
+    assert len(values) == 30
+    assert abs(sum(values) / len(values) - 1e-9) < 1e-10
+
+
+def test_stream_closed_early(device, sent) :
+    device.fetch_size = 10
+    stream = device.time_interval_stream(100)
+    assert len(next(stream)) == 10
+    stream.close()
+    assert "ABORT" in sent[-1].split(";")
+    assert len(device.time_interval(5)) == 5
+
+
+def test_stream_error_aborts(device, sent) :
+    device.fetch_size = 10
+    fetch = device._fetch
+    calls = []
+
+    def broken(*args, **kwargs) :
+        calls.append(args)
+        if len(calls) > 1 :
+            raise TimeoutError("lost")
+        return fetch(*args, **kwargs)
+
+    device._fetch = broken
+    stream = device.time_interval_stream(100)
+    assert len(next(stream)) == 10
+    with pytest.raises(TimeoutError, match="lost") :
+        next(stream)
+    assert "ABORT" in sent[-1].split(";")
+
+
+def test_stream_without_samples(device, sim, sent) :
+    # The inputs never reach the trigger level
+    sim.amplitude = 1.0
+    device.drv.timeout = 0.05
+    with pytest.raises(TimeoutError, match="No samples") :
+        device.time_interval(5)
+    assert sent[-1] == "ABORT;*CLS;*OPC?"
+    sim.amplitude = 5.0
+    assert len(device.time_interval(5)) == 5
+
+
+def test_level_not_set(device) :
+    device.trig_level[1] = None
+    with pytest.raises(ValueError, match="Trigger level not set") :
+        next(device.time_interval_stream(5))
+
+
+def test_trigger_level_search(device, sent) :
+    profile = device.trigger_level(1, 2, coarse=0.5, resolution=0.05)
+    assert device.trig_profile == profile
+    assert abs(device.trig_level[0] - 1.5) <= 0.1
+    assert device.trig_level[0] == device.trig_level[1]
+    assert min(profile) == 1 and max(profile) <= 2
+    # Each level is measured once
+    levels = [p for p in sent if p.startswith(":INPUT1:LEVEL ") or \
+    ";:INPUT1:LEVEL " in p]
+    assert len(levels) == len(profile)
+
+
+def test_trigger_level_search_with_untriggered_levels(device, sim) :
+    # Levels above the amplitude never trigger and time out
+    sim.amplitude = 3.3
+    device.drv.timeout = 0.05
+    profile = device.trigger_level(1, 4, coarse=0.5, resolution=0.05)
+    assert profile[3.5] == float("inf")
+    assert abs(device.trig_level[0] - 1.5) <= 0.1
+    assert len(device.time_interval(5)) == 5
+
+
+def test_continuous_stream_after_a_block(device, sim) :
+    sim.buffer_depth = 1000
+    assert len(device.time_interval(5)) == 5
+    chunks = list(device.continuous_stream(n_samples=20))
+    assert sum(len(c) for c in chunks) == 20
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the pipelined acquisition.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import time
+import threading
+
+import numpy as np
+import pytest
+
+from fca3103_pipeline import *
+
+
+@pytest.fixture
+def fetched(device) :
+    '''
+    Buffers passed to each FETCH:ARR? of the reader.
+    '''
+    fetched = []
+    query_into = device.drv.query_into
+
+    def spy(cmd, buf, *args, **kwargs) :
+        fetched.append(buf)
+        return query_into(cmd, buf, *args, **kwargs)
+
+    device.drv.query_into = spy
+    device.fetch_size = 10
+    return fetched
+
+
+@pytest.mark.parametrize("tstamp, binary", [(False, False), (True, True)])
+def test_same_samples_as_time_interval(device, tstamp, binary) :
+    device.fetch_size = 7
+    samples = Pipeline(device).time_interval(30, tstamp, binary)
+    assert len(samples) == 30
+    assert samples.dtype == device.time_interval(30, tstamp, binary).dtype
+
+
+def test_buffers_are_reused(device, fetched) :
+    chunks = []
+    assert Pipeline(device, depth=2).run(100, lambda c : chunks.append(len(c)), \
+    binary=True) == 100
+    assert sum(chunks) == 100
+    assert len(fetched) == 10
+    assert len(set(id(buf) for buf in fetched)) <= 2
+
+
+def test_reader_waits_for_a_free_buffer(device, fetched) :
+    pipeline = Pipeline(device, depth=1)
+    # Hold the only buffer while the reader has the next samples to fetch
+    pipeline.run(30, lambda c : time.sleep(0.05))
+    assert pipeline.stalls > 0
+    assert len(fetched) == 3
+
+
+def test_consumer_error_stops_the_reader(device, fetched) :
+    def consumer(chunk) :
+        raise RuntimeError("consumer failed")
+
+    threads = threading.active_count()
+    with pytest.raises(RuntimeError, match="consumer failed") :
+        Pipeline(device, depth=2).run(100, consumer)
+    # The reader stopped early, aborted the measurement and left
+    assert len(fetched) < 10
+    assert threading.active_count() == threads
+    assert len(device.time_interval(20)) == 20
+
+
+def test_chunks_are_filtered(device) :
+    device.fetch_size = 5
+    kept = []
+    assert Pipeline(device).run(20, lambda c : kept.append(len(c)), \
+    filter=lambda c : c[:2]) == 20
+    assert kept == [2, 2, 2, 2]
+
+
+def test_reader_gives_up_without_samples(device, sim) :
+    sim.amplitude = 1.0
+    device.drv.timeout = 0.05
+    with pytest.raises(TimeoutError, match="No samples") :
+        Pipeline(device).time_interval(5)
+    sim.amplitude = 5.0
+    assert len(device.time_interval(5)) == 5
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the scheduling of measurement plans.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import pytest
+
+from fca3103_plan import *
+
+
+@pytest.fixture
+def levels(device, monkeypatch) :
+    '''
+    Trigger level of each configuration applied.
+    '''
+    applied = []
+    configure = device.configure
+    def spy(settings) :
+        changed = configure(settings)
+        if changed :
+            applied.append(dict(settings).get("INPUT1:LEVEL"))
+        return changed
+    monkeypatch.setattr(device, "configure", spy)
+    return applied
+
+
+def test_steps_defaults() :
+    plan = steps([{"function" : "mtint"}], {"samples" : 3})
+    assert plan[0]["samples"] == 3
+    assert plan[0]["name"] == "1 mtint"
+    with pytest.raises(ValueError) :
+        steps([{"function" : "foo"}])
+
+
+def test_same_settings_are_grouped(device) :
+    plan = Plan(device, steps([{"function" : "tint", "samples" : 5}, \
+    {"function" : "mtint"}, {"function" : "tint", "samples" : 5}]))
+    assert plan.schedule() == [0, 2, 1]
+
+
+def test_barriers_keep_the_order(device) :
+    plan = Plan(device, steps([{"function" : "tint", "samples" : 5}, \
+    {"function" : "mtint", "barrier" : True}, {"function" : "tint", "samples" : 5}]))
+    assert plan.schedule() == [0, 1, 2]
+
+
+def test_sweeps_are_barriers(device) :
+    plan = Plan(device, steps([{"function" : "tint"}, {"function" : "mtint"}, \
+    {"function" : "trigl"}, {"function" : "tint"}, {"function" : "mtint"}, \
+    {"function" : "tint"}]))
+    order = plan.schedule()
+    assert order.index(2) == 2
+    assert sorted(order[:2]) == [0, 1]
+
+
+def test_step_level_is_kept_when_reordered(device, levels) :
+    plan = Plan(device, steps([{"function" : "tint", "samples" : 5}, \
+    {"function" : "mtint", "level" : 1.0}, {"function" : "tint", "samples" : 5}]))
+    assert plan.levels([0, 1, 2]) == {0 : 1.5, 1 : 1.0, 2 : 1.5}
+    results = plan.run()
+    assert [r.error for r in results] == [None] * 3
+    assert levels == ["1.500", "1.000"]
+    assert device.trig_level == [1.5, 1.5]
+
+
+def test_level_after_a_sweep(device, levels) :
+    plan = Plan(device, steps([{"function" : "trigl", "v_min" : 1, "v_max" : 2}, \
+    {"function" : "mtint"}]))
+    results = plan.run()
+    assert results[1].error is None
+    assert levels[-1] == "%1.3f" % device.trig_level[0]
+
+
+def test_errors_are_reported(device) :
+    device.drv.timeout = 0.1
+    plan = Plan(device, steps([{"function" : "mtint", "level" : 9.0}, \
+    {"function" : "mtint"}]))
+    results = plan.run()
+    assert results[0].error is not None
+    assert results[1].error is None
+    assert device.trig_level == [1.5, 1.5]
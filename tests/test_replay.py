@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the session recording and replay transports.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import numpy as np
+import pytest
+
+from FCA3103 import *
+from fca3103_replay import *
+
+
+def session(transport) :
+    '''
+    The measurements recorded and replayed by the tests.
+    '''
+    device = FCA3103(0, 1, 2, transport=transport, trig_cache=None)
+    device.trig_level[0] = device.trig_level[1] = 1.5
+    device.pps_period = 0.001
+    return (device.mean_time_interval(3, 0), device.time_interval(5, True, True), \
+    device.time_interval(4))
+
+
+@pytest.fixture
+def recorded(tmp_path, sim) :
+    '''
+    A session recorded from the simulated instrument, and its results.
+    '''
+    path = str(tmp_path / "s.rec")
+    recorder = Recorder(sim, path)
+    results = session(recorder)
+    recorder.close()
+    return path, results
+
+
+def test_round_trip(recorded) :
+    path, results = recorded
+    replay = Replay(path)
+    try :
+        mean, tstamp, values = session(replay)
+    finally :
+        replay.close()
+    assert mean == results[0]
+    np.testing.assert_array_equal(tstamp, results[1])
+    np.testing.assert_array_equal(values, results[2])
+    assert replay.pos == len(replay.records)
+
+
+def test_records(recorded) :
+    start, records = load_session(recorded[0])
+    assert records[0][0] == WRITE and records[0][2] == b"*IDN?"
+    assert records[1][0] == READ and records[1][2].startswith(b"Tektronix,FCA3103")
+    assert all(a[1] <= b[1] for a, b in zip(records, records[1:]))
+
+
+def test_cut_record_is_ignored(recorded) :
+    path = recorded[0]
+    n = len(load_session(path)[1])
+    with open(path, "ab") as f :
+        f.write(RECORD.pack(READ, 1.0, 100) + b"12")
+    assert len(load_session(path)[1]) == n
+
+
+def test_divergence(recorded) :
+    replay = Replay(recorded[0])
+    try :
+        device = FCA3103(0, 1, 2, transport=replay, trig_cache=None)
+        device.trig_level[0] = device.trig_level[1] = 1.2
+        with pytest.raises(ValueError, match="diverged") :
+            device.mean_time_interval(3, 0)
+    finally :
+        replay.close()
+
+
+def test_not_a_session(tmp_path) :
+    path = tmp_path / "s.rec"
+    path.write_bytes(b"x" * 100)
+    with pytest.raises(ValueError) :
+        Replay(str(path))
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the ring buffer of the monitor.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import numpy as np
+
+from fca3103_ring import *
+
+
+def test_wrap(tmp_path) :
+    path = str(tmp_path / "r.ring")
+    ring = Ring_buffer(path, 10, levels=((5, 3),))
+    for start in range(0, 25, 7) :
+        t = np.arange(start, min(start + 7, 25), dtype=float)
+        ring.append(t * 1e-12, t)
+    assert ring.written() == 25
+    np.testing.assert_array_equal(ring.latest()["time"], np.arange(15, 25))
+    np.testing.assert_array_equal(ring.latest(3)["time"], [22, 23, 24])
+
+
+def test_append_more_than_capacity(tmp_path) :
+    ring = Ring_buffer(str(tmp_path / "r.ring"), 10, levels=())
+    t = np.arange(23, dtype=float)
+    ring.append(t, t)
+    np.testing.assert_array_equal(ring.latest()["value"], np.arange(13, 23))
+
+
+def test_summaries_wrap(tmp_path) :
+    ring = Ring_buffer(str(tmp_path / "r.ring"), 100, levels=((5, 3),))
+    t = np.arange(0, 30, 0.5)
+    ring.append(t, t)
+    # Periods 0 to 4 are done, the last 3 are kept; 25-30 is being accumulated
+    s = ring.summaries(0)
+    np.testing.assert_array_equal(s["time"], [10, 15, 20])
+    np.testing.assert_array_equal(s["min"], [10, 15, 20])
+    np.testing.assert_array_equal(s["max"], [14.5, 19.5, 24.5])
+    np.testing.assert_array_equal(s["mean"], [12.25, 17.25, 22.25])
+
+
+def test_reader_sees_the_writer(tmp_path) :
+    path = str(tmp_path / "r.ring")
+    ring = Ring_buffer(path, 10, levels=())
+    reader = Ring_buffer(path, readonly=True)
+    ring.append([1.0, 2.0], [1.0, 2.0])
+    assert list(reader.latest()["value"]) == [1.0, 2.0]
+    reader.close()
+    ring.close()
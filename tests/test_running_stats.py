@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the running statistics and the confidence interval of the mean.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import math
+import statistics
+
+import pytest
+
+from running_stats import *
+
+
+@pytest.mark.parametrize("confidence, df, t", [
+    (0.95, 1, 12.706), (0.95, 2, 4.303), (0.95, 4, 2.776), (0.95, 9, 2.262),
+    (0.95, 29, 2.045), (0.95, 30, 2.042), (0.95, 120, 1.980), (0.99, 5, 4.032),
+    (0.99, 60, 2.660),
+])
+def test_t_factor(confidence, df, t) :
+    assert t_factor(confidence, df) == pytest.approx(t, abs=5e-4)
+
+
+def test_t_factor_tends_to_normal() :
+    assert t_factor(0.95, 100000) == pytest.approx(1.95996, abs=1e-4)
+
+
+def test_mean_and_variance() :
+    values = [1e-9 + k * 1e-12 for k in (3, -1, 4, 1, -5, 9)]
+    stats = Running_stats()
+    stats.extend(values)
+    assert stats.n == 6
+    assert stats.mean == pytest.approx(statistics.mean(values), rel=1e-12)
+    assert stats.stdev() == pytest.approx(statistics.stdev(values), rel=1e-9)
+    assert (stats.min, stats.max) == (min(values), max(values))
+
+
+def test_ci() :
+    stats = Running_stats()
+    stats.add(1.0)
+    assert math.isnan(stats.ci())
+    stats.extend([2.0, 3.0, 4.0, 5.0])
+    assert stats.ci() == pytest.approx(2.776 * stats.stderr(), rel=1e-3)
+    assert stats.ci(0.99) > stats.ci(0.95)
+
+
+def test_sim_ci_stops_early(device) :
+    mean, stderr, n = device.mean_time_interval_ci(200, 0, ci=10e-12)
+    assert 10 <= n < 200
+    assert t_factor(0.95, n - 1) * stderr <= 10e-12
+    assert abs(mean - 1e-9) < 20e-12
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the simulated FCA3103, used through its transport interface.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import pytest
+
+from sim_fca3103 import *
+
+
+def query(sim, cmd) :
+    '''
+    Write a query to the simulated instrument and read its response.
+    '''
+    sim.write(cmd.encode())
+    response = b""
+    while not response.endswith(b"\n") :
+        response += sim.read(4096)
+    return response[:-1].decode()
+
+
+def test_idn(sim) :
+    assert query(sim, "*IDN?").split(",")[:3] == ["Tektronix", "FCA3103", "SIM0001"]
+
+
+def test_settings(sim) :
+    sim.write(b"*RST;:INPut1:LEVel 1.2;:INP2:LEV 1.3")
+    assert float(query(sim, "INPUT1:LEVEL?")) == 1.2
+    assert float(query(sim, "INP2:LEV?")) == 1.3
+
+
+def test_time_interval(sim) :
+    sim.write(b"*RST;:CONF:TINT (@1),(@2);:INP1:LEV 1.5;:INP2:LEV 1.5")
+    values = [float(query(sim, "READ?")) for i in range(50)]
+    mean = sum(values) / len(values)
+    assert mean == pytest.approx(sim.skew, abs=5 * sim.jitter / 50**0.5)
+
+
+def test_samples_array(sim) :
+    sim.write(b"*RST;:CONF:TINT (@1),(@2);:INP1:LEV 1.5;:INP2:LEV 1.5")
+    sim.write(b"ARM:COUNT 10;:INIT")
+    values = query(sim, "FETCH:ARRAY? 10").split(",")
+    assert len(values) == 10
+
+
+def test_errors(sim) :
+    sim.write(b"BOGUS;:INP1:LEV abc")
+    assert query(sim, "SYST:ERR?") == '-113,"Undefined header"'
+    assert query(sim, "SYST:ERR?").startswith("-")
+    assert query(sim, "SYST:ERR?") == '0,"No error"'
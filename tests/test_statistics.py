@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the statistics computed by the instrument.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from async_fca3103 import *
+
+
+@pytest.fixture
+def sent(sim) :
+    '''
+    Programs written to the simulated instrument.
+    '''
+    sent = []
+    write = sim.write
+
+    def spy(cmd) :
+        sent.append(cmd.decode())
+        return write(cmd)
+
+    sim.write = spy
+    return sent
+
+
+def test_statistics(device, sim, sent) :
+    stats = device.statistics(200)
+    assert sorted(stats) == sorted(STATS + ("samples",))
+    assert stats["samples"] == 200
+    assert stats["min"] <= stats["mean"] <= stats["max"]
+    assert stats["mean"] == pytest.approx(sim.skew, abs=5 * sim.jitter / 200**0.5)
+    assert stats["stdev"] == pytest.approx(sim.jitter, rel=0.25)
+    # White phase noise: the Allan deviation of the values is close to stdev
+    assert stats["adev"] == pytest.approx(stats["stdev"], rel=0.25)
+    # A single block, the samples stay in the instrument
+    assert not any("READ?" in p or "FETCH" in p for p in sent)
+
+
+def test_statistics_order(device, sim) :
+    stats = device.statistics(20)
+    # Samples the simulator computed its statistics over
+    values = np.array(sim._stat_values)
+    assert stats["mean"] == pytest.approx(values.mean(), rel=1e-10)
+    assert stats["stdev"] == pytest.approx(values.std(ddof=1), rel=1e-10)
+    assert stats["max"] == pytest.approx(values.max(), rel=1e-10)
+    assert stats["min"] == pytest.approx(values.min(), rel=1e-10)
+
+
+def test_device_stats_mean(device, sim, sent) :
+    mean = device.mean_time_interval(100, 0, device_stats=True)
+    assert mean == pytest.approx(sim.skew, abs=5 * sim.jitter / 10)
+    assert sum(p.count("READ?") for p in sent) == 0
+    # The host mean of the same kind of block agrees
+    host = device.mean_time_interval(100, 0)
+    assert host == pytest.approx(mean, abs=10 * sim.jitter / 10)
+
+
+def test_invalid_statistics(device) :
+    with pytest.raises(MeasureError, match="Invalid statistics") :
+        device._parse_stats("+1.0E-09,+2.0E-12", 10)
+
+
+def test_statistics_without_level(device) :
+    device.trig_level[0] = None
+    with pytest.raises(ValueError, match="Trigger level not set") :
+        device.statistics(10)
+
+
+def test_async_statistics(sim) :
+    async def main() :
+        device = await AsyncFCA3103.open(0, 1, 2, transport=sim, trig_cache=None)
+        device.trig_level[0] = device.trig_level[1] = 1.5
+        device.pps_period = 0.001
+        return await device.statistics(50), \
+        await device.mean_time_interval(50, 0, device_stats=True)
+    stats, mean = asyncio.run(main())
+    assert stats["samples"] == 50
+    assert stats["mean"] == pytest.approx(sim.skew, abs=5 * sim.jitter / 50**0.5)
+    assert mean == pytest.approx(sim.skew, abs=5 * sim.jitter / 50**0.5)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the timing events and their sinks.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import io
+import json
+import math
+
+import pytest
+
+from fca3103_trace import *
+
+
+def event(total, kind="query", name="READ?", error=None) :
+    return Event(kind, name, 6, 17, total / 2, total / 4, total, 1.0, error)
+
+
+def test_command_name() :
+    assert command_name("inp1:lev 1.5;:inp2:lev 1.5") == "INP1:LEV"
+    assert command_name("  ") == ""
+
+
+def test_histogram() :
+    sink = Histogram_sink(buckets=(1e-3, 1e-2, 1e-1))
+    for t in (5e-4, 2e-3, 3e-3, 0.05, 7.0) :
+        sink.emit(event(t))
+    sink.emit(event(1e-3, name="FETCH:ARR?", error="TimeoutError"))
+    assert sink.quantile("query", "READ?", 0.2) == 1e-3
+    assert sink.quantile("query", "READ?", 0.5) == 1e-2
+    assert sink.quantile("query", "READ?", 0.8) == 1e-1
+    assert sink.quantile("query", "READ?", 1.0) == math.inf
+    assert math.isnan(sink.quantile("query", "*OPC?", 0.5))
+    rows = sink.summary()
+    assert [r["name"] for r in rows] == ["READ?", "FETCH:ARR?"]
+    assert rows[0]["count"] == 5 and rows[0]["bytes_in"] == 5 * 17
+    assert rows[0]["mean"] == pytest.approx(7.0555 / 5)
+    assert rows[1]["errors"] == 1
+    sink.reset()
+    assert sink.summary() == []
+
+
+def test_prometheus(tmp_path) :
+    sink = Prometheus_sink(buckets=(1e-3, 1e-2))
+    sink.emit(event(5e-4, name='A"B'))
+    sink.emit(event(5e-3, name='A"B'))
+    text = sink.exposition()
+    labels = 'kind="query",name="A\\"B"'
+    assert 'fca3103_operation_seconds_bucket{%s,le="0.001"} 1' % labels in text
+    assert 'fca3103_operation_seconds_bucket{%s,le="0.01"} 2' % labels in text
+    assert 'fca3103_operation_seconds_bucket{%s,le="+Inf"} 2' % labels in text
+    assert 'fca3103_operation_seconds_count{%s} 2' % labels in text
+    assert 'fca3103_bytes_in_total{%s} 34' % labels in text
+    path = tmp_path / "fca3103.prom"
+    sink.write(str(path))
+    assert path.read_text() == text
+
+
+def test_jsonl(tmp_path) :
+    f = io.StringIO()
+    sink = Jsonl_sink(f)
+    sink.emit(event(0.5))
+    sink.close()
+    assert json.loads(f.getvalue())["total"] == 0.5
+    path = str(tmp_path / "trace.jsonl")
+    for i in range(2) :
+        sink = Jsonl_sink(path)
+        sink.emit(event(i, kind="write", name="INIT"))
+        sink.close()
+    with open(path) as f :
+        assert [json.loads(line)["total"] for line in f] == [0, 1]
+
+
+def test_driver_events(device) :
+    sink = Histogram_sink()
+    device.drv.sinks.append(sink)
+    device.time_interval(5)
+    names = set((r["kind"], r["name"]) for r in sink.summary())
+    assert ("method", "time_interval") in names
+    assert ("query", "FETCH:ARR?") in names
+    assert ("write", "INIT") in names
+    rows = dict(((r["kind"], r["name"]), r) for r in sink.summary())
+    method = rows[("method", "time_interval")]
+    # The method event sums the traffic of its driver operations
+    assert method["bytes_in"] == sum(r["bytes_in"] for k, r in rows.items() \
+    if k[0] != "method")
+    assert method["total"] >= rows[("query", "FETCH:ARR?")]["total"]
+
+
+def test_traced_error(device) :
+    sink = Histogram_sink()
+    device.drv.sinks.append(sink)
+    device.trig_level[0] = None
+    with pytest.raises(ValueError) :
+        device.time_interval(5)
+    assert sink.summary()[0]["errors"] == 1
+
+
+def test_traced_without_sinks(device) :
+    calls = []
+    device.drv.emit = calls.append
+    assert len(device.time_interval(5)) == 5
+    assert calls == []
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*
+'''
+Tests of the trigger level cache.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+import json
+import time
+
+import pytest
+
+from FCA3103 import FCA3103
+from trigger_cache import *
+from sim_fca3103 import Sim_fca3103
+
+
+@pytest.fixture
+def cache(tmp_path) :
+    return Trigger_cache(str(tmp_path / "levels.json"))
+
+
+def test_round_trip(cache) :
+    assert cache.get("a") is None
+    cache.put("a", [1.25, 1.25], {1.0 : 2e-9, 1.25 : 1e-9})
+    level, profile, timestamp = cache.get("a")
+    assert level == [1.25, 1.25]
+    assert profile == {1.0 : 2e-9, 1.25 : 1e-9}
+    assert time.time() - timestamp < 60
+
+
+def test_stale_entries_are_dropped(cache, monkeypatch) :
+    cache.put("old", [1.0, 1.0], {})
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda : now + cache.max_age + 1)
+    assert cache.get("old") is None
+    cache.put("new", [2.0, 2.0], {})
+    with open(cache.path) as f :
+        assert list(json.load(f)) == ["new"]
+
+
+def test_newest_entries_are_kept(cache) :
+    cache.max_entries = 2
+    for key in "abc" :
+        cache.put(key, [1.0, 1.0], {})
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+
+
+@pytest.mark.parametrize("content", ["{not json", "[1, 2]", ""])
+def test_corrupted_file(cache, content) :
+    with open(cache.path, "w") as f :
+        f.write(content)
+    assert cache.get("a") is None
+    cache.put("a", [1.5, 1.5], {})
+    assert cache.get("a")[0] == [1.5, 1.5]
+
+
+def test_unwritable_file_is_a_miss(tmp_path) :
+    # The cache "directory" is a file, the entry can't be saved
+    (tmp_path / "file").write_text("")
+    cache = Trigger_cache(str(tmp_path / "file" / "levels.json"))
+    cache.put("a", [1.5, 1.5], {})
+    assert cache.get("a") is None
+
+
+def test_instrument_and_channels_key(cache) :
+    sim = Sim_fca3103(time_scale=0, latency=0, seed=1)
+    try :
+        device = FCA3103(0, 1, 2, transport=sim, trig_cache=cache)
+        device.pps_period = 0.001
+        device.n_samples = 4
+        device.trigger_level(1, 2, coarse=0.5, resolution=0.1)
+        other = FCA3103(0, 2, 1, transport=sim, trig_cache=cache)
+        assert other.trig_level == [None, None]
+        again = FCA3103(0, 1, 2, transport=sim, trig_cache=cache)
+        assert again.trig_level == device.trig_level
+        assert again.trig_profile == device.trig_profile
+    finally :
+        sim.close()
+
+
+def test_drifted_level_is_swept_again(cache) :
+    sim = Sim_fca3103(time_scale=0, latency=0, seed=1, jitter=1e-12)
+    try :
+        device = FCA3103(0, 1, 2, transport=sim, trig_cache=cache)
+        device.pps_period = 0.001
+        device.n_samples = 4
+        device.trigger_level(1, 2, coarse=0.5, resolution=0.1)
+        assert not device.check_trigger_level(v_min=1, v_max=2)
+        # Same level, but its time interval moved
+        sim.skew += 1e-9
+        assert device.check_trigger_level(v_min=1, v_max=2)
+        assert not device.check_trigger_level(v_min=1, v_max=2)
+    finally :
+        sim.close()
@@ -0,0 +1,159 @@
+#!   /usr/bin/env   python3
+# -*- coding: utf-8 -*
+'''
+On-disk cache of the trigger levels found by FCA3103.trigger_level.
+
+@file
+@date Created on Oct. 17, 2026
+@copyright LGPL v2.1
+@ingroup measurement
+'''
+
+#------------------------------------------------------------------------------|
+#                   GNU LESSER GENERAL PUBLIC LICENSE                          |
+#                 ------------------------------------                         |
+# This source file is free software; you can redistribute it and/or modify it  |
+# under the terms of the GNU Lesser General Public License as published by the |
+# Free Software Foundation; either version 2.1 of the License, or (at your     |
+# option) any later version. This source is distributed in the hope that it    |
+# will be useful, but WITHOUT ANY WARRANTY; without even the implied warrant   |
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser   |
+# General Public License for more details. You should have received a copy of  |
+# the GNU Lesser General Public License along with this  source; if not,       |
+# download it from http://www.gnu.org/licenses/lgpl-2.1.html                   |
+#------------------------------------------------------------------------------|
+
+#-------------------------------------------------------------------------------
+#                                   Import                                    --
+#-------------------------------------------------------------------------------
+# Import system modules
+import os
+import json
+import time
+
+
+def cache_dir() :
+    '''
+    Function to get the directory where the tool keeps its caches.
+
+    Returns:
+        $XDG_CACHE_HOME/fca3103 (~/.cache/fca3103 by default).
+    '''
+    base = os.environ.get("XDG_CACHE_HOME") or \
+    os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "fca3103")
+
+
+def load_json(path) :
+    '''
+    Function to load a JSON cache file.
+
+    Returns:
+        The file content, or an empty dict if it doesn't exist or is corrupted.
+    '''
+    try :
+        with open(path) as f :
+            data = json.load(f)
+    except (OSError, ValueError) :
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_json(path, data) :
+    '''
+    Function to write a JSON cache file atomically.
+
+    Errors are ignored: a cache that can't be written is just a cache miss.
+    '''
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    try :
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "w") as f :
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+    except OSError :
+        pass
+
+
+class Trigger_cache() :
+    '''
+    Cache of trigger levels and sweep profiles.
+
+    Entries are keyed by the instrument identity (manufacturer, device, serial)
+    and the master/slave input channels, and carry the time they were stored.
+    Entries older than max_age are ignored and dropped, and only the max_entries
+    newest entries are kept.
+    '''
+
+    ## Maximum age of an entry (s)
+    max_age = 7 * 24 * 3600
+    ## Maximum number of entries in the cache
+    max_entries = 64
+
+    def __init__(self, path=None) :
+        '''
+        Constructor
+
+        Args:
+            path (str) : Cache file. Default : trigger_levels.json in cache_dir().
+        '''
+        if path is None :
+            path = os.path.join(cache_dir(), "trigger_levels.json")
+        self.path = path
+
+    # ------------------------------------------------------------------------ #
+
+    @staticmethod
+    def key(drv, master_chan, slave_chan) :
+        '''
+        Method to build the key of an instrument and channel pair.
+
+        Args:
+            drv (FCA3103_drv) : Driver of the instrument.
+            master_chan (int) : Input channel for master's PPS signal.
+            slave_chan (int) : Input channel for slave's PPS signal.
+        '''
+        return "%s/%s/%s/%d-%d" % (drv.manufacturer, drv.device, drv.serial, \
+        master_chan, slave_chan)
+
+    # ------------------------------------------------------------------------ #
+
+    def get(self, key) :
+        '''
+        Method to get a cache entry.
+
+        Args:
+            key (str) : Entry key, see key().
+
+        Returns:
+            A tuple (trigger levels, profile, timestamp) or None if there isn't
+            an entry or it's stale. The profile is a dict level -> mean time
+            interval.
+        '''
+        entry = load_json(self.path).get(key)
+        if entry is None or time.time() - entry["timestamp"] > self.max_age :
+            return None
+        profile = dict((float(k), v) for k, v in entry["profile"].items())
+        return (entry["level"], profile, entry["timestamp"])
+
+    # ------------------------------------------------------------------------ #
+
+    def put(self, key, level, profile) :
+        '''
+        Method to store a cache entry, evicting the stale ones.
+
+        Args:
+            key (str) : Entry key, see key().
+            level (list) : Trigger level for each input.
+            profile (dict) : Mean time interval for each tested level.
+        '''
+        now = time.time()
+        data = load_json(self.path)
+        data[key] = {
+            "level" : list(level),
+            "profile" : dict(("%1.3f" % k, v) for k, v in profile.items()),
+            "timestamp" : now,
+        }
+        fresh = [k for k in data if now - data[k]["timestamp"] <= self.max_age]
+        fresh.sort(key=lambda k : data[k]["timestamp"], reverse=True)
+        save_json(self.path, dict((k, data[k]) for k in fresh[:self.max_entries]))